@@ -0,0 +1,245 @@
+"""Vectorized backtests of the recommendation rules over stored candles.
+
+The rules are the ones ``score_recommendation`` applies live:
+
+- RSI below ``rsi_low`` is a BUY, above ``rsi_high`` a SELL (confidence 0.7)
+- a negative MACD histogram adds 0.1 to a SELL (the live bullish-MACD check
+  compares the histogram with itself, so it never fires; replayed as is)
+- price above SMA20 adds 0.1 to a BUY, at or below it adds 0.1 to a SELL
+- targets and stops are fixed percentages of the entry: +15% / -8% for a BUY,
+  mirrored for a SELL
+
+Indicators are evaluated for every bar of a time x symbol matrix at once
+(pandas ewm/rolling down the time axis). A trade opens at the close of the
+bar where a signal starts (consecutive signal bars are one trade) and exits at
+the first later bar whose high/low touches the target or stop. When both are
+touched in the same bar the stop is assumed first. Trades still open after
+``max_hold`` bars exit at that bar's close; trades that run past the end of the
+data are left out. Exits are searched in one fancy-indexed window per trade,
+so the cost grows with trades x ``max_hold`` rather than bars.
+
+Rule sets differ only in parameters, and the indicators are shared by every
+set evaluated in one call. ``sweep`` splits a parameter grid across an
+AnalyticsExecutor, whose process mode hands the matrices to workers through
+shared memory.
+"""
+
+import asyncio
+import itertools
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from candles import resample_ohlcv
+from indicators import MACD_FAST, MACD_SIGNAL, MACD_SLOW, MIN_HISTORY, RSI_WINDOW, SMA_SHORT, align_closes
+
+DEFAULT_PARAMS = {
+    "rsi_low": 30.0,
+    "rsi_high": 70.0,
+    "target": 0.15,
+    "stop": 0.08,
+    "min_confidence": 0.7,
+    "max_hold": 168,
+    "allow_short": True,
+}
+# Each trade scans a max_hold-bar window; bound it so a request cannot ask for unbounded memory
+MAX_HOLD_LIMIT = 24 * 30
+
+# The live rule set at increasing confirmation levels
+RULE_SETS = {
+    "rsi": {"min_confidence": 0.7},
+    "rsi+1_confirmation": {"min_confidence": 0.8},
+    "rsi+2_confirmations": {"min_confidence": 0.9},
+    "rsi_long_only": {"allow_short": False},
+}
+
+
+def rule_inputs(close: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """RSI, MACD histogram and SMA20 for every bar of a time x symbol close matrix (NaN until ready)"""
+    frame = pd.DataFrame(close, copy=False)
+    diff = frame.diff()
+    up = diff.clip(lower=0.0).ewm(alpha=1.0 / RSI_WINDOW, min_periods=RSI_WINDOW, adjust=False).mean().to_numpy()
+    down = (-diff).clip(lower=0.0).ewm(alpha=1.0 / RSI_WINDOW, min_periods=RSI_WINDOW, adjust=False).mean().to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(down == 0, 100.0, 100.0 - 100.0 / (1.0 + up / down))
+    rsi[np.isnan(down)] = np.nan
+
+    fast = frame.ewm(span=MACD_FAST, min_periods=MACD_FAST, adjust=False).mean()
+    slow = frame.ewm(span=MACD_SLOW, min_periods=MACD_SLOW, adjust=False).mean()
+    macd = fast - slow
+    signal = macd.ewm(span=MACD_SIGNAL, min_periods=MACD_SIGNAL, adjust=False).mean()
+    histogram = (macd - signal).to_numpy(copy=True)
+
+    sma = frame.rolling(SMA_SHORT, min_periods=SMA_SHORT).mean().to_numpy(copy=True)
+
+    # Like the live path, nothing is trusted before MIN_HISTORY bars
+    warm = np.cumsum(~np.isnan(close), axis=0) < MIN_HISTORY
+    for array in (rsi, histogram, sma):
+        array[warm] = np.nan
+    return rsi, histogram, sma
+
+
+def score(close: np.ndarray, rsi: np.ndarray, histogram: np.ndarray, sma: np.ndarray, params: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """Direction (+1 BUY, -1 SELL, 0 HOLD) and confidence per bar, as score_recommendation computes them"""
+    with np.errstate(invalid="ignore"):
+        buy = rsi < params["rsi_low"]
+        sell = rsi > params["rsi_high"]
+        above = close > sma
+        ready = ~np.isnan(sma) & ~np.isnan(histogram)
+        confidence = (
+            0.5
+            + 0.2 * (buy | sell)
+            + 0.1 * (sell & (histogram < 0))
+            + 0.1 * ((buy & above) | (sell & ~above))
+        )
+    direction = np.where(buy, 1, np.where(sell, -1, 0)).astype(np.int8)
+    if not params["allow_short"]:
+        direction[direction < 0] = 0
+    # Compare with a little slack: 0.5 + 0.2 + 0.1 is not exactly 0.8 in floating point
+    direction[~ready | (confidence < params["min_confidence"] - 1e-9)] = 0
+    return direction, confidence
+
+
+def simulate(close: np.ndarray, high: np.ndarray, low: np.ndarray, direction: np.ndarray, params: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Replay entries at each signal onset; returns one array entry per completed trade"""
+    previous = np.vstack([np.zeros((1, direction.shape[1]), dtype=np.int8), direction[:-1]])
+    t, s = np.nonzero((direction != 0) & (direction != previous))
+    rows = len(close)
+    hold = int(params["max_hold"])
+    # Trades that cannot finish before the data ends are left out
+    keep = t + 1 < rows
+    t, s = t[keep], s[keep]
+    side = direction[t, s].astype(np.float64)
+    entry = close[t, s]
+
+    target_price = entry * (1 + side * params["target"])
+    stop_price = entry * (1 - side * params["stop"])
+
+    ahead = t[:, None] + np.arange(1, hold + 1)
+    inside = ahead < rows
+    ahead = np.minimum(ahead, rows - 1)
+    window_high = np.where(inside, high[ahead, s[:, None]], np.nan)
+    window_low = np.where(inside, low[ahead, s[:, None]], np.nan)
+
+    with np.errstate(invalid="ignore"):
+        long = side[:, None] > 0
+        stop_hit = np.where(long, window_low <= stop_price[:, None], window_high >= stop_price[:, None])
+        target_hit = np.where(long, window_high >= target_price[:, None], window_low <= target_price[:, None])
+    first_stop = np.where(stop_hit.any(axis=1), stop_hit.argmax(axis=1), hold)
+    first_target = np.where(target_hit.any(axis=1), target_hit.argmax(axis=1), hold)
+
+    stopped = (first_stop < hold) & (first_stop <= first_target)
+    targeted = (first_target < hold) & ~stopped
+    expired = ~stopped & ~targeted & (t + hold < rows)
+    done = stopped | targeted | expired
+
+    exit_offset = np.where(stopped, first_stop, np.where(targeted, first_target, hold - 1))
+    exit_bar = t + 1 + exit_offset
+    expiry_close = close[np.minimum(t + hold, rows - 1), s]
+    returns = np.where(
+        stopped, -params["stop"],
+        np.where(targeted, params["target"], side * (expiry_close / entry - 1))
+    )
+    outcome = np.where(stopped, -1, np.where(targeted, 1, 0)).astype(np.int8)
+    return {
+        "symbol": s[done],
+        "entry_bar": t[done],
+        "exit_bar": exit_bar[done],
+        "side": side[done],
+        "return": returns[done],
+        "outcome": outcome[done],
+    }
+
+
+def summarize(trades: Dict[str, np.ndarray], symbols: Sequence[str]) -> Dict[str, Any]:
+    """Hit rate, PnL and drawdown of a set of trades (returns per unit stake, in percent)"""
+    returns = trades["return"]
+    count = len(returns)
+    # Equity in exit order across all symbols; drawdown from the running peak (starting at 0)
+    order = np.argsort(trades["exit_bar"], kind="stable")
+    equity = np.cumsum(returns[order])
+    peak = np.maximum.accumulate(np.concatenate(([0.0], equity)))[1:]
+    per_symbol = {}
+    for column, symbol in enumerate(symbols):
+        mine = trades["symbol"] == column
+        if mine.any():
+            per_symbol[symbol] = {"trades": int(mine.sum()), "pnl_pct": round(float(returns[mine].sum()) * 100, 2)}
+    return {
+        "trades": count,
+        "wins": int((trades["outcome"] == 1).sum()),
+        "losses": int((trades["outcome"] == -1).sum()),
+        "expired": int((trades["outcome"] == 0).sum()),
+        "hit_rate": round(float((trades["outcome"] == 1).mean()), 4) if count else None,
+        "pnl_pct": round(float(returns.sum()) * 100, 2),
+        "avg_return_pct": round(float(returns.mean()) * 100, 3) if count else None,
+        "max_drawdown_pct": round(float((peak - equity).max()) * 100, 2) if count else 0.0,
+        "symbols": per_symbol,
+    }
+
+
+def backtest(
+    close: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    rule_sets: Sequence[Tuple[str, Dict[str, Any]]],
+    symbols: Sequence[str],
+) -> List[Dict[str, Any]]:
+    """Evaluate ``(name, params)`` rule sets on one universe; indicators are computed once for all of them"""
+    rsi, histogram, sma = rule_inputs(close)
+    results = []
+    for name, overrides in rule_sets:
+        params = {**DEFAULT_PARAMS, **overrides}
+        direction, _ = score(close, rsi, histogram, sma, params)
+        trades = simulate(close, high, low, direction, params)
+        results.append({"name": name, "params": params, **summarize(trades, symbols)})
+    return results
+
+
+def parameter_grid(**axes: Iterable[Any]) -> List[Tuple[str, Dict[str, Any]]]:
+    """Cartesian product of parameter values as named rule sets, e.g. ``parameter_grid(rsi_low=[25, 30])``"""
+    names = list(axes)
+    grid = []
+    for values in itertools.product(*(axes[name] for name in names)):
+        params = dict(zip(names, values))
+        grid.append((",".join(f"{name}={value}" for name, value in params.items()), params))
+    return grid
+
+
+async def sweep(
+    executor,
+    close: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    rule_sets: Sequence[Tuple[str, Dict[str, Any]]],
+    symbols: Sequence[str],
+    chunks: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Split ``rule_sets`` into chunks and backtest them in parallel on an AnalyticsExecutor"""
+    chunks = max(1, min(chunks or executor.max_workers, len(rule_sets)))
+    parts = [list(rule_sets[i::chunks]) for i in range(chunks)]
+    done = await asyncio.gather(*(
+        executor.run_arrays("backtest", backtest, (close, high, low), part, list(symbols))
+        for part in parts
+    ))
+    # Restore the caller's order
+    by_name = {result["name"]: result for results in done for result in results}
+    return [by_name[name] for name, _ in rule_sets]
+
+
+def load_universe(history_store, symbols: Sequence[str], bar_ms: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, List[str]]:
+    """Aligned ``(ts, close, high, low, symbols)`` matrices of ``bar_ms`` bars from stored history"""
+    present, closes, highs, lows = [], [], [], []
+    for symbol in symbols:
+        history = history_store.load(symbol)
+        if not len(history):
+            continue
+        bars = resample_ohlcv(history.ts, history.price, history.volume, bar_ms)
+        present.append(symbol)
+        closes.append((bars.ts, bars.close))
+        highs.append((bars.ts, bars.high))
+        lows.append((bars.ts, bars.low))
+    ts, close = align_closes(closes, bar_ms)
+    _, high = align_closes(highs, bar_ms)
+    _, low = align_closes(lows, bar_ms)
+    return ts, close, high, low, present
@@ -0,0 +1,123 @@
+"""Benchmark: vectorized backtest and parameter sweep vs a per-bar replay.
+
+Builds a synthetic universe (random-walk hourly candles for several symbols
+over several years), then times:
+
+- the per-bar replay the live path implies: advance an IndicatorState and call
+  score_recommendation for every bar, then walk each trade forward (one
+  symbol, extrapolated to the universe and the sweep); its trades are checked
+  against ``simulate`` for the same symbol, entry bar for entry bar
+- the vectorized backtest of the built-in rule sets over the whole universe
+- a parameter sweep, inline and split across a process pool
+
+Run from the backend directory:
+
+    python benchmarks/bench_backtest.py [--years 3] [--symbols 16] [--workers 4]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest import DEFAULT_PARAMS, RULE_SETS, backtest, parameter_grid, rule_inputs, score, simulate, sweep  # noqa: E402
+from executor import AnalyticsExecutor  # noqa: E402
+from indicators import MIN_HISTORY, IndicatorState  # noqa: E402
+from recommendations import score_recommendation  # noqa: E402
+
+
+def replay_symbol(close: np.ndarray, high: np.ndarray, low: np.ndarray, params: dict) -> list:
+    """Per-bar reference implementation for one symbol; returns the entry bar of every completed trade"""
+    state = IndicatorState()
+    previous = 0
+    entries = []
+    rows = len(close)
+    for t in range(rows):
+        state.push(close[t], t)
+        values = state.preview()
+        direction = 0
+        if state.count >= MIN_HISTORY and values["moving_averages"]["sma_20"] is not None and values["macd"]["histogram"] is not None:
+            tech = {"rsi": values["rsi"], "macd": values["macd"], "moving_averages": values["moving_averages"]}
+            scored = score_recommendation("X", "short", tech, close[t])
+            if scored["confidence"] >= params["min_confidence"] - 1e-9:
+                direction = {"BUY": 1, "SELL": -1}.get(scored["recommendation"], 0)
+        if direction and direction != previous:
+            target = close[t] * (1 + direction * params["target"])
+            stop = close[t] * (1 - direction * params["stop"])
+            for k in range(t + 1, min(rows, t + 1 + params["max_hold"])):
+                if (low[k] <= stop) if direction > 0 else (high[k] >= stop):
+                    entries.append(t)
+                    break
+                if (high[k] >= target) if direction > 0 else (low[k] <= target):
+                    entries.append(t)
+                    break
+            else:
+                # Expired at max_hold; a trade that runs past the end of the data is left out, as in simulate
+                if t + params["max_hold"] < rows:
+                    entries.append(t)
+        previous = direction
+    return entries
+
+
+async def run_sweep(mode: str, workers: int, close, high, low, grid, symbols) -> float:
+    executor = AnalyticsExecutor(mode=mode, max_workers=workers, max_queue=len(grid))
+    if mode == "process":
+        # Start the workers before measuring; spawning is a one-off cost
+        await asyncio.gather(*(executor.run("warmup", sum, [1]) for _ in range(workers)))
+    started = time.perf_counter()
+    await sweep(executor, close, high, low, grid, symbols, chunks=workers)
+    elapsed = time.perf_counter() - started
+    executor.shutdown()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=float, default=3, help="years of hourly candles")
+    parser.add_argument("--symbols", type=int, default=16, help="symbols in the universe")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="process pool size for the sweep")
+    args = parser.parse_args()
+
+    rows = int(args.years * 365 * 24)
+    rng = np.random.default_rng(42)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (rows, args.symbols)), axis=0))
+    high = close * (1 + rng.random(close.shape) * 0.01)
+    low = close * (1 - rng.random(close.shape) * 0.01)
+    symbols = [f"S{i}" for i in range(args.symbols)]
+    grid = parameter_grid(rsi_low=[20, 25, 30, 35], rsi_high=[65, 70, 75], target=[0.1, 0.15, 0.2], stop=[0.05, 0.08, 0.1])
+
+    started = time.perf_counter()
+    replayed = replay_symbol(close[:, 0], high[:, 0], low[:, 0], DEFAULT_PARAMS)
+    replay_seconds = time.perf_counter() - started
+
+    rsi, histogram, sma = rule_inputs(close[:, :1])
+    direction, _ = score(close[:, :1], rsi, histogram, sma, DEFAULT_PARAMS)
+    simulated = simulate(close[:, :1], high[:, :1], low[:, :1], direction, DEFAULT_PARAMS)["entry_bar"]
+    assert replayed == simulated.tolist(), "vectorized trades differ from the per-bar replay"
+
+    started = time.perf_counter()
+    results = backtest(close, high, low, list(RULE_SETS.items()), symbols)
+    vector_seconds = time.perf_counter() - started
+
+    inline_seconds = asyncio.run(run_sweep("inline", 1, close, high, low, grid, symbols))
+    process_seconds = asyncio.run(run_sweep("process", args.workers, close, high, low, grid, symbols))
+
+    print(f"universe:                   {args.symbols} symbols x {rows} hourly bars")
+    print(f"per-bar replay, 1 symbol:   {replay_seconds * 1000:.0f} ms (1 rule set, {len(replayed)} trades, same as simulate)")
+    print(f"  extrapolated, universe:   {replay_seconds * args.symbols:.1f} s per rule set")
+    print(f"  extrapolated, sweep:      {replay_seconds * args.symbols * len(grid) / 60:.1f} min for {len(grid)} rule sets")
+    print(f"vectorized, {len(RULE_SETS)} rule sets:   {vector_seconds * 1000:.0f} ms")
+    print(f"sweep inline:               {inline_seconds:.2f} s for {len(grid)} rule sets")
+    print(f"sweep process x{args.workers}:          {process_seconds:.2f} s")
+    for result in results:
+        print(f"  {result['name']:22} trades={result['trades']:5} hit_rate={result['hit_rate']} "
+              f"pnl={result['pnl_pct']}% max_dd={result['max_drawdown_pct']}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark: full pandas/ta recompute vs the incremental IndicatorEngine.
+
+Simulates the old request path (build a DataFrame over 60 days of hourly
+prices and recompute every indicator with ``ta``) against advancing an
+IndicatorState by one price, and checks both produce the same values.
+
+Run from the backend directory:
+
+    python benchmarks/bench_indicators.py [--points 1440] [--updates 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from ta.momentum import RSIIndicator
+from ta.trend import EMAIndicator, MACD, SMAIndicator
+from ta.volatility import BollingerBands
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from indicators import IndicatorState  # noqa: E402
+
+
+def ta_indicators(prices: np.ndarray) -> dict:
+    close = pd.DataFrame({"price": prices})["price"]
+    macd = MACD(close)
+    bb = BollingerBands(close)
+    return {
+        "rsi": RSIIndicator(close).rsi().iloc[-1],
+        "macd": macd.macd().iloc[-1],
+        "signal": macd.macd_signal().iloc[-1],
+        "histogram": macd.macd_diff().iloc[-1],
+        "sma_20": SMAIndicator(close, window=20).sma_indicator().iloc[-1],
+        "sma_50": SMAIndicator(close, window=50).sma_indicator().iloc[-1],
+        "ema_12": EMAIndicator(close, window=12).ema_indicator().iloc[-1],
+        "bb_upper": bb.bollinger_hband().iloc[-1],
+        "bb_lower": bb.bollinger_lband().iloc[-1],
+    }
+
+
+def engine_indicators(values: dict) -> dict:
+    return {
+        "rsi": values["rsi"],
+        "macd": values["macd"]["macd"],
+        "signal": values["macd"]["signal"],
+        "histogram": values["macd"]["histogram"],
+        "sma_20": values["moving_averages"]["sma_20"],
+        "sma_50": values["moving_averages"]["sma_50"],
+        "ema_12": values["moving_averages"]["ema_12"],
+        "bb_upper": values["bollinger_bands"]["upper"],
+        "bb_lower": values["bollinger_bands"]["lower"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=1440, help="history length (60 days hourly = 1440)")
+    parser.add_argument("--updates", type=int, default=200, help="number of new prices to apply")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    total = args.points + args.updates
+    prices = 50000 * np.exp(np.cumsum(rng.normal(0, 0.01, total)))
+
+    state = IndicatorState()
+    started = time.perf_counter()
+    state.seed((i, p) for i, p in enumerate(prices[:args.points]))
+    seed_seconds = time.perf_counter() - started
+
+    max_error = 0.0
+    ta_seconds = 0.0
+    engine_seconds = 0.0
+    for i in range(args.points, total):
+        started = time.perf_counter()
+        expected = ta_indicators(prices[i - args.points + 1:i + 1])
+        ta_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        # Preview the live price, then commit it as the next bar
+        got = engine_indicators(state.preview(prices[i]))
+        state.push(prices[i], i)
+        engine_seconds += time.perf_counter() - started
+
+        for name, value in expected.items():
+            max_error = max(max_error, abs(got[name] - value) / max(abs(value), 1e-12))
+
+    print(f"history points:        {args.points}")
+    print(f"updates:               {args.updates}")
+    print(f"engine seed (once):    {seed_seconds * 1000:.2f} ms")
+    print(f"ta full recompute:     {ta_seconds / args.updates * 1e6:.1f} us/update")
+    print(f"incremental engine:    {engine_seconds / args.updates * 1e6:.1f} us/update")
+    print(f"speedup:               {ta_seconds / engine_seconds:.0f}x")
+    print(f"max relative error:    {max_error:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Benchmark: event-loop lag while indicator work runs inline vs off the loop.
+
+Submits indicator seeding and batch jobs through an AnalyticsExecutor in each
+mode while a LoopLagMonitor samples the loop, and reports how late the loop
+woke up (what every WebSocket send and health check would have waited).
+
+Run from the backend directory:
+
+    python benchmarks/bench_loop_lag.py [--points 1440] [--symbols 16] [--jobs 40]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from executor import MODES, AnalyticsExecutor, LoopLagMonitor  # noqa: E402
+from indicators import build_state, compute_batch  # noqa: E402
+
+
+async def run_mode(mode: str, ts: np.ndarray, closes: np.ndarray, jobs: int) -> dict:
+    executor = AnalyticsExecutor(mode=mode, max_queue=jobs)
+    monitor = LoopLagMonitor(interval=0.005, window=100000)
+    if mode == "process":
+        # Start the workers before measuring; spawning is a one-off cost
+        await executor.run("warmup", sum, [1])
+    monitor.start()
+    await asyncio.sleep(0.05)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        executor.run_arrays("indicator_seed", build_state, (ts, closes[:, i % closes.shape[1]]))
+        if i % 2 == 0 else
+        executor.run_arrays("indicator_batch", compute_batch, (closes,))
+        for i in range(jobs)
+    ))
+    elapsed = time.perf_counter() - started
+
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+    executor.shutdown()
+    return {"elapsed": elapsed, **monitor.stats()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=1440, help="bars per symbol (60 days hourly = 1440)")
+    parser.add_argument("--symbols", type=int, default=16, help="columns in the batch matrix")
+    parser.add_argument("--jobs", type=int, default=40, help="jobs to submit per mode (half seeds, half batches)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (args.points, args.symbols)), axis=0))
+    ts = np.arange(args.points, dtype=np.int64) * 3600 * 1000
+
+    print(f"{'mode':8} {'wall ms':>9} {'lag p99 ms':>11} {'lag max ms':>11}")
+    for mode in ("inline",) + tuple(m for m in MODES if m != "inline"):
+        result = asyncio.run(run_mode(mode, ts, closes, args.jobs))
+        print(f"{mode:8} {result['elapsed'] * 1000:9.1f} {result['p99_ms']:11.2f} {result['max_ms']:11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Benchmark: WebSocket wire formats, encode CPU and bytes per price message.
+
+Encodes the same market_update ticks (10 price rows, same shape as ingestion)
+as JSON, MessagePack and the binary price frame, and reports per message:
+
+- encode time (a fresh Frame each time, as every tick gets)
+- bytes on the wire
+- bytes after permessage-deflate, both per message (no context takeover) and
+  with the sliding window kept across messages (the default uvicorn negotiates)
+
+Run from the backend directory:
+
+    python benchmarks/bench_wire_formats.py [--ticks 2000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import zlib
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_ws_fanout import SYMBOLS, market_data, ticks  # noqa: E402
+from wire import FORMATS, Frame, WireCodec  # noqa: E402
+
+
+def deflated_sizes(messages) -> tuple:
+    """Total bytes with raw deflate per message, and with one compressor shared by all messages"""
+    alone = 0
+    shared = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    together = 0
+    for message in messages:
+        payload = message.encode() if isinstance(message, str) else message
+        one = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        alone += len(one.compress(payload) + one.flush(zlib.Z_SYNC_FLUSH)) - 4
+        together += len(shared.compress(payload) + shared.flush(zlib.Z_SYNC_FLUSH)) - 4
+    return alone, together
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=2000, help="market_update messages to encode per format")
+    args = parser.parse_args()
+
+    codec = WireCodec(SYMBOLS)
+    messages = [
+        {"type": "market_update", "data": market_data(prices), "timestamp": datetime.now().isoformat(), "server_status": "healthy"}
+        for prices in ticks(args.ticks, 3, random.Random(7))
+    ]
+    print(f"{args.ticks} market_update messages, {len(messages[0]['data']['prices'])} prices each")
+    print(f"{'format':8} {'encode':>10} {'bytes':>8} {'deflate':>8} {'deflate+ctx':>12}")
+    baseline = None
+    for wire_format in FORMATS:
+        started = time.perf_counter()
+        encoded = [codec.encode(Frame(message), wire_format) for message in messages]
+        seconds = time.perf_counter() - started
+        size = sum(len(message) for message in encoded) / len(encoded)
+        alone, together = deflated_sizes(encoded)
+        baseline = baseline or size
+        ratio = f"   ({baseline / size:.1f}x smaller than JSON)" if wire_format != "json" else ""
+        print(f"{wire_format:8} {seconds / len(messages) * 1e6:8.1f}us {size:8.0f} {alone / len(encoded):8.0f} {together / len(encoded):12.0f}{ratio}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Benchmark: new WebSocket connections per second, per-connect fetch vs pre-encoded snapshot.
+
+Drives ``websocket_endpoint`` directly with in-memory sockets that disconnect
+as soon as they receive ``initial_data``, in waves of concurrent connects (a
+reconnect storm). Four cases:
+
+- cold, before: no ingestion snapshot yet and every connect fetches its own
+  initial data upstream (simulated: one serial call per price plus the
+  overview's calls, each taking --latency seconds)
+- cold, after: the same, but concurrent connects share one fetch
+- warm, before: the snapshot is there, but every connect rebuilds and
+  re-encodes initial_data
+- warm, after: every connect queues the pre-encoded snapshot
+
+Run from the backend directory:
+
+    python benchmarks/bench_ws_connect.py [--connections 2000] [--concurrency 200] [--latency 0.02]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import WebSocketDisconnect  # noqa: E402
+
+import main as backend  # noqa: E402
+from bench_ws_fanout import ticks  # noqa: E402
+from ingestion import IngestionScheduler  # noqa: E402
+
+# Calls the overview fallback makes upstream: five prices and /global
+OVERVIEW_CALLS = 6
+
+
+class ConnectingSocket:
+    """Connects, waits for initial_data, then hangs up"""
+
+    def __init__(self):
+        self.query_params = {}
+        self.scope = {"subprotocols": []}
+        self._initial = asyncio.Event()
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def close(self):
+        pass
+
+    async def send_text(self, message: str):
+        if message.startswith('{"type": "initial_data"'):
+            self._initial.set()
+
+    async def send_bytes(self, message: bytes):
+        pass
+
+    async def receive_text(self) -> str:
+        await self._initial.wait()
+        raise WebSocketDisconnect()
+
+
+class NoFlight:
+    """Every caller runs its own fetch, as connects did before"""
+
+    async def do(self, key, fn):
+        return await fn()
+
+
+async def storm(connections: int, concurrency: int) -> float:
+    """Connections per second for ``connections`` connects, ``concurrency`` at a time"""
+    started = time.perf_counter()
+    for done in range(0, connections, concurrency):
+        await asyncio.gather(*(backend.websocket_endpoint(ConnectingSocket()) for _ in range(min(concurrency, connections - done))))
+    return connections / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=2000, help="connects per case")
+    parser.add_argument("--concurrency", type=int, default=200, help="connects arriving together")
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated upstream call latency in seconds")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    upstream_calls = 0
+
+    async def fake_prices(symbols):
+        nonlocal upstream_calls
+        upstream_calls += len(symbols)
+        await asyncio.sleep(args.latency * len(symbols))
+        return next(ticks(1, 0, random.Random(7)))[:len(symbols)]
+
+    async def fake_overview():
+        nonlocal upstream_calls
+        upstream_calls += OVERVIEW_CALLS
+        await asyncio.sleep(args.latency * OVERVIEW_CALLS)
+        return {"total_market_cap": 2.4e12, "total_volume": 9.1e10}
+
+    backend.get_real_time_prices = fake_prices
+    backend.get_market_overview = fake_overview
+    real_frame, real_flight = backend.initial_data_frame, backend.initial_data_flight
+    warm = {"prices": next(ticks(1, 0, random.Random(7))), "market_overview": {"total_market_cap": 2.4e12, "total_volume": 9.1e10}}
+
+    cases = [
+        ("cold, before", False, False),
+        ("cold, after", False, True),
+        ("warm, before", True, False),
+        ("warm, after", True, True),
+    ]
+    print(f"{args.connections} connects, {args.concurrency} at a time, {args.latency * 1000:.0f} ms per upstream call")
+    for name, seeded, after in cases:
+        backend.ingestion = IngestionScheduler()
+        if seeded:
+            backend.ingestion.publish(warm)
+        backend.manager.initial_data, backend.manager.initial_version = None, None
+        backend.initial_data_frame = real_frame if after else (lambda: None)
+        backend.initial_data_flight = real_flight if after else NoFlight()
+        upstream_calls = 0
+        rate = asyncio.run(storm(args.connections, args.concurrency))
+        print(f"{name:14} {rate:9.0f} connects/s   {upstream_calls:7} upstream calls")
+
+
+if __name__ == "__main__":
+    main()
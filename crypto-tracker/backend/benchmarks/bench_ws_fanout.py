@@ -0,0 +1,204 @@
+"""Benchmark: WebSocket fan-out per tick, full broadcast vs topic subscriptions vs deltas.
+
+Connects a few thousand in-memory clients to a ConnectionManager and replays
+price ticks where only a few symbols move. Reports bytes and CPU time per tick
+for:
+
+- broadcast: every client gets the full market_update (the pre-topic behaviour)
+- topics: every client watches 2-3 symbols (``prices:SYM``) and gets
+  price_update messages only for those that changed
+- deltas: every client is on the delta stream and gets one delta message with
+  the fields that changed
+
+It then stalls a few clients and measures how long a tick takes to reach every
+healthy client, with the old sequential send loop and with per-client outboxes.
+
+Run from the backend directory:
+
+    python benchmarks/bench_ws_fanout.py [--clients 2000] [--ticks 50] [--changed 3] [--stalled 5]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingestion import MarketSnapshot  # noqa: E402
+from main import COINGECKO_COINS, ConnectionManager  # noqa: E402
+from wire import WireCodec  # noqa: E402
+
+SYMBOLS = list(COINGECKO_COINS)
+
+
+class FakeSocket:
+    """Stands in for a WebSocket; counts what would have gone on the wire"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.messages = 0
+        self.bytes = 0
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def close(self):
+        pass
+
+    async def send_text(self, message: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.messages += 1
+        self.bytes += len(message)
+
+
+async def drain(manager: ConnectionManager):
+    """Let the writer tasks empty every outbox"""
+    while not all(outbox.idle for outbox in manager.outboxes.values()):
+        await asyncio.sleep(0)
+
+
+def price_row(symbol: str, price: float, timestamp: str) -> dict:
+    """Same shape as the rows the price ingestion publishes"""
+    coin_id = COINGECKO_COINS[symbol]
+    return {
+        "symbol": symbol,
+        "price": round(price, 4),
+        "change_24h": round(price % 7 - 3.5, 2),
+        "volume_24h": 1.5e9,
+        "market_cap": 3.2e11,
+        "high_24h": round(price * 1.02, 4),
+        "low_24h": round(price * 0.98, 4),
+        "timestamp": timestamp,
+        "name": coin_id.replace("-", " ").title(),
+        "change_1h": 0.0,
+        "change_7d": 0.0,
+        "logo": "",
+        "unit": "USD",
+        "reference_id": coin_id,
+        "data_source": "CoinGecko",
+    }
+
+
+def ticks(count: int, changed: int, rng: random.Random):
+    """Price lists where ``changed`` random symbols move each tick"""
+    prices = {symbol: 100.0 + i for i, symbol in enumerate(SYMBOLS)}
+    for _ in range(count):
+        for symbol in rng.sample(SYMBOLS, changed):
+            prices[symbol] *= 1 + rng.uniform(-0.01, 0.01)
+        # One poll stamps every row, whether its price moved or not
+        timestamp = datetime.now().isoformat()
+        yield [price_row(symbol, price, timestamp) for symbol, price in prices.items()]
+
+
+def market_data(prices: list) -> dict:
+    return {"prices": prices[:10], "overview": {"total_market_cap": 2.4e12, "total_volume": 9.1e10}}
+
+
+async def run(mode: str, clients: int, tick_count: int, changed: int) -> dict:
+    rng = random.Random(7)
+    manager = ConnectionManager(WireCodec(SYMBOLS))
+    sockets = [FakeSocket() for _ in range(clients)]
+    for socket in sockets:
+        await manager.connect(socket)
+    snapshot = MarketSnapshot.empty()
+    if mode == "topics":
+        for socket in sockets:
+            manager.topics.subscribe(socket, [f"prices:{symbol}" for symbol in rng.sample(SYMBOLS, rng.choice((2, 3)))])
+        # The first publish sends every symbol once; measure steady-state ticks only
+        manager.publish_topics(snapshot.with_values({"prices": next(ticks(1, 0, rng))}))
+    elif mode == "deltas":
+        manager.delta_clients.update(sockets)
+        manager.publish_deltas(market_data(next(ticks(1, 0, rng))))
+    await drain(manager)
+    before_bytes, before_messages = manager.bytes_sent, manager.messages_sent
+
+    cpu = time.process_time()
+    for prices in ticks(tick_count, changed, rng):
+        snapshot = snapshot.with_values({"prices": prices})
+        if mode == "topics":
+            manager.publish_topics(snapshot)
+        elif mode == "deltas":
+            manager.publish_deltas(market_data(prices))
+        else:
+            # Bypass the significance filter so every tick is sent, as a busy market would
+            manager.last_broadcast_data = {}
+            await manager.broadcast({
+                "type": "market_update",
+                "data": market_data(prices),
+                "timestamp": datetime.now().isoformat(),
+                "server_status": "healthy",
+                "active_connections": clients,
+            })
+        await drain(manager)
+    cpu = time.process_time() - cpu
+    for socket in sockets:
+        manager.disconnect(socket)
+    return {
+        "bytes": (manager.bytes_sent - before_bytes) / tick_count,
+        "messages": (manager.messages_sent - before_messages) / tick_count,
+        "cpu_ms": cpu / tick_count * 1000,
+    }
+
+
+async def stalled(clients: int, stalled_clients: int, delay: float) -> dict:
+    """Seconds until one tick reaches every healthy client when ``stalled_clients`` take ``delay`` per send"""
+    prices = next(ticks(1, 0, random.Random(7)))
+    frame = ConnectionManager._encode("market_update", market_data(prices))
+    # Stalled clients first: the worst case for a sequential loop
+    sockets = [FakeSocket(delay) for _ in range(stalled_clients)] + [FakeSocket() for _ in range(clients - stalled_clients)]
+    healthy = sockets[stalled_clients:]
+
+    started = time.perf_counter()
+    message = json.dumps(frame.message)
+    for socket in sockets:
+        await socket.send_text(message)
+    sequential = time.perf_counter() - started
+
+    manager = ConnectionManager(WireCodec(SYMBOLS))
+    for socket in sockets:
+        await manager.connect(socket)
+    started = time.perf_counter()
+    manager._send_many(sockets, frame, key="market_update")
+    enqueue = time.perf_counter() - started
+    while any(socket.messages < 2 for socket in healthy):
+        await asyncio.sleep(0)
+    outboxes = time.perf_counter() - started
+    for socket in sockets:
+        manager.disconnect(socket)
+    return {"sequential": sequential, "enqueue": enqueue, "outboxes": outboxes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=2000, help="connected clients")
+    parser.add_argument("--ticks", type=int, default=50, help="ticks to replay")
+    parser.add_argument("--changed", type=int, default=3, help="symbols that move per tick")
+    parser.add_argument("--stalled", type=int, default=5, help="clients that take --delay seconds per send")
+    parser.add_argument("--delay", type=float, default=0.2, help="send time of a stalled client")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    results = {mode: asyncio.run(run(mode, args.clients, args.ticks, args.changed)) for mode in ("broadcast", "topics", "deltas")}
+    print(f"{args.clients} clients, {args.changed} of {len(SYMBOLS)} symbols change per tick")
+    for mode, result in results.items():
+        print(f"{mode:10} {result['bytes'] / 1024:9.1f} KiB/tick  {result['messages']:7.0f} msgs/tick  {result['cpu_ms']:7.2f} ms CPU/tick")
+    broadcast = results["broadcast"]
+    for mode in ("topics", "deltas"):
+        result = results[mode]
+        print(f"{mode:10} {broadcast['bytes'] / max(result['bytes'], 1):9.1f}x fewer bytes  {broadcast['cpu_ms'] / max(result['cpu_ms'], 1e-9):.1f}x less CPU")
+
+    latency = asyncio.run(stalled(args.clients, args.stalled, args.delay))
+    print(f"{args.stalled} clients stalled for {args.delay * 1000:.0f} ms per send; time for a tick to reach every healthy client:")
+    print(f"  sequential send loop:  {latency['sequential'] * 1000:8.1f} ms")
+    print(f"  per-client outboxes:   {latency['outboxes'] * 1000:8.1f} ms (broadcast call itself {latency['enqueue'] * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""Unified async TTL/LRU cache with stale-while-revalidate and negative caching.
+
+Each data type lives in its own namespace with its own TTLs and size bound:
+
+- ``ttl``: how long an entry is served as fresh
+- ``stale_ttl``: extra window in which the last value is still served while a
+  background refresh runs (stale-while-revalidate)
+- ``negative_ttl``: how long a failed load is remembered, so a broken upstream
+  is not hammered by every caller
+- ``max_entries``: LRU bound; the least recently used entry is evicted first
+
+Loads go through a per-namespace SingleFlight, so concurrent misses for the
+same key share one upstream fetch. With a SharedCache attached, a local miss
+first checks the shared store, and every load is written through to it, so
+several worker processes share one fetch result.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from singleflight import SingleFlight
+
+try:
+    from shared_store import SharedCache
+except ImportError:
+    SharedCache = None
+
+FRESH = "fresh"
+STALE = "stale"
+NEGATIVE = "negative"
+MISS = "miss"
+
+
+class _Entry:
+    __slots__ = ("value", "error", "expires_at", "stale_until")
+
+    def __init__(self, value: Any, error: Optional[BaseException], expires_at: float, stale_until: float):
+        self.value = value
+        self.error = error
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+
+
+class CacheNamespace:
+    """Entries, policy and counters for one kind of cached data"""
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        stale_ttl: float = 0.0,
+        negative_ttl: float = 0.0,
+        max_entries: int = 1024,
+        flight: Optional[SingleFlight] = None,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.flight = flight or SingleFlight(name)
+        self.entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.loads = 0
+        self.load_errors = 0
+        self.refreshes = 0
+        self.shared_hits = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.negative_hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "negative_ttl": self.negative_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "loads": self.loads,
+            "load_errors": self.load_errors,
+            "background_refreshes": self.refreshes,
+            "shared_hits": self.shared_hits,
+        }
+
+
+class AsyncCache:
+    """Namespaced TTL/LRU cache shared by every fetcher"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, shared: Optional["SharedCache"] = None):
+        self._clock = clock
+        self.shared = shared
+        self._namespaces: Dict[str, CacheNamespace] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    def configure(
+        self,
+        name: str,
+        ttl: float,
+        stale_ttl: float = 0.0,
+        negative_ttl: float = 0.0,
+        max_entries: int = 1024,
+        flight: Optional[SingleFlight] = None,
+    ) -> CacheNamespace:
+        namespace = CacheNamespace(name, ttl, stale_ttl, negative_ttl, max_entries, flight)
+        self._namespaces[name] = namespace
+        return namespace
+
+    def namespace(self, name: str) -> CacheNamespace:
+        try:
+            return self._namespaces[name]
+        except KeyError:
+            raise KeyError(f"Cache namespace not configured: {name}")
+
+    def lookup(self, name: str, key: Hashable) -> Tuple[str, Any]:
+        """Return ``(status, value)``; status is fresh, stale, negative or miss.
+
+        For negative entries the value is the cached exception.
+        """
+        ns = self.namespace(name)
+        entry = ns.entries.get(key)
+        if entry is None:
+            ns.misses += 1
+            return MISS, None
+
+        now = self._clock()
+        if now >= entry.stale_until:
+            del ns.entries[key]
+            ns.expirations += 1
+            ns.misses += 1
+            return MISS, None
+
+        ns.entries.move_to_end(key)
+        if entry.error is not None:
+            ns.negative_hits += 1
+            return NEGATIVE, entry.error
+        if now < entry.expires_at:
+            ns.hits += 1
+            return FRESH, entry.value
+        ns.stale_hits += 1
+        return STALE, entry.value
+
+    def get(self, name: str, key: Hashable, default: Any = None) -> Any:
+        """Return the fresh value for ``key`` or ``default``"""
+        status, value = self.lookup(name, key)
+        return value if status == FRESH else default
+
+    def set(self, name: str, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ns = self.namespace(name)
+        ttl = ns.ttl if ttl is None else ttl
+        now = self._clock()
+        self._store(ns, key, _Entry(value, None, now + ttl, now + ttl + ns.stale_ttl))
+
+    def set_error(self, name: str, key: Hashable, error: BaseException):
+        """Remember a failed load for the namespace's negative TTL.
+
+        A still-servable stale value is kept instead, so a failed refresh never
+        replaces good data.
+        """
+        ns = self.namespace(name)
+        if ns.negative_ttl <= 0:
+            return
+        now = self._clock()
+        entry = ns.entries.get(key)
+        if entry is not None and entry.error is None and now < entry.stale_until:
+            return
+        self._store(ns, key, _Entry(None, error, now + ns.negative_ttl, now + ns.negative_ttl))
+
+    def _store(self, ns: CacheNamespace, key: Hashable, entry: _Entry):
+        ns.entries[key] = entry
+        ns.entries.move_to_end(key)
+        while len(ns.entries) > ns.max_entries:
+            ns.entries.popitem(last=False)
+            ns.evictions += 1
+
+    def invalidate(self, name: str, key: Optional[Hashable] = None):
+        """Drop one key, or the whole namespace when ``key`` is None"""
+        ns = self.namespace(name)
+        if key is None:
+            ns.entries.clear()
+        else:
+            ns.entries.pop(key, None)
+
+    async def get_or_load(self, name: str, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Serve ``key`` from cache, loading it with ``loader()`` on a miss.
+
+        Stale values are returned immediately while a background refresh runs.
+        Cached failures re-raise the original error until the negative TTL passes.
+        """
+        status, value = self.lookup(name, key)
+        if status == FRESH:
+            return value
+        if status == STALE:
+            if not self.namespace(name).flight.is_in_flight(key):
+                self.refresh(name, key, loader)
+            return value
+        if status == NEGATIVE:
+            raise value
+        return await self._load(name, key, loader)
+
+    async def _load(self, name: str, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        ns = self.namespace(name)
+
+        async def load():
+            if self.shared is not None:
+                found = await self.fetch_shared(name, [key])
+                if key in found:
+                    return found[key]
+            ns.loads += 1
+            try:
+                value = await loader()
+            except Exception as e:
+                ns.load_errors += 1
+                self.set_error(name, key, e)
+                raise
+            await self.publish(name, {key: value})
+            return value
+
+        return await ns.flight.do(key, load)
+
+    async def fetch_shared(self, name: str, keys: List[Hashable]) -> Dict[Hashable, Any]:
+        """Adopt still-fresh values another process stored for ``keys`` (one pipelined read)"""
+        if self.shared is None or not keys:
+            return {}
+        ns = self.namespace(name)
+        by_name = {str(key): key for key in keys}
+        entries = await self.shared.get_many(name, list(by_name))
+        found = {}
+        now = time.time()
+        for key_name, (value, stored_at) in entries.items():
+            age = now - stored_at
+            if age >= ns.ttl:
+                continue
+            key = by_name[key_name]
+            ns.shared_hits += 1
+            self.set(name, key, value, ttl=ns.ttl - age)
+            found[key] = value
+        return found
+
+    async def publish(self, name: str, items: Dict[Hashable, Any]):
+        """Store ``items`` locally and write them through to the shared store in one round trip"""
+        for key, value in items.items():
+            self.set(name, key, value)
+        if self.shared is not None and items:
+            ns = self.namespace(name)
+            now = time.time()
+            await self.shared.set_many(
+                name,
+                {str(key): [value, now] for key, value in items.items()},
+                ttl=ns.ttl + ns.stale_ttl,
+            )
+
+    def refresh(self, name: str, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Reload ``key`` in the background; concurrent refreshes share one load"""
+        self.namespace(name).refreshes += 1
+        return self.spawn(self._load(name, key, loader))
+
+    def spawn(self, coro: Awaitable[Any]) -> asyncio.Task:
+        """Run a background refresh, keeping a reference until it finishes"""
+        task = asyncio.ensure_future(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
+        return task
+
+    def _background_done(self, task: asyncio.Task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logging.warning(f"Background cache refresh failed: {task.exception()}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: ns.stats() for name, ns in self._namespaces.items()}
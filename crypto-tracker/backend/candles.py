@@ -0,0 +1,248 @@
+"""Multi-timeframe OHLCV candles built from stored history and live ticks.
+
+Every symbol keeps one CandleSeries per timeframe (1m, 5m, 1h, 4h, 1d): a
+fixed-capacity ring of closed bars in NumPy arrays plus the bar that is still
+open. Two paths feed it:
+
+- backfill: stored history points newer than anything seen are resampled into
+  bars in one vectorized pass per timeframe (``resample_ohlcv``) and merged
+- live ticks: each tick updates the open bar's high/low/close, or closes it and
+  opens the next one when it falls in a later bucket; both are O(1)
+
+Bars are keyed by their open time in epoch milliseconds. Volume is the 24h
+volume reported with the bar's last point, since that is what upstream gives us.
+"""
+
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from history import PriceHistory
+
+TIMEFRAMES = {"1m": 60, "5m": 300, "1h": 3600, "4h": 4 * 3600, "1d": 86400}
+# 60 days of hourly bars is 1440; 2048 also keeps a week of 5m bars
+DEFAULT_CAPACITY = 2048
+
+
+class Bars(NamedTuple):
+    ts: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+
+def resample_ohlcv(ts_ms: np.ndarray, price: np.ndarray, volume: np.ndarray, bar_ms: int) -> Bars:
+    """Bucket time-ordered points into ``bar_ms`` OHLCV bars (every bucket with data, open bar included)"""
+    if not len(ts_ms):
+        return Bars(np.empty(0, dtype=np.int64), *(np.empty(0) for _ in range(5)))
+    buckets = np.asarray(ts_ms, dtype=np.int64) // bar_ms
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    ends = np.append(starts[1:] - 1, len(buckets) - 1)
+    return Bars(
+        buckets[starts] * bar_ms,
+        price[starts],
+        np.maximum.reduceat(price, starts),
+        np.minimum.reduceat(price, starts),
+        price[ends],
+        volume[ends],
+    )
+
+
+def trailing_run(bars: Bars, bar_ms: int, max_gap: int = 2) -> Bars:
+    """The newest bars with no gap longer than ``max_gap`` bars between them.
+
+    Backfilled history is hourly with a short 5-minute tail, so a 1m or 5m
+    series starts with bars an hour apart; only this run is really sampled at
+    the series' resolution.
+    """
+    if len(bars) < 2:
+        return bars
+    gaps = np.flatnonzero(np.diff(bars.ts) > max_gap * bar_ms)
+    start = int(gaps[-1]) + 1 if len(gaps) else 0
+    return Bars(*(column[start:] for column in bars))
+
+
+class CandleSeries:
+    """Closed bars in a ring buffer plus the open bar, for one symbol and timeframe"""
+
+    def __init__(self, bar_seconds: int, capacity: int = DEFAULT_CAPACITY):
+        self.bar_ms = int(bar_seconds * 1000)
+        self.capacity = capacity
+        self._ts = np.zeros(capacity, dtype=np.int64)
+        self._ohlcv = np.zeros((5, capacity))
+        # Sequence number of the next closed bar; slot = seq % capacity
+        self._end = 0
+
+        # Open bar: [open, high, low, close, volume]; None until the first point
+        self._open_ts: Optional[int] = None
+        self._open = [0.0] * 5
+
+    def __len__(self) -> int:
+        return min(self._end, self.capacity)
+
+    def _close_open_bar(self):
+        slot = self._end % self.capacity
+        self._ts[slot] = self._open_ts
+        self._ohlcv[:, slot] = self._open
+        self._end += 1
+        self._open_ts = None
+
+    def update(self, price: float, volume: float, ts_ms: int) -> bool:
+        """Fold one tick into the open bar; returns True when it closed the previous bar"""
+        bucket_ts = ts_ms // self.bar_ms * self.bar_ms
+        if self._open_ts is not None and bucket_ts < self._open_ts:
+            return False
+        closed = False
+        if self._open_ts is not None and bucket_ts > self._open_ts:
+            self._close_open_bar()
+            closed = True
+        if self._open_ts is None:
+            self._open_ts = bucket_ts
+            self._open = [price, price, price, price, volume]
+        else:
+            bar = self._open
+            bar[1] = max(bar[1], price)
+            bar[2] = min(bar[2], price)
+            bar[3] = price
+            bar[4] = volume
+        return closed
+
+    def merge(self, bars: Bars):
+        """Append resampled bars that start at or after the open bar (the last one stays open)"""
+        if not len(bars):
+            return
+        first = 0
+        if self._open_ts is not None and bars.ts[0] == self._open_ts:
+            # Continue the open bar with the first resampled one
+            bar = self._open
+            bar[1] = max(bar[1], float(bars.high[0]))
+            bar[2] = min(bar[2], float(bars.low[0]))
+            bar[3] = float(bars.close[0])
+            bar[4] = float(bars.volume[0])
+            first = 1
+        if first == len(bars):
+            return
+        if self._open_ts is not None:
+            self._close_open_bar()
+
+        # Bulk-copy all but the last bar into the ring; only the last ``capacity`` can survive
+        count = len(bars) - 1 - first
+        skip = max(0, count - self.capacity)
+        if count - skip > 0:
+            seqs = np.arange(self._end + skip, self._end + count) % self.capacity
+            rows = slice(first + skip, first + count)
+            self._ts[seqs] = bars.ts[rows]
+            self._ohlcv[:, seqs] = np.vstack([bars.open[rows], bars.high[rows], bars.low[rows], bars.close[rows], bars.volume[rows]])
+        self._end += count
+        self._open_ts = int(bars.ts[-1])
+        self._open = [float(bars.open[-1]), float(bars.high[-1]), float(bars.low[-1]), float(bars.close[-1]), float(bars.volume[-1])]
+
+    def roll(self, now_ms: int) -> bool:
+        """Close the open bar if its period is over; returns whether it did"""
+        if self._open_ts is not None and now_ms >= self._open_ts + self.bar_ms:
+            self._close_open_bar()
+            return True
+        return False
+
+    def closed(self) -> Bars:
+        """Closed bars, oldest first (copies)"""
+        count = len(self)
+        seqs = np.arange(self._end - count, self._end) % self.capacity
+        ohlcv = self._ohlcv[:, seqs]
+        return Bars(self._ts[seqs], *ohlcv)
+
+    def last_closed_ts(self) -> Optional[int]:
+        return int(self._ts[(self._end - 1) % self.capacity]) if self._end else None
+
+
+class CandleAggregator:
+    """CandleSeries for every (symbol, timeframe), fed by history backfills and live ticks"""
+
+    def __init__(self, timeframes: Optional[Dict[str, int]] = None, capacity: int = DEFAULT_CAPACITY):
+        self.timeframes = dict(timeframes or TIMEFRAMES)
+        self.capacity = capacity
+        self._series: Dict[str, Dict[str, CandleSeries]] = {}
+        # Newest point folded in per symbol; older points are ignored
+        self._last_point_ms: Dict[str, int] = {}
+
+        self.ticks = 0
+        self.backfilled_points = 0
+        self.bars_closed = 0
+
+    def has(self, symbol: str) -> bool:
+        return symbol in self._series
+
+    def backfill(self, symbol: str, history: PriceHistory) -> int:
+        """Fold stored points newer than anything seen for ``symbol``; returns how many were used"""
+        series = self._series.get(symbol)
+        if series is None:
+            series = self._series[symbol] = {
+                name: CandleSeries(seconds, self.capacity) for name, seconds in self.timeframes.items()
+            }
+        last = self._last_point_ms.get(symbol)
+        start = 0 if last is None else int(np.searchsorted(history.ts, last, side="right"))
+        if start >= len(history):
+            return 0
+        ts, price, volume = (np.asarray(column[start:]) for column in history)
+        for candles in series.values():
+            candles.merge(resample_ohlcv(ts, price, volume, candles.bar_ms))
+        self._last_point_ms[symbol] = int(ts[-1])
+        self.backfilled_points += len(ts)
+        return len(ts)
+
+    def add(self, symbol: str, price: float, volume: float = 0.0, ts: Optional[float] = None) -> List[str]:
+        """Fold a live tick (``ts`` in epoch seconds); returns the timeframes whose bar it closed.
+
+        Ticks for symbols that were never backfilled are ignored, so a partial
+        first bar never hides the stored history behind it.
+        """
+        series = self._series.get(symbol)
+        if series is None:
+            return []
+        ts_ms = int((time.time() if ts is None else ts) * 1000)
+        if ts_ms < self._last_point_ms.get(symbol, 0):
+            return []
+        self._last_point_ms[symbol] = ts_ms
+        self.ticks += 1
+        closed = [name for name, candles in series.items() if candles.update(float(price), float(volume or 0.0), ts_ms)]
+        self.bars_closed += len(closed)
+        return closed
+
+    def closed(self, symbol: str, timeframe: str, now: Optional[float] = None) -> Bars:
+        """Closed ``timeframe`` bars for ``symbol``, oldest first"""
+        candles = self._series[symbol][timeframe]
+        if candles.roll(int((time.time() if now is None else now) * 1000)):
+            self.bars_closed += 1
+        return candles.closed()
+
+    def candle_ts(self, symbol: str, timeframe: str, now: Optional[float] = None) -> Optional[int]:
+        """Open time (epoch seconds) of the last closed ``timeframe`` bar; changes only when a bar closes"""
+        series = self._series.get(symbol)
+        if series is None:
+            return None
+        candles = series[timeframe]
+        if candles.roll(int((time.time() if now is None else now) * 1000)):
+            self.bars_closed += 1
+        last = candles.last_closed_ts()
+        return last // 1000 if last is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "symbols": len(self._series),
+            "timeframes": list(self.timeframes),
+            "capacity": self.capacity,
+            "ticks": self.ticks,
+            "backfilled_points": self.backfilled_points,
+            "bars_closed": self.bars_closed,
+            "bars": {
+                symbol: {name: len(candles) for name, candles in series.items()}
+                for symbol, series in self._series.items()
+            },
+            "memory_bytes": len(self._series) * len(self.timeframes) * self.capacity * 6 * 8,
+        }
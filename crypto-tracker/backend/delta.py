@@ -0,0 +1,85 @@
+"""Delta encoding of the market stream for WebSocket clients.
+
+A DeltaStream holds the last state sent to delta clients as nested dicts
+(``{"prices": {"BTC": {...}}, "overview": {...}}``). Each update diffs the new
+state against it and yields only the fields that changed. A key that
+disappeared is sent as ``null``. Volatile fields (the per-poll ``timestamp``
+stamped on every price row) ride along with real changes but never make a
+delta on their own. Every non-empty delta bumps a stream-wide sequence number,
+so one encoded delta serves every delta client.
+
+A client starts from ``snapshot()`` (the full state with its sequence number)
+and applies deltas in order. A delta whose ``seq`` is not the last one plus one
+means the client missed something and should ask for a resync, which is
+served from the same server-side snapshot.
+"""
+
+from typing import Any, Collection, Dict, Optional
+
+# Fields that change on every poll whether or not the data did
+VOLATILE_FIELDS = ("timestamp",)
+
+
+def diff(old: Dict[str, Any], new: Dict[str, Any], volatile: Collection[str] = ()) -> Dict[str, Any]:
+    """Fields of ``new`` that differ from ``old``, recursing into nested dicts; removed keys map to None.
+
+    A dict whose only changes are ``volatile`` fields counts as unchanged.
+    """
+    changes = {}
+    for key, value in new.items():
+        previous = old.get(key)
+        if isinstance(value, dict) and isinstance(previous, dict):
+            nested = diff(previous, value, volatile)
+            if nested:
+                changes[key] = nested
+        elif key not in old or previous != value:
+            changes[key] = value
+    for key in old:
+        if key not in new:
+            changes[key] = None
+    if volatile and all(key in volatile for key in changes):
+        return {}
+    return changes
+
+
+class DeltaStream:
+    """Sequence-numbered deltas against the last published state"""
+
+    def __init__(self, volatile: Collection[str] = VOLATILE_FIELDS):
+        self.volatile = frozenset(volatile)
+        self.seq = 0
+        self._state: Dict[str, Any] = {}
+
+        self.updates = 0
+        self.deltas = 0
+        self.fields_sent = 0
+
+    def update(self, state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Replace the state; returns ``{"seq", "data"}`` with what changed, or None if nothing did"""
+        self.updates += 1
+        changes = diff(self._state, state, self.volatile)
+        # The state moves on even when only volatile fields changed, so snapshots stay current
+        self._state = state
+        if not changes:
+            return None
+        self.seq += 1
+        self.deltas += 1
+        self.fields_sent += _count_fields(changes)
+        return {"seq": self.seq, "data": changes}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """The full current state and the sequence number it corresponds to"""
+        return {"seq": self.seq, "data": self._state}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "seq": self.seq,
+            "updates": self.updates,
+            "deltas": self.deltas,
+            "fields_sent": self.fields_sent,
+            "fields_in_snapshot": _count_fields(self._state),
+        }
+
+
+def _count_fields(tree: Dict[str, Any]) -> int:
+    return sum(_count_fields(value) if isinstance(value, dict) else 1 for value in tree.values())
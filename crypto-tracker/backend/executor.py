@@ -0,0 +1,290 @@
+"""Off-event-loop execution for CPU-bound analytics, plus event-loop lag monitoring.
+
+Indicator seeding, batch indicator computation and recommendation scoring are
+pure functions of their inputs, so handlers hand them to an AnalyticsExecutor
+instead of running them on the event loop:
+
+- ``thread``: a ThreadPoolExecutor. NumPy/pandas release the GIL in their
+  inner loops, and pure-Python work is preempted every switch interval, so the
+  loop keeps serving WebSocket sends and health checks.
+- ``process``: a ProcessPoolExecutor (spawned workers). Arrays passed to
+  ``run_arrays`` are copied once into ``multiprocessing.shared_memory`` blocks
+  and the workers map them without pickling the series.
+- ``inline``: runs on the loop, as before; useful as a baseline.
+
+Admission is bounded: once ``max_workers + max_queue`` jobs are in flight new
+jobs are rejected with ExecutorSaturated rather than queueing without limit.
+A job counts until the pool has finished it, even when the coroutine awaiting
+it was cancelled, and its shared-memory blocks are only unlinked then.
+Each job name keeps queue-wait and run-time samples for ``stats()``.
+
+LoopLagMonitor measures how late a periodic ``asyncio.sleep`` wakes up, which
+is exactly how long anything else on the loop had to wait.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MODES = ("thread", "process", "inline")
+
+
+class ExecutorSaturated(RuntimeError):
+    """Raised when a job is submitted while the executor's queue is full"""
+
+
+def _percentile(samples: Sequence[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def _timed(fn: Callable[..., Any], args: Tuple, kwargs: Dict[str, Any]) -> Tuple[float, float, Any]:
+    # time.monotonic is system-wide on Linux/macOS, so worker timestamps compare with the parent's
+    started = time.monotonic()
+    result = fn(*args, **kwargs)
+    return started, time.monotonic(), result
+
+
+def _timed_shared(
+    fn: Callable[..., Any],
+    blocks: Sequence[Tuple[str, Tuple[int, ...], str]],
+    args: Tuple,
+    kwargs: Dict[str, Any],
+) -> Tuple[float, float, Any]:
+    """Worker side of ``run_arrays``: map the shared blocks as arrays and call ``fn``"""
+    started = time.monotonic()
+    attached = []
+    try:
+        arrays = []
+        for name, shape, dtype in blocks:
+            # Spawned workers share the parent's resource tracker; the parent unlinks the block
+            block = shared_memory.SharedMemory(name=name)
+            attached.append(block)
+            arrays.append(np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf))
+        result = fn(*arrays, *args, **kwargs)
+        del arrays
+    finally:
+        for block in attached:
+            block.close()
+    return started, time.monotonic(), result
+
+
+class JobStats:
+    """Rolling queue-wait and run-time samples for one job name"""
+
+    def __init__(self, window: int = 200):
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_run_seconds = 0.0
+        self._wait: deque = deque(maxlen=window)
+        self._run: deque = deque(maxlen=window)
+
+    def record(self, wait: float, run: float):
+        self.completed += 1
+        self.total_run_seconds += run
+        self._wait.append(wait)
+        self._run.append(run)
+
+    def stats(self) -> Dict[str, Any]:
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 3) if value is not None else None
+
+        return {
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "run_ms_avg": ms(self.total_run_seconds / self.completed) if self.completed else None,
+            "run_ms_p95": ms(_percentile(self._run, 0.95)),
+            "run_ms_max": ms(max(self._run)) if self._run else None,
+            "wait_ms_p95": ms(_percentile(self._wait, 0.95)),
+        }
+
+
+class AnalyticsExecutor:
+    """Runs CPU-bound jobs off the event loop with bounded admission and per-job timing"""
+
+    def __init__(self, mode: str = "thread", max_workers: Optional[int] = None, max_queue: int = 32):
+        if mode not in MODES:
+            raise ValueError(f"Unknown executor mode {mode!r}; expected one of {', '.join(MODES)}")
+        self.mode = mode
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_queue = max_queue
+        self._pool: Optional[Executor] = None
+        self._in_flight = 0
+        self._jobs: Dict[str, JobStats] = {}
+
+        self.peak_in_flight = 0
+        self.shared_bytes = 0
+
+    def _pool_for_mode(self) -> Optional[Executor]:
+        if self.mode == "inline":
+            return None
+        if self._pool is None:
+            if self.mode == "process":
+                # Spawned workers: forking a process that runs an event loop and threads is unsafe
+                self._pool = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="analytics")
+        return self._pool
+
+    def _job(self, name: str) -> JobStats:
+        job = self._jobs.get(name)
+        if job is None:
+            job = self._jobs[name] = JobStats()
+        return job
+
+    async def _submit(
+        self,
+        name: str,
+        worker: Callable[..., Tuple[float, float, Any]],
+        *worker_args,
+        on_done: Optional[Callable[[], None]] = None,
+    ) -> Any:
+        """Run ``worker`` in the pool; ``on_done`` is called once the job has ended (or was never started)"""
+        job = self._job(name)
+        if self._in_flight >= self.max_workers + self.max_queue:
+            job.rejected += 1
+            if on_done is not None:
+                on_done()
+            raise ExecutorSaturated(f"Analytics executor saturated ({self._in_flight} jobs in flight); rejected {name}")
+
+        def finish():
+            self._in_flight -= 1
+            if on_done is not None:
+                on_done()
+
+        def finish_on_loop(_):
+            # Pool callbacks run on a worker or management thread
+            try:
+                loop.call_soon_threadsafe(finish)
+            except RuntimeError:
+                # Loop already closed; nothing else can be waiting on the slot
+                finish()
+
+        self._in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self._in_flight)
+        submitted = time.monotonic()
+        loop = asyncio.get_running_loop()
+        future = None
+        try:
+            pool = self._pool_for_mode()
+            if pool is None:
+                started, finished, result = worker(*worker_args)
+            else:
+                future = pool.submit(worker, *worker_args)
+                # Hold the slot until the job itself ends; a cancelled caller cannot stop a running job
+                future.add_done_callback(finish_on_loop)
+                started, finished, result = await asyncio.wrap_future(future)
+        except Exception:
+            job.failed += 1
+            raise
+        finally:
+            if future is None:
+                finish()
+        job.record(max(0.0, started - submitted), finished - started)
+        return result
+
+    async def run(self, name: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` off the loop; ``fn`` must be picklable in process mode"""
+        return await self._submit(name, _timed, fn, args, kwargs)
+
+    async def run_arrays(self, name: str, fn: Callable[..., Any], arrays: Sequence[np.ndarray], *args, **kwargs) -> Any:
+        """Run ``fn(*arrays, *args, **kwargs)``; in process mode the arrays travel through shared memory"""
+        if self.mode != "process":
+            return await self._submit(name, _timed, fn, (*arrays, *args), kwargs)
+
+        blocks: List[shared_memory.SharedMemory] = []
+
+        def release():
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+        try:
+            descriptors = []
+            for array in arrays:
+                array = np.ascontiguousarray(array)
+                block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+                blocks.append(block)
+                np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+                descriptors.append((block.name, array.shape, array.dtype.str))
+                self.shared_bytes += array.nbytes
+        except BaseException:
+            release()
+            raise
+        # Unlinked when the worker is done with them, not when this caller stops waiting
+        return await self._submit(name, _timed_shared, fn, descriptors, args, kwargs, on_done=release)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queued": max(0, self._in_flight - self.max_workers),
+            "peak_in_flight": self.peak_in_flight,
+            "shared_bytes": self.shared_bytes,
+            "jobs": {name: job.stats() for name, job in sorted(self._jobs.items())},
+        }
+
+
+class LoopLagMonitor:
+    """Samples event-loop lag: how late a periodic sleep wakes up"""
+
+    def __init__(self, interval: float = 0.25, window: int = 240):
+        self.interval = interval
+        self._samples: deque = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+
+        self.max_lag = 0.0
+        self.samples = 0
+
+    async def _run_forever(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - expected)
+            self._samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            self.samples += 1
+            if lag > 1.0:
+                logging.warning(f"Event loop blocked for {lag * 1000:.0f}ms")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_forever(), name="loop-lag-monitor")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 3) if value is not None else None
+
+        return {
+            "interval_ms": ms(self.interval),
+            "samples": self.samples,
+            "last_ms": ms(self._samples[-1]) if self._samples else None,
+            "mean_ms": ms(sum(self._samples) / len(self._samples)) if self._samples else None,
+            "p99_ms": ms(_percentile(self._samples, 0.99)),
+            "max_ms": ms(self.max_lag),
+        }
@@ -6,16 +6,90 @@
 # Base URL: https://rest.cryptoapis.io
 
 import asyncio
+import time
 import aiohttp
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 BASE = "https://rest.cryptoapis.io"
 DEFAULT_TOP10 = ["BTC","ETH","USDT","BNB","SOL","XRP","USDC","DOGE","TON","ADA"]
 
+class CryptoAPIsHTTPError(RuntimeError):
+    def __init__(self, status: int, text: str):
+        super().__init__(f"HTTP {status}: {text[:300]}")
+        self.status = status
+
+class AdaptiveLimiter:
+    """
+    AIMD 自適應併發上限：
+      - 成功且延遲正常：上限每輪 +1（每次成功 +1/limit）
+      - 延遲超過基準 latency_tolerance 倍：上限 ×0.9
+      - 429 / 5xx / 逾時：上限 ×0.5
+    同一波請求只會觸發一次乘法遞減（請求開始時間早於上次遞減者不再計入）。
+    可跨多次 fetch_top_assets 重用，讓調整結果延續下去。
+    """
+
+    def __init__(self, initial: int = 5, min_limit: int = 1, max_limit: int = 20, latency_tolerance: float = 2.0):
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.latency_tolerance = latency_tolerance
+        self.limit = float(min(max(initial, min_limit), self.max_limit))
+        self._in_flight = 0
+        self._cond = asyncio.Condition()
+        self._baseline: Optional[float] = None
+        self._last_decrease = 0.0
+
+        self.requests = 0
+        self.overloads = 0
+        self.slow = 0
+        self.max_in_flight = 0
+
+    async def acquire(self) -> float:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._in_flight < int(self.limit))
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        return time.monotonic()
+
+    async def release(self, started: float, overloaded: bool = False, failed: bool = False):
+        latency = time.monotonic() - started
+        self.requests += 1
+        if overloaded:
+            self.overloads += 1
+            self._decrease(started, 0.5)
+        elif not failed:
+            # 基準延遲取觀察到的最小值，並緩慢上調以適應上游長期變慢
+            self._baseline = latency if self._baseline is None else min(latency, self._baseline * 1.01)
+            if latency > self._baseline * self.latency_tolerance:
+                self.slow += 1
+                self._decrease(started, 0.9)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        async with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def _decrease(self, started: float, factor: float):
+        if started < self._last_decrease:
+            return
+        self.limit = max(self.min_limit, self.limit * factor)
+        self._last_decrease = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "baseline_ms": round(self._baseline * 1000, 1) if self._baseline is not None else None,
+            "requests": self.requests,
+            "overloads": self.overloads,
+            "slow": self.slow,
+        }
+
 class CryptoAPIsClient:
-    def __init__(self, api_key: str, session: Optional[aiohttp.ClientSession] = None):
+    def __init__(self, api_key: str, session: Optional[aiohttp.ClientSession] = None, limiter: Optional[AdaptiveLimiter] = None):
         self.api_key = api_key
         self._external_session = session
+        self._limiter = limiter
 
     def _headers(self) -> Dict[str, str]:
         return {
@@ -30,17 +104,34 @@ class CryptoAPIsClient:
         if sess is None:
             sess = aiohttp.ClientSession()
             _own = True
+        started = await self._limiter.acquire() if self._limiter else None
+        overloaded = failed = False
         try:
             async with sess.request(method, url, headers=self._headers(), timeout=aiohttp.ClientTimeout(total=20)) as resp:
                 text = await resp.text()
                 if resp.status // 100 != 2:
-                    raise RuntimeError(f"HTTP {resp.status}: {text[:300]}")
+                    overloaded = resp.status == 429 or resp.status >= 500
+                    failed = True
+                    raise CryptoAPIsHTTPError(resp.status, text)
                 try:
                     return await resp.json()
                 except Exception:
                     # 有些錯誤頁可能非 JSON
+                    failed = True
                     raise RuntimeError(f"Bad JSON response: {text[:300]}")
+        except asyncio.TimeoutError:
+            overloaded = True
+            raise
+        except asyncio.CancelledError:
+            # 被取消（對沖落敗、串流提早結束）的請求不計入延遲基準，也不調整上限
+            failed = True
+            raise
+        except aiohttp.ClientError:
+            failed = True
+            raise
         finally:
+            if started is not None:
+                await self._limiter.release(started, overloaded=overloaded, failed=failed)
             if _own:
                 await sess.close()
 
@@ -58,77 +149,129 @@ async def fetch_top_assets(
     to_fiat: str = "USD",
     concurrency: int = 5,
     use_exchange_rate_only: bool = False,
+    session: Optional[aiohttp.ClientSession] = None,
+    max_concurrency: int = 20,
+    limiter: Optional[AdaptiveLimiter] = None,
 ) -> List[Dict[str, Any]]:
     """
-    回傳每個幣的彙整資料：
+    一次回傳全部幣的彙整資料（有價的排前面，依價格由高到低）。
+    每筆欄位與參數說明見 stream_top_assets。
+    """
+    out = [
+        item async for item in stream_top_assets(
+            api_key, symbols, to_fiat, concurrency, use_exchange_rate_only, session, max_concurrency, limiter
+        )
+    ]
+    sort_assets(out)
+    return out
+
+def sort_assets(assets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # 有價的排前面
+    assets.sort(key=lambda x: (x.get("latestPriceUSD") is None, -(x.get("latestPriceUSD") or 0)))
+    return assets
+
+async def stream_top_assets(
+    api_key: str,
+    symbols: Optional[List[str]] = None,
+    to_fiat: str = "USD",
+    concurrency: int = 5,
+    use_exchange_rate_only: bool = False,
+    session: Optional[aiohttp.ClientSession] = None,
+    max_concurrency: int = 20,
+    limiter: Optional[AdaptiveLimiter] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    非同步產生器：每個幣一完成就 yield（完成順序，非排序），
+    第一筆價格的等待時間是最快的幣而不是最慢的幣。提前結束迭代會取消剩餘請求。
+    每個幣的彙整資料：
       {
         symbol, name, latestPriceUSD, latestPriceAt, change1h, change24h, change7d,
-        logoBase64, unit, referenceId
+        logoBase64, unit, referenceId, fetchMs
       }
     其中 latestPriceUSD 若 asset 詳情未給 USD，會用 exchange-rate 端點補上。
+    fetchMs 為該幣從開始請求到完成（含排隊與匯率補打）的毫秒數，錯誤項目也有。
+    session：可傳入共用的 aiohttp.ClientSession（例如 http_pool.aiohttp_session）重用連線；
+      未傳入時本次執行自建一個連線池共用 session，結束時關閉。
+    concurrency 為初始併發數，之後依延遲與 429/5xx 在 1..max_concurrency 間自動調整；
+    limiter：可傳入同一個 AdaptiveLimiter 跨次重用調整結果。
     """
     symbols = symbols or DEFAULT_TOP10
-    sem = asyncio.Semaphore(concurrency)
-    client = CryptoAPIsClient(api_key)
+    limiter = limiter or AdaptiveLimiter(initial=concurrency, max_limit=max_concurrency)
+    own_session = session is None
+    if own_session:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=max(max_concurrency, limiter.max_limit), ttl_dns_cache=300)
+        )
+    client = CryptoAPIsClient(api_key, session=session, limiter=limiter)
 
     async def _one(sym: str) -> Dict[str, Any]:
-        async with sem:
-            try:
-                if use_exchange_rate_only:
-                    rate = await client.get_exchange_rate_by_symbols(sym, to_fiat)
-                    item = rate.get("data", {}).get("item", {})
-                    return {
-                        "symbol": item.get("fromAssetSymbol") or sym,
-                        "name": None,
-                        "latestPriceUSD": float(item["rate"]) if item.get("toAssetSymbol") == "USD" and item.get("rate") is not None else None,
-                        "latestPriceAt": item.get("calculationTimestamp"),
-                        "change1h": None,
-                        "change24h": None,
-                        "change7d": None,
-                        "logoBase64": None,
-                        "unit": item.get("toAssetSymbol"),
-                        "referenceId": item.get("fromAssetId"),
-                    }
-
-                # 先拿資產詳情（通常含最新價與波動）
-                details = await client.get_asset_details_by_symbol(sym)
-                d = details.get("data", {}).get("item", {}) or {}
-                latest = d.get("latestRate", {}) or {}
-                # 不同文件版本對「變動」欄位命名可能略異，容錯取法
-                changes = d.get("rateChange") or d.get("rateChanges") or {}
-
-                result = {
-                    "symbol": d.get("originalSymbol") or d.get("symbol") or sym,
-                    "name": d.get("name"),
-                    "latestPriceUSD": float(latest["amount"]) if latest.get("unit") == "USD" and latest.get("amount") is not None else None,
-                    "latestPriceAt": latest.get("calculationTimestamp"),
-                    "change1h": _to_float(changes.get("hour") or changes.get("lastHour") or changes.get("1h")),
-                    "change24h": _to_float(changes.get("day") or changes.get("lastDay") or changes.get("24h")),
-                    "change7d": _to_float(changes.get("week") or changes.get("lastWeek") or changes.get("7d")),
-                    "logoBase64": (d.get("logo") or {}).get("imageData"),
-                    "unit": latest.get("unit"),
-                    "referenceId": d.get("referenceId"),
+        started = time.perf_counter()
+        item = await _fetch_one(sym)
+        item["fetchMs"] = round((time.perf_counter() - started) * 1000, 1)
+        return item
+
+    async def _fetch_one(sym: str) -> Dict[str, Any]:
+        try:
+            if use_exchange_rate_only:
+                rate = await client.get_exchange_rate_by_symbols(sym, to_fiat)
+                item = rate.get("data", {}).get("item", {})
+                return {
+                    "symbol": item.get("fromAssetSymbol") or sym,
+                    "name": None,
+                    "latestPriceUSD": float(item["rate"]) if item.get("toAssetSymbol") == "USD" and item.get("rate") is not None else None,
+                    "latestPriceAt": item.get("calculationTimestamp"),
+                    "change1h": None,
+                    "change24h": None,
+                    "change7d": None,
+                    "logoBase64": None,
+                    "unit": item.get("toAssetSymbol"),
+                    "referenceId": item.get("fromAssetId"),
                 }
 
-                # 若沒拿到 USD 價，補打一個匯率端點
-                if result["latestPriceUSD"] is None and to_fiat == "USD":
-                    rate = await client.get_exchange_rate_by_symbols(sym, to_fiat)
-                    item = rate.get("data", {}).get("item", {}) or {}
-                    if item.get("toAssetSymbol") == "USD" and item.get("rate") is not None:
-                        result["latestPriceUSD"] = float(item["rate"])
-                        result["latestPriceAt"] = result["latestPriceAt"] or item.get("calculationTimestamp")
-                        result["unit"] = "USD"
-
-                return result
-            except Exception as e:
-                # 確保單一幣失敗不會中斷整體
-                return {"symbol": sym, "error": str(e)}
-
-    tasks = [_one(s) for s in symbols]
-    out = await asyncio.gather(*tasks)
-    # 有價的排前面
-    out.sort(key=lambda x: (x.get("latestPriceUSD") is None, -(x.get("latestPriceUSD") or 0)))
-    return out
+            # 先拿資產詳情（通常含最新價與波動）
+            details = await client.get_asset_details_by_symbol(sym)
+            d = details.get("data", {}).get("item", {}) or {}
+            latest = d.get("latestRate", {}) or {}
+            # 不同文件版本對「變動」欄位命名可能略異，容錯取法
+            changes = d.get("rateChange") or d.get("rateChanges") or {}
+
+            result = {
+                "symbol": d.get("originalSymbol") or d.get("symbol") or sym,
+                "name": d.get("name"),
+                "latestPriceUSD": float(latest["amount"]) if latest.get("unit") == "USD" and latest.get("amount") is not None else None,
+                "latestPriceAt": latest.get("calculationTimestamp"),
+                "change1h": _to_float(changes.get("hour") or changes.get("lastHour") or changes.get("1h")),
+                "change24h": _to_float(changes.get("day") or changes.get("lastDay") or changes.get("24h")),
+                "change7d": _to_float(changes.get("week") or changes.get("lastWeek") or changes.get("7d")),
+                "logoBase64": (d.get("logo") or {}).get("imageData"),
+                "unit": latest.get("unit"),
+                "referenceId": d.get("referenceId"),
+            }
+
+            # 若沒拿到 USD 價，補打一個匯率端點
+            if result["latestPriceUSD"] is None and to_fiat == "USD":
+                rate = await client.get_exchange_rate_by_symbols(sym, to_fiat)
+                item = rate.get("data", {}).get("item", {}) or {}
+                if item.get("toAssetSymbol") == "USD" and item.get("rate") is not None:
+                    result["latestPriceUSD"] = float(item["rate"])
+                    result["latestPriceAt"] = result["latestPriceAt"] or item.get("calculationTimestamp")
+                    result["unit"] = "USD"
+
+            return result
+        except Exception as e:
+            # 確保單一幣失敗不會中斷整體
+            return {"symbol": sym, "error": str(e)}
+
+    tasks = [asyncio.ensure_future(_one(s)) for s in symbols]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if own_session:
+            await session.close()
 
 def _to_float(v):
     try:
@@ -0,0 +1,146 @@
+"""Local per-symbol price history on disk, loaded zero-copy into NumPy.
+
+Each symbol is a directory of append-only column files:
+
+- ``ts.i8``: int64 epoch milliseconds, strictly increasing
+- ``price.f8``: float64 price
+- ``volume.f8``: float64 24h volume reported with the point
+
+Reads memory-map the files (``np.memmap``), so loading 60 days of history
+copies nothing and costs no parsing. Writes only append the rows newer than
+the last stored timestamp, so callers fetch just the missing tail from
+upstream. A crash between column writes is repaired on the next load by
+truncating every column to the shortest one.
+
+Points are stored at whatever granularity upstream returned them (CoinGecko
+mixes 5-minute and hourly points depending on the requested range);
+``resample_last`` buckets them into fixed bars.
+"""
+
+import logging
+import os
+from typing import Any, Dict, NamedTuple, Optional
+
+import numpy as np
+
+COLUMNS = (("ts", np.int64), ("price", np.float64), ("volume", np.float64))
+_DTYPES = dict(COLUMNS)
+
+
+class PriceHistory(NamedTuple):
+    ts: np.ndarray
+    price: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+
+def _empty() -> PriceHistory:
+    return PriceHistory(*(np.empty(0, dtype=dtype) for _, dtype in COLUMNS))
+
+
+def resample_last(history: PriceHistory, bar_ms: int, include_open: bool = False, now_ms: Optional[int] = None) -> PriceHistory:
+    """Bucket points into ``bar_ms`` bars, keeping each bar's last point (its close).
+
+    The bar that contains ``now_ms`` is still open and is dropped unless
+    ``include_open`` is set.
+    """
+    if not len(history):
+        return history
+    buckets = history.ts // bar_ms
+    # Index of the last point in each bucket: where the bucket changes, plus the final point
+    last = np.flatnonzero(np.diff(buckets)) if len(buckets) > 1 else np.empty(0, dtype=np.int64)
+    last = np.append(last, len(buckets) - 1)
+    if not include_open and now_ms is not None and buckets[last[-1]] >= now_ms // bar_ms:
+        last = last[:-1]
+    return PriceHistory(history.ts[last], history.price[last], history.volume[last])
+
+
+class HistoryStore:
+    """Append-only columnar price history, one directory per symbol"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._views: Dict[str, PriceHistory] = {}
+        self.appended_points = 0
+        self.loads = 0
+
+    def _path(self, symbol: str, column: str) -> str:
+        # e.g. BTC/ts.i8, BTC/price.f8
+        return os.path.join(self.root, symbol, f"{column}.{np.dtype(_DTYPES[column]).str[1:]}")
+
+    def _rows_on_disk(self, symbol: str) -> int:
+        counts = []
+        for column, dtype in COLUMNS:
+            path = self._path(symbol, column)
+            counts.append(os.path.getsize(path) // np.dtype(dtype).itemsize if os.path.exists(path) else 0)
+        rows = min(counts)
+        if any(count != rows for count in counts):
+            # Interrupted append: drop the partial row from the longer columns
+            logging.warning(f"Repairing history for {symbol}: column lengths {counts}")
+            for column, dtype in COLUMNS:
+                path = self._path(symbol, column)
+                if os.path.exists(path):
+                    with open(path, "r+b") as f:
+                        f.truncate(rows * np.dtype(dtype).itemsize)
+        return rows
+
+    def load(self, symbol: str) -> PriceHistory:
+        """Memory-mapped, read-only view of everything stored for ``symbol``"""
+        view = self._views.get(symbol)
+        if view is not None:
+            return view
+        rows = self._rows_on_disk(symbol)
+        if rows == 0:
+            view = _empty()
+        else:
+            view = PriceHistory(*(
+                np.memmap(self._path(symbol, column), dtype=dtype, mode="r", shape=(rows,))
+                for column, dtype in COLUMNS
+            ))
+        self._views[symbol] = view
+        self.loads += 1
+        return view
+
+    def last_timestamp(self, symbol: str) -> Optional[int]:
+        view = self.load(symbol)
+        return int(view.ts[-1]) if len(view) else None
+
+    def append(self, symbol: str, ts: np.ndarray, price: np.ndarray, volume: np.ndarray) -> int:
+        """Append the points newer than the last stored one; returns how many were written"""
+        ts = np.asarray(ts, dtype=np.int64)
+        order = np.argsort(ts, kind="stable")
+        ts = ts[order]
+        price = np.asarray(price, dtype=np.float64)[order]
+        volume = np.asarray(volume, dtype=np.float64)[order]
+
+        last = self.last_timestamp(symbol)
+        keep = np.ones(len(ts), dtype=bool) if last is None else ts > last
+        # Drop duplicate timestamps within the batch, keeping the later point
+        if len(ts) > 1:
+            keep[:-1] &= ts[:-1] != ts[1:]
+        if not keep.any():
+            return 0
+
+        os.makedirs(os.path.join(self.root, symbol), exist_ok=True)
+        for column, values in (("ts", ts[keep]), ("price", price[keep]), ("volume", volume[keep])):
+            with open(self._path(symbol, column), "ab") as f:
+                f.write(np.ascontiguousarray(values).tobytes())
+        # Remap on next load so readers see the new rows
+        self._views.pop(symbol, None)
+        written = int(keep.sum())
+        self.appended_points += written
+        return written
+
+    def stats(self) -> Dict[str, Any]:
+        symbols = sorted(os.listdir(self.root)) if os.path.isdir(self.root) else []
+        points = {symbol: len(self.load(symbol)) for symbol in symbols}
+        return {
+            "root": self.root,
+            "symbols": len(symbols),
+            "points": points,
+            "bytes_on_disk": sum(points.values()) * sum(np.dtype(dtype).itemsize for _, dtype in COLUMNS),
+            "appended_points": self.appended_points,
+            "loads": self.loads,
+        }
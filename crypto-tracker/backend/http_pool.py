@@ -0,0 +1,236 @@
+"""Application-lifetime HTTP client pool shared by every upstream fetcher.
+
+One httpx.AsyncClient (CoinGecko, CryptoCompare) and one aiohttp.ClientSession
+(CryptoAPIs) are created at startup and closed at shutdown, so requests reuse
+keep-alive connections instead of paying TCP+TLS setup on every call.
+"""
+
+import asyncio
+import importlib.util
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+import httpx
+
+from ratelimit import RateLimitScheduler, parse_retry_after, rate_limiter
+
+try:
+    import aiohttp
+except ImportError:  # CryptoAPIs service is optional
+    aiohttp = None
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class _HostStats:
+    __slots__ = ("requests", "in_flight", "peak_in_flight", "new_connections", "errors")
+
+    def __init__(self):
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.new_connections = 0
+        self.errors = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "new_connections": self.new_connections,
+            "reused_connections": max(self.requests - self.new_connections, 0),
+            "errors": self.errors,
+        }
+
+
+class _LimitedTransport(httpx.AsyncBaseTransport):
+    """Wraps the real transport to enforce per-host concurrency and record usage"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, pool: "HTTPClientPool"):
+        self._transport = transport
+        self._pool = pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        stats = self._pool._host_stats(host)
+
+        async def trace(event_name: str, info: Dict[str, Any]):
+            if event_name == "connection.connect_tcp.complete":
+                stats.new_connections += 1
+
+        request.extensions = {**request.extensions, "trace": trace}
+
+        # Spend the provider's rate-limit budget before taking a connection slot
+        limiter = self._pool.rate_limiter
+        if limiter is not None:
+            await limiter.acquire_for_host(host)
+
+        async with self._pool._host_semaphore(host):
+            stats.requests += 1
+            stats.in_flight += 1
+            stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+            try:
+                response = await self._transport.handle_async_request(request)
+            except Exception:
+                stats.errors += 1
+                raise
+            finally:
+                stats.in_flight -= 1
+
+        if response.status_code == 429 and limiter is not None:
+            limiter.throttle_host(host, parse_retry_after(response.headers.get("Retry-After")))
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class HTTPClientPool:
+    """Owns the shared httpx client and aiohttp session for the app's lifetime"""
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        per_host_limit: int = 10,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 10.0,
+        connect_timeout: float = 5.0,
+        rate_limiter: Optional[RateLimitScheduler] = None,
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.per_host_limit = per_host_limit
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.rate_limiter = rate_limiter
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._session = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._stats: Dict[str, _HostStats] = {}
+
+    def _host_stats(self, host: str) -> _HostStats:
+        stats = self._stats.get(host)
+        if stats is None:
+            stats = self._stats[host] = _HostStats()
+        return stats
+
+    def _host_semaphore(self, host: str) -> asyncio.Semaphore:
+        sem = self._semaphores.get(host)
+        if sem is None:
+            sem = self._semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return sem
+
+    def _build_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        transport = httpx.AsyncHTTPTransport(limits=limits, http2=HTTP2_AVAILABLE)
+        return httpx.AsyncClient(
+            transport=_LimitedTransport(transport, self),
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+        )
+
+    def _build_session(self):
+        async def on_connection_create_end(session, ctx, params):
+            self._host_stats(getattr(ctx, "host", "aiohttp")).new_connections += 1
+
+        async def on_request_start(session, ctx, params):
+            ctx.host = params.url.host
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_for_host(params.url.host)
+            stats = self._host_stats(params.url.host)
+            stats.requests += 1
+            stats.in_flight += 1
+            stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+
+        async def on_request_end(session, ctx, params):
+            self._host_stats(params.url.host).in_flight -= 1
+            if params.response.status == 429 and self.rate_limiter is not None:
+                self.rate_limiter.throttle_host(params.url.host, parse_retry_after(params.response.headers.get("Retry-After")))
+
+        async def on_request_exception(session, ctx, params):
+            stats = self._host_stats(params.url.host)
+            stats.in_flight -= 1
+            stats.errors += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            limit_per_host=self.per_host_limit,
+            keepalive_timeout=self.keepalive_expiry,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout * 2, connect=self.connect_timeout),
+            trace_configs=[trace_config],
+        )
+
+    async def start(self):
+        """Create the pooled clients; safe to call more than once"""
+        if self._client is None:
+            self._client = self._build_client()
+        if self._session is None and aiohttp is not None:
+            self._session = self._build_session()
+        logging.info(f"HTTP client pool started (http2={HTTP2_AVAILABLE}, per_host_limit={self.per_host_limit})")
+
+    async def close(self):
+        """Close the pooled clients and drop their keep-alive connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        logging.info("HTTP client pool closed")
+
+    @property
+    def httpx_client(self) -> httpx.AsyncClient:
+        # Created lazily so fetchers also work outside the app lifespan (scripts, tests)
+        if self._client is None:
+            self._client = self._build_client()
+        return self._client
+
+    @property
+    def aiohttp_session(self):
+        if aiohttp is None:
+            return None
+        if self._session is None or self._session.closed:
+            self._session = self._build_session()
+        return self._session
+
+    @asynccontextmanager
+    async def client(self):
+        """Yield the shared httpx client; unlike ``httpx.AsyncClient()`` it is not closed on exit"""
+        yield self.httpx_client
+
+    def stats(self) -> Dict[str, Any]:
+        """Report configured limits and per-host usage counters"""
+        hosts = {host: stats.to_dict() for host, stats in self._stats.items()}
+        return {
+            "http2": HTTP2_AVAILABLE,
+            "httpx_open": self._client is not None,
+            "aiohttp_open": self._session is not None and not self._session.closed,
+            "limits": {
+                "max_connections": self.max_connections,
+                "max_keepalive_connections": self.max_keepalive_connections,
+                "per_host_limit": self.per_host_limit,
+                "keepalive_expiry": self.keepalive_expiry,
+                "timeout": self.timeout,
+            },
+            "in_flight": sum(stats["in_flight"] for stats in hosts.values()),
+            "hosts": hosts,
+        }
+
+
+http_pool = HTTPClientPool(rate_limiter=rate_limiter)
@@ -0,0 +1,419 @@
+"""Incremental technical indicators, O(1) per new price.
+
+Each symbol keeps running state for the indicators we serve, reproducing the
+definitions used by the ``ta`` library (so results match a full recompute):
+
+- RSI: Wilder smoothing of gains/losses, ``ewm(alpha=1/14, adjust=False)``
+- EMA / MACD: ``ewm(span=n, adjust=False)`` recurrences, signal EMA seeded on
+  the first MACD value
+- SMA / Bollinger Bands: rolling sum and sum of squares (population std,
+  ``ddof=0``), shifted by the first price to limit cancellation error
+
+The state is seeded once from history and then advanced one closed bar at a
+time. Bars are keyed by their open time (``candle_open``) and only committed
+once their period has ended, so a state's ``last_ts`` is always a bar boundary.
+``preview`` evaluates every indicator as if a live price were the next
+bar, without committing it, which is what the API serves between bar closes.
+
+``compute_batch`` is the cross-symbol counterpart: it takes a time x symbol
+close matrix and evaluates the same indicators for every column at once, so
+its cost grows with the data rather than with the number of symbols.
+"""
+
+import math
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+RSI_WINDOW = 14
+MACD_FAST = 12
+MACD_SLOW = 26
+MACD_SIGNAL = 9
+SMA_SHORT = 20
+SMA_LONG = 50
+EMA_WINDOW = 12
+BB_WINDOW = 20
+BB_DEV = 2
+SUPPORT_RESISTANCE_WINDOW = 20
+
+# Minimum history before indicators are trusted (matches the old 50-point check)
+MIN_HISTORY = 50
+
+# Recompute rolling sums from the window this often to stop float drift
+_RESYNC_EVERY = 10000
+
+
+class _Ema:
+    """``ewm(alpha, adjust=False).mean()`` with ``min_periods``"""
+
+    __slots__ = ("alpha", "min_periods", "value", "count")
+
+    def __init__(self, alpha: float, min_periods: int):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value: Optional[float] = None
+        self.count = 0
+
+    @classmethod
+    def span(cls, n: int) -> "_Ema":
+        return cls(2.0 / (n + 1), n)
+
+    def peek(self, x: float) -> Tuple[Optional[float], int]:
+        value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        return value, self.count + 1
+
+    def push(self, x: float):
+        self.value, self.count = self.peek(x)
+
+    def ready(self, count: Optional[int] = None) -> bool:
+        return (self.count if count is None else count) >= self.min_periods
+
+
+class _RollingMoments:
+    """Rolling mean and population std over the last ``n`` values"""
+
+    __slots__ = ("n", "values", "shift", "sum", "sumsq", "pushes")
+
+    def __init__(self, n: int):
+        self.n = n
+        self.values: deque = deque(maxlen=n)
+        self.shift: Optional[float] = None
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self.pushes = 0
+
+    def _sums_with(self, x: float) -> Tuple[float, float, int]:
+        shift = x if self.shift is None else self.shift
+        d = x - shift
+        total, totalsq, count = self.sum + d, self.sumsq + d * d, len(self.values) + 1
+        if count > self.n:
+            old = self.values[0] - shift
+            total -= old
+            totalsq -= old * old
+            count = self.n
+        return total, totalsq, count
+
+    def peek(self, x: float) -> Tuple[Optional[float], Optional[float]]:
+        total, totalsq, count = self._sums_with(x)
+        if count < self.n:
+            return None, None
+        shift = x if self.shift is None else self.shift
+        mean = total / count
+        variance = max(totalsq / count - mean * mean, 0.0)
+        return mean + shift, math.sqrt(variance)
+
+    def push(self, x: float):
+        if self.shift is None:
+            self.shift = x
+        self.sum, self.sumsq, _ = self._sums_with(x)
+        self.values.append(x)
+        self.pushes += 1
+        if self.pushes % _RESYNC_EVERY == 0:
+            self.sum = sum(v - self.shift for v in self.values)
+            self.sumsq = sum((v - self.shift) ** 2 for v in self.values)
+
+    def current(self) -> Tuple[Optional[float], Optional[float]]:
+        if len(self.values) < self.n:
+            return None, None
+        mean = self.sum / self.n
+        return mean + self.shift, math.sqrt(max(self.sumsq / self.n - mean * mean, 0.0))
+
+
+class IndicatorState:
+    """Running indicator state for one price series"""
+
+    def __init__(self):
+        self.count = 0
+        self.last_price: Optional[float] = None
+        self.last_ts: Optional[float] = None
+
+        self._rsi_up = _Ema(1.0 / RSI_WINDOW, RSI_WINDOW)
+        self._rsi_down = _Ema(1.0 / RSI_WINDOW, RSI_WINDOW)
+        self._ema_fast = _Ema.span(MACD_FAST)
+        self._ema_slow = _Ema.span(MACD_SLOW)
+        self._ema = _Ema.span(EMA_WINDOW)
+        self._signal = _Ema.span(MACD_SIGNAL)
+        self._sma_short = _RollingMoments(SMA_SHORT)
+        self._sma_long = _RollingMoments(SMA_LONG)
+        self._bb = _RollingMoments(BB_WINDOW) if BB_WINDOW != SMA_SHORT else self._sma_short
+        self._recent: deque = deque(maxlen=SUPPORT_RESISTANCE_WINDOW)
+
+    def push(self, price: float, ts: Optional[float] = None):
+        """Commit one closed bar"""
+        price = float(price)
+        if self.last_price is not None:
+            diff = price - self.last_price
+            self._rsi_up.push(diff if diff > 0 else 0.0)
+            self._rsi_down.push(-diff if diff < 0 else 0.0)
+        self._ema_fast.push(price)
+        self._ema_slow.push(price)
+        self._ema.push(price)
+        if self._ema_slow.ready():
+            # ta masks MACD until the slow EMA has its min_periods, so the signal starts there
+            self._signal.push(self._ema_fast.value - self._ema_slow.value)
+        self._sma_short.push(price)
+        self._sma_long.push(price)
+        if self._bb is not self._sma_short:
+            self._bb.push(price)
+        self._recent.append(price)
+
+        self.count += 1
+        self.last_price = price
+        self.last_ts = time.time() if ts is None else ts
+
+    def seed(self, prices: Iterable[Tuple[float, float]]):
+        """Push ``(ts, price)`` history in order"""
+        for ts, price in prices:
+            self.push(price, ts)
+
+    def preview(self, price: Optional[float] = None) -> Dict[str, Any]:
+        """Indicator values with ``price`` as a tentative next bar (state is not changed).
+
+        Without ``price`` the values as of the last committed bar are returned.
+        Unavailable values are None.
+        """
+        if price is None:
+            return self._current()
+        price = float(price)
+
+        rsi = None
+        if self.last_price is not None:
+            diff = price - self.last_price
+            up, up_count = self._rsi_up.peek(diff if diff > 0 else 0.0)
+            down, down_count = self._rsi_down.peek(-diff if diff < 0 else 0.0)
+            if self._rsi_down.ready(down_count):
+                rsi = 100.0 if down == 0 else 100.0 - 100.0 / (1.0 + up / down)
+
+        fast, fast_count = self._ema_fast.peek(price)
+        slow, slow_count = self._ema_slow.peek(price)
+        ema, ema_count = self._ema.peek(price)
+        macd = signal = None
+        if self._ema_slow.ready(slow_count):
+            macd = fast - slow
+            signal_value, signal_count = self._signal.peek(macd)
+            signal = signal_value if self._signal.ready(signal_count) else None
+
+        sma_short, bb_std = self._sma_short.peek(price)
+        sma_long, _ = self._sma_long.peek(price)
+        if self._bb is not self._sma_short:
+            bb_mid, bb_std = self._bb.peek(price)
+        else:
+            bb_mid = sma_short
+
+        recent = list(self._recent)[1:] if len(self._recent) == self._recent.maxlen else list(self._recent)
+        recent.append(price)
+
+        return self._format(
+            rsi, macd, signal,
+            sma_short, sma_long, ema if self._ema.ready(ema_count) else None,
+            bb_mid, bb_std, max(recent), min(recent),
+        )
+
+    def _current(self) -> Dict[str, Any]:
+        rsi = None
+        if self._rsi_down.ready():
+            down, up = self._rsi_down.value, self._rsi_up.value
+            rsi = 100.0 if down == 0 else 100.0 - 100.0 / (1.0 + up / down)
+        macd = self._ema_fast.value - self._ema_slow.value if self._ema_slow.ready() else None
+        signal = self._signal.value if self._signal.ready() else None
+        sma_short, bb_std = self._sma_short.current()
+        sma_long, _ = self._sma_long.current()
+        bb_mid, bb_std = self._bb.current() if self._bb is not self._sma_short else (sma_short, bb_std)
+        return self._format(
+            rsi, macd, signal,
+            sma_short, sma_long, self._ema.value if self._ema.ready() else None,
+            bb_mid, bb_std,
+            max(self._recent) if self._recent else None, min(self._recent) if self._recent else None,
+        )
+
+    @staticmethod
+    def _format(rsi, macd, signal, sma_short, sma_long, ema, bb_mid, bb_std, resistance, support) -> Dict[str, Any]:
+        histogram = macd - signal if macd is not None and signal is not None else None
+        upper = bb_mid + BB_DEV * bb_std if bb_mid is not None else None
+        lower = bb_mid - BB_DEV * bb_std if bb_mid is not None else None
+        return {
+            "rsi": rsi,
+            "macd": {"macd": macd, "signal": signal, "histogram": histogram},
+            "moving_averages": {"sma_20": sma_short, "sma_50": sma_long, "ema_12": ema},
+            "bollinger_bands": {"upper": upper, "middle": bb_mid, "lower": lower},
+            "support_resistance": {"resistance": resistance, "support": support},
+        }
+
+
+def candle_open(ts: float, bar_seconds: float) -> int:
+    """Open time (epoch seconds) of the bar containing ``ts``"""
+    return int(ts // bar_seconds * bar_seconds)
+
+
+def build_state(ts_ms: np.ndarray, prices: np.ndarray) -> IndicatorState:
+    """IndicatorState seeded from closed bars (``ts_ms`` in epoch milliseconds).
+
+    A plain function of arrays returning a picklable state, so seeding can run
+    in an analytics worker.
+    """
+    state = IndicatorState()
+    state.seed(zip((ts_ms / 1000).tolist(), prices.tolist()))
+    return state
+
+
+class IndicatorEngine:
+    """Per-symbol IndicatorState, seeded from closed bars and advanced bar by bar"""
+
+    def __init__(self, bar_seconds: float = 3600.0):
+        self.bar_seconds = bar_seconds
+        self._states: Dict[str, IndicatorState] = {}
+        self.seeds = 0
+        self.bars_pushed = 0
+        self.previews = 0
+
+    def has(self, symbol: str) -> bool:
+        state = self._states.get(symbol)
+        return state is not None and state.count >= MIN_HISTORY
+
+    def state(self, symbol: str) -> Optional[IndicatorState]:
+        return self._states.get(symbol)
+
+    def seed(self, symbol: str, history: Iterable[Tuple[float, float]]) -> IndicatorState:
+        """Replace ``symbol``'s state with one built from ``(open ts, close)`` closed bars"""
+        state = IndicatorState()
+        state.seed(history)
+        return self.install(symbol, state)
+
+    def install(self, symbol: str, state: IndicatorState) -> IndicatorState:
+        """Replace ``symbol``'s state with one seeded elsewhere (e.g. by ``build_state`` in a worker)"""
+        self._states[symbol] = state
+        self.seeds += 1
+        return state
+
+    def push(self, symbol: str, price: float, ts: float):
+        self._states[symbol].push(price, ts)
+        self.bars_pushed += 1
+
+    def needs_reseed(self, symbol: str, now: Optional[float] = None) -> bool:
+        """True when we hold no state or missed more than one bar (the gap can't be filled locally)"""
+        state = self._states.get(symbol)
+        if state is None or state.count < MIN_HISTORY:
+            return True
+        return (time.time() if now is None else now) - state.last_ts >= 2 * self.bar_seconds
+
+    def advance(self, symbol: str, ts_ms: np.ndarray, closes: np.ndarray) -> int:
+        """Commit the closed bars (open times in epoch ms, oldest first) newer than the last one; returns how many"""
+        state = self._states[symbol]
+        start = int(np.searchsorted(ts_ms, candle_open(state.last_ts, self.bar_seconds) * 1000, side="right"))
+        for ts, price in zip(ts_ms[start:].tolist(), closes[start:].tolist()):
+            self.push(symbol, price, ts / 1000)
+        return len(ts_ms) - start
+
+    def on_price(self, symbol: str, price: float) -> Dict[str, Any]:
+        """Indicator values with a live price previewed as the still-open bar (nothing is committed)"""
+        self.previews += 1
+        return self._states[symbol].preview(price)
+
+    def candle_ts(self, symbol: str) -> Optional[int]:
+        """Open time (epoch seconds) of ``symbol``'s last closed bar; None without usable state.
+
+        This is the version of everything derived from closed bars: it only
+        changes when a new bar closes.
+        """
+        if not self.has(symbol):
+            return None
+        return candle_open(self._states[symbol].last_ts, self.bar_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "symbols": len(self._states),
+            "bar_seconds": self.bar_seconds,
+            "seeds": self.seeds,
+            "bars_pushed": self.bars_pushed,
+            "previews": self.previews,
+            "bars": {symbol: state.count for symbol, state in self._states.items()},
+        }
+
+
+def align_closes(series: Sequence[Tuple[np.ndarray, np.ndarray]], bar_ms: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Align per-symbol ``(ts_ms, close)`` bar series on one bar grid.
+
+    Returns ``(grid_ts, closes)`` where ``closes`` is a time x symbol float64
+    matrix. Cells before a symbol's first bar are NaN; gaps after it carry the
+    previous close forward.
+    """
+    buckets = [ts // bar_ms for ts, _ in series if len(ts)]
+    if not buckets:
+        return np.empty(0, dtype=np.int64), np.empty((0, len(series)))
+    first = min(int(b[0]) for b in buckets)
+    last = max(int(b[-1]) for b in buckets)
+    closes = np.full((last - first + 1, len(series)), np.nan)
+    for column, (ts, close) in enumerate(series):
+        if len(ts):
+            closes[ts // bar_ms - first, column] = close
+
+    # Vectorized forward fill: index of the latest valid row at or above each cell
+    rows = np.where(np.isnan(closes), 0, np.arange(len(closes))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    closes = closes[rows, np.arange(closes.shape[1])]
+    return (np.arange(first, last + 1, dtype=np.int64) * bar_ms), closes
+
+
+def _last_ewm(frame: pd.DataFrame, **kwargs) -> np.ndarray:
+    return frame.ewm(adjust=False, **kwargs).mean().to_numpy()[-1]
+
+
+def compute_batch(closes: np.ndarray) -> List[Optional[Dict[str, Any]]]:
+    """Latest indicator values for every column of a time x symbol close matrix.
+
+    Uses the same definitions as IndicatorState (and ``ta``). Recurrences run
+    down the time axis for all columns together; windowed values only touch
+    the last rows. Columns with fewer than MIN_HISTORY closes yield None.
+    """
+    if closes.ndim != 2 or not len(closes):
+        return [None] * (closes.shape[1] if closes.ndim == 2 else 0)
+    frame = pd.DataFrame(closes, copy=False)
+
+    diff = frame.diff()
+    up = _last_ewm(diff.clip(lower=0.0), alpha=1.0 / RSI_WINDOW, min_periods=RSI_WINDOW)
+    down = _last_ewm((-diff).clip(lower=0.0), alpha=1.0 / RSI_WINDOW, min_periods=RSI_WINDOW)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(down == 0, 100.0, 100.0 - 100.0 / (1.0 + up / down))
+    rsi[np.isnan(down)] = np.nan
+
+    fast = frame.ewm(span=MACD_FAST, min_periods=MACD_FAST, adjust=False).mean()
+    slow = frame.ewm(span=MACD_SLOW, min_periods=MACD_SLOW, adjust=False).mean()
+    macd_frame = fast - slow
+    macd = macd_frame.to_numpy()[-1]
+    signal = _last_ewm(macd_frame, span=MACD_SIGNAL, min_periods=MACD_SIGNAL)
+    ema = _last_ewm(frame, span=EMA_WINDOW, min_periods=EMA_WINDOW)
+
+    # Windowed statistics need only the trailing rows; a NaN anywhere in them means "not enough data"
+    sma_short = closes[-SMA_SHORT:].mean(axis=0) if len(closes) >= SMA_SHORT else np.full(closes.shape[1], np.nan)
+    sma_long = closes[-SMA_LONG:].mean(axis=0) if len(closes) >= SMA_LONG else np.full(closes.shape[1], np.nan)
+    if len(closes) >= BB_WINDOW:
+        bb_window = closes[-BB_WINDOW:]
+        bb_mid = bb_window.mean(axis=0)
+        bb_std = bb_window.std(axis=0, ddof=0)
+    else:
+        bb_mid = bb_std = np.full(closes.shape[1], np.nan)
+    recent = closes[-SUPPORT_RESISTANCE_WINDOW:]
+    resistance = recent.max(axis=0)
+    support = recent.min(axis=0)
+
+    counts = np.count_nonzero(~np.isnan(closes), axis=0)
+
+    def value(array: np.ndarray, column: int) -> Optional[float]:
+        v = float(array[column])
+        return None if math.isnan(v) else v
+
+    results: List[Optional[Dict[str, Any]]] = []
+    for column in range(closes.shape[1]):
+        if counts[column] < MIN_HISTORY:
+            results.append(None)
+            continue
+        results.append(IndicatorState._format(
+            value(rsi, column), value(macd, column), value(signal, column),
+            value(sma_short, column), value(sma_long, column), value(ema, column),
+            value(bb_mid, column), value(bb_std, column),
+            value(resistance, column), value(support, column),
+        ))
+    return results
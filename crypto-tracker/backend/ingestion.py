@@ -0,0 +1,256 @@
+"""Background ingestion decoupled from the request path.
+
+An IngestionScheduler runs one polling loop per job (prices, market overview,
+indicators, news), each on its own cadence. Every successful poll publishes a
+new immutable MarketSnapshot; the scheduler swaps its reference in a single
+assignment, so readers always see a consistent snapshot without locking and
+request handlers never wait on upstream APIs.
+
+With a SharedCache attached, published values are mirrored to the shared
+store and a job whose keys another worker refreshed within the job's interval
+adopts that result instead of polling upstream again.
+
+With a LeaderElector attached, only the elected leader polls upstream; every
+other process is a follower that adopts whatever the leader last published to
+the shared snapshot.
+"""
+
+import asyncio
+import logging
+import time
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Set, Tuple
+
+# How long mirrored snapshot values live in the shared store
+SHARED_SNAPSHOT_TTL = 3600
+
+
+class MarketSnapshot:
+    """Immutable set of ingested values, each stamped with when it was fetched"""
+
+    __slots__ = ("_values", "version", "created_at")
+
+    def __init__(self, values: Mapping[str, Tuple[Any, float]], version: int, created_at: float):
+        self._values = MappingProxyType(dict(values))
+        self.version = version
+        self.created_at = created_at
+
+    @classmethod
+    def empty(cls) -> "MarketSnapshot":
+        return cls({}, 0, time.time())
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._values
+
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self._values.get(key)
+        return entry[0] if entry is not None else default
+
+    def updated_at(self, key: str) -> Optional[float]:
+        entry = self._values.get(key)
+        return entry[1] if entry is not None else None
+
+    def age(self, key: str, now: Optional[float] = None) -> Optional[float]:
+        """Seconds since ``key`` was last ingested, or None if it never was"""
+        updated_at = self.updated_at(key)
+        if updated_at is None:
+            return None
+        return round((time.time() if now is None else now) - updated_at, 3)
+
+    def ages(self) -> Dict[str, float]:
+        now = time.time()
+        return {key: self.age(key, now) for key in self._values}
+
+    def with_values(self, updates: Mapping[str, Any], updated_at: Optional[float] = None) -> "MarketSnapshot":
+        """Return a new snapshot with ``updates`` applied; this one is left untouched"""
+        updated_at = time.time() if updated_at is None else updated_at
+        return self.with_entries({key: (value, updated_at) for key, value in updates.items()})
+
+    def with_entries(self, entries: Mapping[str, Tuple[Any, float]]) -> "MarketSnapshot":
+        """Like with_values, but each entry carries its own fetch time"""
+        values = dict(self._values)
+        values.update(entries)
+        return MarketSnapshot(values, self.version + 1, time.time())
+
+
+class IngestionJob:
+    """One upstream poll and its schedule and run statistics"""
+
+    def __init__(
+        self,
+        name: str,
+        interval: float,
+        fetch: Callable[[], Awaitable[Mapping[str, Any]]],
+        keys: Optional[List[str]] = None,
+        max_backoff: float = 300.0,
+    ):
+        self.name = name
+        self.interval = interval
+        self.fetch = fetch
+        self.keys = keys or []
+        self.max_backoff = max_backoff
+
+        self.runs = 0
+        self.adopted = 0
+        self.followed = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_run_at: Optional[float] = None
+        self.last_success_at: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def next_delay(self) -> float:
+        if self.consecutive_failures:
+            # Back off exponentially while the upstream keeps failing
+            return min(self.interval * (2 ** self.consecutive_failures), max(self.max_backoff, self.interval))
+        return self.interval
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval": self.interval,
+            "runs": self.runs,
+            "adopted_from_shared": self.adopted,
+            "follower_polls": self.followed,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_run_at": self.last_run_at,
+            "last_success_at": self.last_success_at,
+            "last_duration_ms": round(self.last_duration * 1000, 2) if self.last_duration is not None else None,
+            "last_error": self.last_error,
+        }
+
+
+class IngestionScheduler:
+    """Polls upstream jobs on their own cadences and publishes snapshots atomically"""
+
+    def __init__(self, shared=None, leader=None):
+        self._snapshot = MarketSnapshot.empty()
+        self._jobs: Dict[str, IngestionJob] = {}
+        self._tasks: List[asyncio.Task] = []
+        self.shared = shared
+        self.leader = leader
+        self._mirroring: Set[asyncio.Task] = set()
+
+    @property
+    def snapshot(self) -> MarketSnapshot:
+        return self._snapshot
+
+    @property
+    def is_leader(self) -> bool:
+        return self.leader is None or self.leader.is_leader
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    def add_job(
+        self,
+        name: str,
+        interval: float,
+        fetch: Callable[[], Awaitable[Mapping[str, Any]]],
+        keys: Optional[List[str]] = None,
+    ) -> IngestionJob:
+        """Register a poll; ``keys`` lists the snapshot keys it produces, for shared adoption"""
+        job = IngestionJob(name, interval, fetch, keys)
+        self._jobs[name] = job
+        return job
+
+    def publish(self, updates: Mapping[str, Any], updated_at: Optional[float] = None) -> MarketSnapshot:
+        # Build the new snapshot first, then swap the reference in one assignment
+        updated_at = time.time() if updated_at is None else updated_at
+        snapshot = self._snapshot.with_values(updates, updated_at)
+        self._snapshot = snapshot
+        if self.shared is not None:
+            self._mirror({key: [value, updated_at] for key, value in updates.items()})
+        return snapshot
+
+    def _mirror(self, entries: Dict[str, Any]):
+        task = asyncio.ensure_future(self.shared.set_many("snapshot", entries, ttl=SHARED_SNAPSHOT_TTL))
+        self._mirroring.add(task)
+        task.add_done_callback(self._mirroring.discard)
+
+    async def adopt_shared(self, keys: List[str], max_age: float, partial: bool = False) -> bool:
+        """Adopt ``keys`` from the shared snapshot if all are younger than ``max_age``.
+
+        With ``partial`` whichever keys are found are adopted, regardless of age.
+        """
+        if self.shared is None or not keys:
+            return False
+        entries = await self.shared.get_many("snapshot", keys)
+        if partial:
+            if not entries:
+                return False
+        else:
+            now = time.time()
+            if len(entries) < len(keys) or any(now - updated_at >= max_age for _, updated_at in entries.values()):
+                return False
+        local = self._snapshot
+        if all(local.updated_at(key) == updated_at for key, (_, updated_at) in entries.items()):
+            return True
+        self._snapshot = local.with_entries({key: (value, updated_at) for key, (value, updated_at) in entries.items()})
+        return True
+
+    async def run_once(self, name: str) -> Optional[MarketSnapshot]:
+        """Run one poll of ``name`` and publish its result"""
+        job = self._jobs[name]
+        if not self.is_leader:
+            # Followers never poll upstream; they consume what the leader published
+            job.followed += 1
+            if await self.adopt_shared(job.keys, job.interval, partial=True):
+                job.adopted += 1
+            return self._snapshot
+
+        if await self.adopt_shared(job.keys, job.interval):
+            # Another worker already refreshed these keys within this job's interval
+            job.adopted += 1
+            return self._snapshot
+
+        started = time.perf_counter()
+        job.runs += 1
+        job.last_run_at = time.time()
+        try:
+            updates = await job.fetch()
+        except Exception as e:
+            job.failures += 1
+            job.consecutive_failures += 1
+            job.last_error = str(e)
+            logging.error(f"Ingestion job {name} failed ({job.consecutive_failures} in a row): {e}")
+            return None
+        finally:
+            job.last_duration = time.perf_counter() - started
+
+        job.consecutive_failures = 0
+        job.last_error = None
+        job.last_success_at = time.time()
+        return self.publish(updates) if updates else self._snapshot
+
+    async def _run_forever(self, job: IngestionJob):
+        while True:
+            await self.run_once(job.name)
+            await asyncio.sleep(job.next_delay())
+
+    def start(self):
+        if self.running:
+            return
+        self._tasks = [
+            asyncio.create_task(self._run_forever(job), name=f"ingestion:{job.name}")
+            for job in self._jobs.values()
+        ]
+        logging.info(f"Ingestion scheduler started with jobs: {', '.join(self._jobs)}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "running": self.running,
+            "role": "leader" if self.is_leader else "follower",
+            "snapshot_version": snapshot.version,
+            "jobs": {name: job.stats() for name, job in self._jobs.items()},
+            "data_age_seconds": snapshot.ages(),
+        }
@@ -0,0 +1,126 @@
+"""Lease-based leader election across workers and hosts.
+
+Every process runs a LeaderElector against the same shared store. The lease is
+a single key set-if-absent with an expiry; only its holder may renew or
+release it (compare-and-set scripts on Redis). The holder renews well before
+the lease expires, so exactly one process is leader at a time, and when the
+leader dies a follower takes over within ``lease_ttl + renew_interval``.
+
+Leadership is also dropped locally once the lease would have expired without a
+confirmed renewal, so a leader cut off from the store stops polling before
+another process can be elected.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+
+def default_owner_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaderElector:
+    """Holds or contends for one named lease in the shared store"""
+
+    def __init__(
+        self,
+        shared,
+        name: str = "ingestion-leader",
+        lease_ttl: float = 10.0,
+        renew_interval: Optional[float] = None,
+        owner_id: Optional[str] = None,
+    ):
+        self.shared = shared
+        self.name = name
+        self.lease_ttl = lease_ttl
+        self.renew_interval = renew_interval if renew_interval is not None else lease_ttl / 3
+        self.owner_id = owner_id or default_owner_id()
+
+        self._valid_until = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+        self.elections_won = 0
+        self.leadership_lost = 0
+        self.renewals = 0
+        self.renew_failures = 0
+        self.became_leader_at: Optional[float] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return time.monotonic() < self._valid_until
+
+    @property
+    def failover_bound(self) -> float:
+        """Longest time the lease can go unheld after the leader disappears"""
+        return self.lease_ttl + self.renew_interval
+
+    async def campaign(self) -> bool:
+        """Try once to take or renew the lease; returns whether we lead afterwards"""
+        if self.became_leader_at is not None and not self.is_leader:
+            # The lease lapsed since the last successful renewal
+            self._step_down()
+        was_leader = self.is_leader
+        # Measure validity from before the round trip so we never overestimate it
+        started = time.monotonic()
+        acquired = await self.shared.acquire_lease(self.name, self.owner_id, self.lease_ttl)
+        if acquired:
+            self._valid_until = started + self.lease_ttl
+            if was_leader:
+                self.renewals += 1
+            else:
+                self.elections_won += 1
+                self.became_leader_at = time.time()
+                logging.info(f"{self.owner_id} is now leader for {self.name}")
+        elif was_leader:
+            # Nobody else can take the lease before it expires, so keep leading
+            # until then and retry on the next round
+            self.renew_failures += 1
+        return self.is_leader
+
+    def _step_down(self):
+        self._valid_until = 0.0
+        self.became_leader_at = None
+        self.leadership_lost += 1
+        logging.warning(f"{self.owner_id} lost leadership for {self.name}")
+
+    async def _run_forever(self):
+        while True:
+            try:
+                await self.campaign()
+            except Exception as e:
+                logging.error(f"Leader election for {self.name} failed: {e}")
+            await asyncio.sleep(self.renew_interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_forever(), name=f"leader:{self.name}")
+
+    async def stop(self):
+        """Stop campaigning and hand the lease back so a follower takes over immediately"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.is_leader:
+            await self.shared.release_lease(self.name, self.owner_id)
+        self._valid_until = 0.0
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "owner_id": self.owner_id,
+            "is_leader": self.is_leader,
+            "leader": await self.shared.lease_holder(self.name),
+            "lease_ttl": self.lease_ttl,
+            "renew_interval": round(self.renew_interval, 3),
+            "failover_bound_seconds": round(self.failover_bound, 3),
+            "elections_won": self.elections_won,
+            "renewals": self.renewals,
+            "renew_failures": self.renew_failures,
+            "leadership_lost": self.leadership_lost,
+            "became_leader_at": self.became_leader_at,
+        }
@@ -1,18 +1,15 @@
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Set, Union
 import httpx
 import asyncio
 from datetime import datetime, timedelta
 import os
+import time
 from dotenv import load_dotenv
-import pandas as pd
 import numpy as np
-import ta
-from ta.trend import SMAIndicator, EMAIndicator, MACD
-from ta.momentum import RSIIndicator
-from ta.volatility import BollingerBands
 import json
 import subprocess
 import sys
@@ -26,9 +23,30 @@ class DateTimeEncoder(json.JSONEncoder):
 import logging
 from contextlib import asynccontextmanager
 
+from http_pool import http_pool
+from ratelimit import rate_limiter, request_priority, PRIORITY_REFRESH, PRIORITY_BACKFILL
+from singleflight import SingleFlight
+from cache import AsyncCache, FRESH, STALE, NEGATIVE
+from ticks import TickStore
+from indicators import IndicatorEngine, MIN_HISTORY, align_closes, build_state, compute_batch
+from executor import AnalyticsExecutor, LoopLagMonitor
+from recommendations import score_recommendation, technical_score
+from database import create_database
+from backtest import MAX_HOLD_LIMIT, RULE_SETS, backtest, load_universe
+from candles import Bars, CandleAggregator, TIMEFRAMES, trailing_run
+from history import HistoryStore, PriceHistory
+from ingestion import IngestionScheduler
+from shared_store import create_shared_cache
+from leader import LeaderElector
+from router import QuoteRouter
+from subscriptions import TopicIndex, normalize_topic, parse_topic
+from delta import DeltaStream
+from outbox import DEFAULT_MAX_QUEUE, ClientOutbox
+from wire import DEFAULT_FORMAT, Frame, WireCodec, negotiate
+
 # Import our custom crypto price service
 try:
-    from getCryptoPrice import fetch_top_assets
+    from getCryptoPrice import fetch_top_assets, stream_top_assets, AdaptiveLimiter
     CRYPTO_PRICE_SERVICE_AVAILABLE = True
 except ImportError:
     print("Warning: getCryptoPrice.py service not available")
@@ -36,6 +54,9 @@ except ImportError:
 
 load_dotenv()
 
+# Optional second price provider (CryptoAPIs); without a key CoinGecko is the only upstream
+CRYPTO_API_KEY = os.getenv("CRYPTO_API_KEY")
+
 app = FastAPI(title="Crypto Tracker API", version="2.0.0")
 
 # Configure CORS
@@ -93,56 +114,283 @@ class CryptoNews(BaseModel):
     published_at: datetime
     sentiment: Optional[str] = None
 
-# Global cache for API rate limiting
-price_cache = {}
-cache_expiry = {}
+# Coalesce concurrent cache misses so each key costs one upstream fetch
+price_flight = SingleFlight("prices")
+indicator_flight = SingleFlight("indicators")
+overview_flight = SingleFlight("market_overview")
+news_flight = SingleFlight("news")
+history_flight = SingleFlight("history")
+initial_data_flight = SingleFlight("initial_data")
 
-# News cache for crypto news
-news_cache = {}
-news_cache_expiry = {}
+# Global cache for API rate limiting, one namespace per data type.
+# Stale entries are served while a background refresh runs; failures are
+# remembered for negative_ttl seconds so a broken upstream is not retried by every caller.
+# Optional Redis (REDIS_URL) so every uvicorn worker shares one cache and one fetch result
+shared_cache = create_shared_cache(os.getenv("REDIS_URL"))
+# Optional SQL store for precomputed recommendations (DATABASE_URL, any SQLAlchemy URL)
+database = create_database(os.getenv("DATABASE_URL"))
 
+data_cache = AsyncCache(shared=shared_cache)
+data_cache.configure("prices", ttl=3, stale_ttl=30, negative_ttl=5, max_entries=256, flight=price_flight)
+data_cache.configure("market_overview", ttl=10, stale_ttl=60, negative_ttl=10, max_entries=8, flight=overview_flight)
+data_cache.configure("news", ttl=300, stale_ttl=900, negative_ttl=60, max_entries=8, flight=news_flight)
 # CRITICAL: 30-second cache for expensive CryptoAPIs service to avoid high costs
-crypto_apis_cache = {}
-crypto_apis_cache_expiry = None
+data_cache.configure("crypto_apis", ttl=30, max_entries=8)
+# Memoized per (symbol, timeframe, last candle); the TTL only bounds how long superseded candles linger
+data_cache.configure("indicators", ttl=2 * 3600, max_entries=256)
+data_cache.configure("recommendations", ttl=2 * 3600, max_entries=256)
+
+# Rolling 24h high/low/open/VWAP from every price we ingest
+tick_store = TickStore()
 
 # WebSocket connection manager
 class ConnectionManager:
-    def __init__(self):
+    def __init__(self, codec: WireCodec):
         self.active_connections: List[WebSocket] = []
         self.last_broadcast_data = {}
+        # Clients that sent a subscribe get only their topics; the others keep the full market_update
+        self.topics = TopicIndex()
+        # Last published version per topic key: (price, 24h change) per symbol, fetch time otherwise
+        self._published: Dict[str, Any] = {}
+        # Clients on the delta stream get snapshot + delta messages instead of market_update
+        self.deltas = DeltaStream()
+        self.delta_clients: Set[WebSocket] = set()
+        self.messages_sent = 0
+        self.bytes_sent = 0
+        # Per connection: a bounded, conflating queue drained by its own writer task
+        self.outboxes: Dict[WebSocket, ClientOutbox] = {}
+        self.max_queue = int(os.getenv("WS_MAX_QUEUE", str(DEFAULT_MAX_QUEUE)))
+        # Messages are Frames encoded at most once per wire format in use
+        self.codec = codec
+        # initial_data for new connections, versioned by the ingestion snapshot it was built from
+        self.initial_data: Optional[Frame] = None
+        self.initial_version: Optional[int] = None
+        self.initial_data_builds = 0
+        self.initial_data_served = 0
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
+    async def connect(
+        self,
+        websocket: WebSocket,
+        client_id: Optional[str] = None,
+        wire_format: str = DEFAULT_FORMAT,
+        subprotocol: Optional[str] = None
+    ):
+        await websocket.accept(subprotocol=subprotocol)
         self.active_connections.append(websocket)
+        outbox = ClientOutbox(
+            websocket, client_id, wire_format=wire_format, max_queue=self.max_queue,
+            on_sent=self._count, on_error=self.disconnect
+        )
+        self.outboxes[websocket] = outbox
+        outbox.start()
         logging.info(f"WebSocket connected. Total connections: {len(self.active_connections)}")
 
     def disconnect(self, websocket: WebSocket):
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
+        self.topics.unsubscribe(websocket)
+        self.delta_clients.discard(websocket)
+        outbox = self.outboxes.pop(websocket, None)
+        if outbox is not None:
+            outbox.close()
         logging.info(f"WebSocket disconnected. Total connections: {len(self.active_connections)}")
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
         try:
-            await websocket.send_text(message)
-        except:
+            await self.send(websocket, message)
+        except WebSocketDisconnect:
             self.disconnect(websocket)
 
     async def broadcast(self, data: dict):
         # Only broadcast if data has changed significantly
         if self._has_significant_change(data):
             self.last_broadcast_data = data
-            message = json.dumps(data, cls=DateTimeEncoder)
-            disconnected = []
-            
-            for connection in self.active_connections:
-                try:
-                    await connection.send_text(message)
-                except:
-                    disconnected.append(connection)
-            
-            # Clean up disconnected websockets
-            for conn in disconnected:
-                self.disconnect(conn)
+            message = Frame(data)
+            # Subscribed and delta clients are served by publish_topics and publish_deltas instead
+            self._send_many(self.broadcast_clients(), message, key="market_update")
+
+    def broadcast_clients(self) -> List[WebSocket]:
+        """Clients on the full market_update broadcast (neither subscribed to topics nor on the delta stream)"""
+        return [
+            connection for connection in self.active_connections
+            if not self.topics.is_subscribed(connection) and connection not in self.delta_clients
+        ]
+
+    def _count(self, message: Union[str, bytes]):
+        self.messages_sent += 1
+        self.bytes_sent += len(message)
+
+    async def send(self, websocket: WebSocket, message: Union[str, Frame], key: Optional[str] = None):
+        """Queue a message for one client; raises WebSocketDisconnect once its writer has stopped.
+
+        Pre-encoded JSON replies go out as is, except to MessagePack clients, which get them re-encoded.
+        """
+        outbox = self.outboxes.get(websocket)
+        if outbox is None or outbox.closed:
+            raise WebSocketDisconnect()
+        if isinstance(message, str):
+            if outbox.wire_format != "msgpack":
+                outbox.put(message, key)
+                return
+            message = Frame(json.loads(message))
+        outbox.put(self.codec.encode(message, outbox.wire_format), key)
+
+    def _send_many(self, connections, frame: Frame, key: Optional[str] = None):
+        """Queue one frame on each connection's outbox, encoded once per format; never waits on a socket"""
+        for connection in connections:
+            outbox = self.outboxes.get(connection)
+            if outbox is not None and not outbox.closed:
+                outbox.put(self.codec.encode(frame, outbox.wire_format), key)
+
+    @staticmethod
+    def _encode(kind: str, data: Any, **extra) -> Frame:
+        return Frame({"type": kind, "data": data, **extra, "timestamp": datetime.now().isoformat()})
+
+    def _topic_messages(self, snapshot, topic: str) -> List[str]:
+        """Current state of one topic, sent to a client when it subscribes"""
+        channel, symbol = parse_topic(topic)
+        prices = snapshot.get("prices") or []
+        if channel == "prices":
+            if symbol is None:
+                return [("prices", self._encode("prices_update", prices))] if prices else []
+            return [
+                (topic, self._encode("price_update", price, symbol=symbol))
+                for price in prices if price["symbol"] == symbol
+            ]
+        if channel == "indicators":
+            symbols = [symbol] if symbol else [price["symbol"] for price in prices]
+            return [
+                (f"indicators:{sym}", self._encode("indicators_update", snapshot.get(f"indicators:{sym}"), symbol=sym))
+                for sym in symbols if f"indicators:{sym}" in snapshot
+            ]
+        key = "market_overview" if channel == "overview" else channel
+        return [(channel, self._encode(f"{channel}_update", snapshot.get(key)))] if key in snapshot else []
+
+    async def subscribe(self, websocket: WebSocket, topics: List[str], snapshot) -> Set[str]:
+        """Add topics for a client and send it their current state; returns the newly added ones"""
+        added = self.topics.subscribe(websocket, topics)
+        for topic in sorted(added):
+            for key, message in self._topic_messages(snapshot, topic):
+                await self.send(websocket, message, key=key)
+        return added
+
+    def publish_topics(self, snapshot):
+        """Send what changed since the last call to the subscribers of each topic only.
+
+        Every message is encoded once and shared by all its recipients, so a
+        tick costs work in proportion to the clients interested in what changed.
+        Messages are keyed by topic, so a slow client keeps only the latest per topic;
+        prices_update carries the whole board for the same reason.
+        """
+        prices = snapshot.get("prices") or []
+        changed = []
+        for price in prices:
+            key = f"prices:{price['symbol']}"
+            version = (price.get("price"), price.get("change_24h"))
+            if self._published.get(key) != version:
+                self._published[key] = version
+                changed.append(price)
+        if changed:
+            channel = self.topics.subscribers("prices")
+            if channel:
+                self._send_many(channel, self._encode("prices_update", prices), key="prices")
+            for price in changed:
+                topic = f"prices:{price['symbol']}"
+                if self.topics.has_subscribers(topic):
+                    # Channel subscribers already got this symbol in prices_update
+                    recipients = self.topics.subscribers(topic) - channel
+                    if recipients:
+                        self._send_many(recipients, self._encode("price_update", price, symbol=price["symbol"]), key=topic)
+
+        for price in prices:
+            key = f"indicators:{price['symbol']}"
+            version = snapshot.updated_at(key)
+            if version is None or self._published.get(key) == version:
+                continue
+            self._published[key] = version
+            recipients = self.topics.subscribers("indicators") | self.topics.subscribers(key)
+            if recipients:
+                self._send_many(recipients, self._encode("indicators_update", snapshot.get(key), symbol=price["symbol"]), key=key)
+
+        for channel, key in (("overview", "market_overview"), ("news", "news")):
+            version = snapshot.updated_at(key)
+            if version is None or self._published.get(key) == version:
+                continue
+            self._published[key] = version
+            if self.topics.has_subscribers(channel):
+                self._send_many(self.topics.subscribers(channel), self._encode(f"{channel}_update", snapshot.get(key)), key=channel)
+
+    def initial_data_message(self, market_data: Dict[str, Any], version: Optional[int]) -> Frame:
+        frame = Frame({
+            "type": "initial_data",
+            "data": market_data,
+            "version": version,
+            "timestamp": datetime.now().isoformat()
+        })
+        # Encode the default format up front; a connect then only queues the bytes
+        self.codec.encode(frame, DEFAULT_FORMAT)
+        return frame
+
+    def set_initial_data(self, market_data: Dict[str, Any], version: int):
+        self.initial_data = self.initial_data_message(market_data, version)
+        self.initial_version = version
+        self.initial_data_builds += 1
+
+    @staticmethod
+    def _delta_state(market_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "prices": {price["symbol"]: price for price in market_data.get("prices") or []},
+            "overview": market_data.get("overview") or {},
+        }
+
+    def publish_deltas(self, market_data: Dict[str, Any]):
+        """Advance the delta stream and send what changed, encoded once, to every delta client"""
+        delta = self.deltas.update(self._delta_state(market_data))
+        if delta is not None and self.delta_clients:
+            # Unkeyed: deltas cannot be conflated, a client that drops one resyncs
+            self._send_many(self.delta_clients, self._encode("delta", delta["data"], seq=delta["seq"]))
+
+    async def start_deltas(self, websocket: WebSocket, market_data: Dict[str, Any]):
+        """Put a client on the delta stream (or resync it) from a fresh server-side snapshot"""
+        outbox = self.outboxes.get(websocket)
+        if outbox is None or outbox.closed:
+            raise WebSocketDisconnect()
+        # Bring the stream up to date first so existing delta clients keep a gapless sequence
+        self.publish_deltas(market_data)
+        snapshot = self.deltas.snapshot()
+        # No await from here on: a delta published between the snapshot and joining would be lost.
+        # Unkeyed messages leave the outbox in order, so the snapshot still goes out before any delta.
+        self.delta_clients.add(websocket)
+        outbox.put(self.codec.encode(self._encode("snapshot", snapshot["data"], seq=snapshot["seq"]), outbox.wire_format))
+
+    def stats(self) -> Dict[str, Any]:
+        clients = [outbox.stats() for outbox in self.outboxes.values()]
+        formats: Dict[str, int] = {}
+        for outbox in self.outboxes.values():
+            formats[outbox.wire_format] = formats.get(outbox.wire_format, 0) + 1
+        return {
+            "connections": len(self.active_connections),
+            "connections_by_format": formats,
+            "initial_data": {
+                "version": self.initial_version,
+                "builds": self.initial_data_builds,
+                "served": self.initial_data_served,
+            },
+            "wire": self.codec.stats(),
+            "broadcast_clients": len(self.broadcast_clients()),
+            "delta_clients": len(self.delta_clients),
+            "messages_sent": self.messages_sent,
+            "bytes_sent": self.bytes_sent,
+            "max_queue": self.max_queue,
+            "queued": sum(client["queue_depth"] for client in clients),
+            "conflated": sum(client["conflated"] for client in clients),
+            "dropped": sum(client["dropped"] for client in clients),
+            # The 20 most backed-up clients, then the 20 that received the most
+            "clients_by_queue_depth": sorted(clients, key=lambda client: (client["queue_depth"], client["dropped"]), reverse=True)[:20],
+            "clients_by_bytes_sent": sorted(clients, key=lambda client: client["bytes_sent"], reverse=True)[:20],
+            "delta_stream": self.deltas.stats(),
+            "subscriptions": self.topics.stats(),
+        }
 
     def _has_significant_change(self, new_data: dict) -> bool:
         """Check if there's a significant change in data to warrant broadcasting"""
@@ -188,15 +436,19 @@ class ConnectionManager:
                 time_diff = (datetime.now() - last_time).total_seconds()
                 if time_diff > 30:
                     return True
-            except:
+            except (AttributeError, ValueError):
                 return True  # If timestamp parsing fails, broadcast anyway
                 
         return False
 
-manager = ConnectionManager()
 
 # CoinGecko API configuration
 COINGECKO_BASE_URL = "https://api.coingecko.com/api/v3"
+
+# Per-provider upstream call budgets; calls beyond the budget are queued by priority
+rate_limiter.configure("coingecko", rate_per_minute=30, burst=10, hosts=["api.coingecko.com"])
+rate_limiter.configure("cryptoapis", rate_per_minute=20, burst=5, hosts=["rest.cryptoapis.io"])
+rate_limiter.configure("cryptocompare", rate_per_minute=30, burst=5, hosts=["min-api.cryptocompare.com"])
 COINGECKO_COINS = {
     "BTC": "bitcoin",
     "ETH": "ethereum", 
@@ -218,15 +470,17 @@ COINGECKO_COINS = {
     "DAI": "dai"
 }
 
+# Binary price frames identify symbols by their index in this table
+manager = ConnectionManager(WireCodec(list(COINGECKO_COINS)))
+
 async def get_real_crypto_prices() -> List[Dict[str, Any]]:
     """Get real-time crypto prices using HIGH-QUALITY MOCK DATA (APIs disabled for development)"""
-    global crypto_apis_cache, crypto_apis_cache_expiry
-    
     try:
         # CRITICAL: Check 30-second cache first to prevent excessive processing
-        if crypto_apis_cache_expiry and datetime.now() < crypto_apis_cache_expiry:
-            print(f"Using cached Mock data (expires in {(crypto_apis_cache_expiry - datetime.now()).seconds} seconds)")
-            return crypto_apis_cache
+        cached = data_cache.get("crypto_apis", "top_assets")
+        if cached is not None:
+            print("Using cached Mock data")
+            return cached
             
         print("🎭 USING HIGH-QUALITY MOCK DATA - No API costs, perfect for development!")
         
@@ -460,9 +714,8 @@ async def get_real_crypto_prices() -> List[Dict[str, Any]]:
             result.append(price_data)
         
         # CRITICAL: Cache the result for exactly 30 seconds to simulate real API behavior
-        crypto_apis_cache = result
-        crypto_apis_cache_expiry = datetime.now() + timedelta(seconds=30)
-        print(f"✅ Mock data cached for 30 seconds (until {crypto_apis_cache_expiry.strftime('%H:%M:%S')})")
+        data_cache.set("crypto_apis", "top_assets", result)
+        print(f"✅ Mock data cached for 30 seconds (until {(datetime.now() + timedelta(seconds=30)).strftime('%H:%M:%S')})")
         print(f"📊 Generated {len(result)} high-quality mock crypto prices")
         
         return result
@@ -492,314 +745,622 @@ async def get_real_crypto_prices() -> List[Dict[str, Any]]:
         ]
         return fallback_data
 
-async def get_real_time_price(symbol: str) -> Dict[str, Any]:
-    """Get real-time price data from CoinGecko API with minimal caching for real-time updates"""
-    try:
-        # Reduce cache time to 10 seconds for more real-time data
-        if symbol in price_cache and symbol in cache_expiry:
-            if datetime.now() < cache_expiry[symbol]:
-                return price_cache[symbol]
-        
-        # Special handling for stablecoins
-        stablecoins = ["USDC", "USDT", "DAI"]
-        if symbol.upper() in stablecoins:
-            return {
-                # Core price information (backward compatible)
-                "symbol": symbol.upper(),
-                "price": 1.0,
-                "change_24h": 0.0,
-                "volume_24h": 1000000000,  # High volume for stablecoins
-                "market_cap": 10000000000,  # Large market cap for stablecoins
-                "high_24h": 1.01,
-                "low_24h": 0.99,
-                "timestamp": datetime.now().isoformat(),
-                
-                # Additional fields for stablecoins
-                "name": f"{symbol.upper()} Stablecoin",
-                "change_1h": 0.0,
-                "change_7d": 0.0,
-                "logo": "",
-                "unit": "USD",
-                "reference_id": f"stablecoin-{symbol.lower()}",
-                
-                # Data source indicator
-                "data_source": "Stablecoin"
-            }
+STABLECOINS = ["USDC", "USDT", "DAI"]
+
+# CoinGecko /coins/markets accepts up to 250 ids per page
+COINGECKO_MARKETS_PAGE_SIZE = 250
+
+def _stablecoin_price_data(symbol: str) -> Dict[str, Any]:
+    """Build the pegged price payload served for stablecoins"""
+    return {
+        # Core price information (backward compatible)
+        "symbol": symbol.upper(),
+        "price": 1.0,
+        "change_24h": 0.0,
+        "volume_24h": 1000000000,  # High volume for stablecoins
+        "market_cap": 10000000000,  # Large market cap for stablecoins
+        "high_24h": 1.01,
+        "low_24h": 0.99,
+        "timestamp": datetime.now().isoformat(),
         
-        coin_id = COINGECKO_COINS.get(symbol.upper())
-        if not coin_id:
-            raise ValueError(f"Unsupported cryptocurrency: {symbol}")
-        
-        # Get current price data
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{COINGECKO_BASE_URL}/simple/price",
-                params={
-                    "ids": coin_id,
-                    "vs_currencies": "usd",
-                    "include_24hr_change": "true",
-                    "include_24hr_vol": "true",
-                    "include_market_cap": "true",
-                    "include_last_updated_at": "true"
-                },
-                timeout=10.0
-            )
-            
-            if response.status_code != 200:
-                raise ValueError(f"CoinGecko API error: {response.status_code}")
-            
-            data = response.json()
-            if coin_id not in data:
-                raise ValueError(f"No data available for {symbol}")
-            
-            coin_data = data[coin_id]
-            
-            # Get historical data for high/low
-            hist_response = await client.get(
-                f"{COINGECKO_BASE_URL}/coins/{coin_id}/market_chart",
-                params={
-                    "vs_currency": "usd",
-                    "days": "1",
-                    "interval": "hourly"
-                },
-                timeout=10.0
-            )
-            
-            if hist_response.status_code == 200:
-                hist_data = hist_response.json()
-                prices = hist_data.get("prices", [])
-                if prices:
-                    high_24h = max(price[1] for price in prices)
-                    low_24h = min(price[1] for price in prices)
-                else:
-                    high_24h = coin_data["usd"]
-                    low_24h = coin_data["usd"]
-            else:
-                high_24h = coin_data["usd"]
-                low_24h = coin_data["usd"]
-            
-            price_data = {
-                # Core price information (backward compatible)
-                "symbol": symbol.upper(),
-                "price": round(coin_data["usd"], 4),
-                "change_24h": round(coin_data.get("usd_24h_change", 0), 2),
-                "volume_24h": round(coin_data.get("usd_24h_vol", 0), 2),
-                "market_cap": round(coin_data.get("usd_market_cap", 0), 2),
-                "high_24h": round(high_24h, 4),
-                "low_24h": round(low_24h, 4),
-                "timestamp": datetime.now().isoformat(),
-                
-                # Additional fields (CoinGecko doesn't provide these, so use defaults)
-                "name": coin_id.replace('-', ' ').title(),  # Convert coin_id to name
-                "change_1h": 0.0,  # CoinGecko doesn't provide 1h change in this endpoint
-                "change_7d": 0.0,  # CoinGecko doesn't provide 7d change in this endpoint
-                "logo": "",  # CoinGecko doesn't provide logo in this endpoint
-                "unit": "USD",
-                "reference_id": coin_id,
-                
-                # Data source indicator
-                "data_source": "CoinGecko"
+        # Additional fields for stablecoins
+        "name": f"{symbol.upper()} Stablecoin",
+        "change_1h": 0.0,
+        "change_7d": 0.0,
+        "logo": "",
+        "unit": "USD",
+        "reference_id": f"stablecoin-{symbol.lower()}",
+        
+        # Data source indicator
+        "data_source": "Stablecoin"
+    }
+
+def _mock_price_data(symbol: str) -> Dict[str, Any]:
+    """Build the mock price payload used when the upstream API fails"""
+    return {
+        # Core price information (backward compatible)
+        "symbol": symbol.upper(),
+        "price": 50000.0,
+        "change_24h": 2.5,
+        "volume_24h": 1000000,
+        "market_cap": 1000000000,
+        "high_24h": 51000.0,
+        "low_24h": 49000.0,
+        "timestamp": datetime.now().isoformat(),
+        
+        # Additional fields (mock data)
+        "name": f"{symbol.upper()} Token",
+        "change_1h": 0.5,
+        "change_7d": 5.0,
+        "logo": "",
+        "unit": "USD",
+        "reference_id": f"mock-{symbol.lower()}",
+        
+        # Data source indicator
+        "data_source": "Mock"
+    }
+
+async def _fetch_coingecko_markets(client: httpx.AsyncClient, coin_ids: List[str]) -> List[Dict[str, Any]]:
+    """Fetch /coins/markets rows for many coins, one request per page of ids"""
+    rows = []
+    for start in range(0, len(coin_ids), COINGECKO_MARKETS_PAGE_SIZE):
+        page_ids = coin_ids[start:start + COINGECKO_MARKETS_PAGE_SIZE]
+        response = await client.get(
+            f"{COINGECKO_BASE_URL}/coins/markets",
+            params={
+                "vs_currency": "usd",
+                "ids": ",".join(page_ids),
+                "per_page": len(page_ids),
+                "page": 1,
+                "sparkline": "false",
+                "price_change_percentage": "1h,24h,7d"
             }
-            
-            # Cache the data for 3 seconds for real-time updates (faster for WebSocket)
-            price_cache[symbol.upper()] = price_data
-            cache_expiry[symbol.upper()] = datetime.now() + timedelta(seconds=3)
-            
-            return price_data
+        )
+        
+        if response.status_code != 200:
+            raise ValueError(f"CoinGecko API error: {response.status_code}")
+        
+        rows.extend(response.json())
+    return rows
+
+def _price_data_from_market_row(symbol: str, row: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a CoinGecko /coins/markets row to our price payload"""
+    price = row.get("current_price") or 0.0
+    return {
+        # Core price information (backward compatible)
+        "symbol": symbol,
+        "price": round(price, 4),
+        "change_24h": round(row.get("price_change_percentage_24h") or 0, 2),
+        "volume_24h": round(row.get("total_volume") or 0, 2),
+        "market_cap": round(row.get("market_cap") or 0, 2),
+        "high_24h": round(row.get("high_24h") or price, 4),
+        "low_24h": round(row.get("low_24h") or price, 4),
+        "timestamp": datetime.now().isoformat(),
+        
+        # Additional fields
+        "name": row.get("name") or row["id"].replace('-', ' ').title(),
+        "change_1h": round(row.get("price_change_percentage_1h_in_currency") or 0, 2),
+        "change_7d": round(row.get("price_change_percentage_7d_in_currency") or 0, 2),
+        "logo": "",  # CoinGecko only provides an image URL
+        "logo_url": row.get("image") or "",
+        "unit": "USD",
+        "reference_id": row["id"],
+        
+        # Data source indicator
+        "data_source": "CoinGecko"
+    }
+
+async def get_real_time_prices(symbols: List[str]) -> List[Dict[str, Any]]:
+    """Get real-time price data for many cryptocurrencies with batched CoinGecko requests.
+    
+    Cached entries are served directly (stale ones trigger one background batch
+    refresh); every other supported symbol is fetched through one paginated
+    /coins/markets call and fanned out to the per-symbol price cache. Results
+    keep the order of ``symbols``.
+    """
+    symbols = [symbol.upper() for symbol in symbols]
+    results = {}
+    missing = {}
+    stale = {}
+    
+    for symbol in symbols:
+        if symbol in STABLECOINS:
+            results[symbol] = _stablecoin_price_data(symbol)
+            continue
+        if symbol not in COINGECKO_COINS:
+            continue
+        status, value = data_cache.lookup("prices", symbol)
+        if status in (FRESH, STALE):
+            results[symbol] = value
+            if status == STALE:
+                stale[COINGECKO_COINS[symbol]] = symbol
+        elif status == NEGATIVE:
+            results[symbol] = _mock_price_data(symbol)
+        else:
+            missing[COINGECKO_COINS[symbol]] = symbol
+    
+    if missing and data_cache.shared is not None:
+        # Another worker may already have fetched these; one pipelined read checks them all
+        found = await data_cache.fetch_shared("prices", list(missing.values()))
+        results.update(found)
+        missing = {coin_id: symbol for coin_id, symbol in missing.items() if symbol not in found}
+    
+    if missing:
+        results.update(await _fetch_price_batch(missing))
+    
+    if stale and not price_flight.is_in_flight(tuple(sorted(stale))):
+        data_cache.spawn(_fetch_price_batch(stale))
+    
+    return [results[symbol] for symbol in symbols if symbol in results]
+
+async def _fetch_price_batch(missing: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch price data for a coin_id -> symbol mapping, falling back to mock data per symbol"""
+    try:
+        # Identical concurrent batches share one upstream request
+        results = dict(await price_flight.do(tuple(sorted(missing)), lambda: _load_price_batch(missing)))
+    except Exception as e:
+        print(f"Error fetching batched prices for {len(missing)} symbols: {str(e)}")
+        results = {}
+    
+    # Fallback to mock data for anything the batch did not return
+    for symbol in missing.values():
+        if symbol not in results:
+            results[symbol] = _mock_price_data(symbol)
+    
+    return results
+
+async def _load_price_batch(missing: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch price data for a coin_id -> symbol mapping; symbols the batch lacks are left out and negatively cached"""
+    try:
+        # First valid batch from CoinGecko or (hedged) CryptoAPIs wins
+        _, results = await price_batch_router.fetch(missing, validate=bool)
         
+        # One pipelined write shares the whole batch with other workers
+        await data_cache.publish("prices", results)
+    except Exception as e:
+        for symbol in missing.values():
+            data_cache.set_error("prices", symbol, e)
+        raise
+    
+    for symbol in missing.values():
+        if symbol not in results:
+            data_cache.set_error("prices", symbol, ValueError("No data available"))
+    return results
+
+async def get_real_time_price(symbol: str) -> Dict[str, Any]:
+    """Get real-time price data from CoinGecko API with minimal caching for real-time updates"""
+    # Special handling for stablecoins
+    if symbol.upper() in STABLECOINS:
+        return _stablecoin_price_data(symbol)
+    
+    try:
+        # Concurrent misses for the same symbol share one routed upstream fetch
+        return await data_cache.get_or_load("prices", symbol.upper(), lambda: _route_real_time_price(symbol))
     except Exception as e:
         print(f"Error fetching data for {symbol}: {str(e)}")
         # Fallback to mock data if API fails
-        return {
+        return _mock_price_data(symbol)
+
+async def _fetch_real_time_price(symbol: str) -> Dict[str, Any]:
+    coin_id = COINGECKO_COINS.get(symbol.upper())
+    if not coin_id:
+        raise ValueError(f"Unsupported cryptocurrency: {symbol}")
+    
+    # Get current price data
+    async with http_pool.client() as client:
+        response = await client.get(
+            f"{COINGECKO_BASE_URL}/simple/price",
+            params={
+                "ids": coin_id,
+                "vs_currencies": "usd",
+                "include_24hr_change": "true",
+                "include_24hr_vol": "true",
+                "include_market_cap": "true",
+                "include_last_updated_at": "true"
+            }
+        )
+        
+        if response.status_code != 200:
+            raise ValueError(f"CoinGecko API error: {response.status_code}")
+        
+        data = response.json()
+        if coin_id not in data:
+            raise ValueError(f"No data available for {symbol}")
+        
+        coin_data = data[coin_id]
+        
+        # 24h high/low come from the local rolling window instead of a market_chart call
+        tick_store.record(symbol.upper(), coin_data["usd"], coin_data.get("usd_24h_vol"))
+        window = tick_store.summary(symbol.upper())
+        high_24h = window["high"] if window else coin_data["usd"]
+        low_24h = window["low"] if window else coin_data["usd"]
+        
+        price_data = {
             # Core price information (backward compatible)
             "symbol": symbol.upper(),
-            "price": 50000.0,
-            "change_24h": 2.5,
-            "volume_24h": 1000000,
-            "market_cap": 1000000000,
-            "high_24h": 51000.0,
-            "low_24h": 49000.0,
+            "price": round(coin_data["usd"], 4),
+            "change_24h": round(coin_data.get("usd_24h_change", 0), 2),
+            "volume_24h": round(coin_data.get("usd_24h_vol", 0), 2),
+            "market_cap": round(coin_data.get("usd_market_cap", 0), 2),
+            "high_24h": round(high_24h, 4),
+            "low_24h": round(low_24h, 4),
             "timestamp": datetime.now().isoformat(),
             
-            # Additional fields (mock data)
-            "name": f"{symbol.upper()} Token",
-            "change_1h": 0.5,
-            "change_7d": 5.0,
-            "logo": "",
+            # Additional fields (CoinGecko doesn't provide these, so use defaults)
+            "name": coin_id.replace('-', ' ').title(),  # Convert coin_id to name
+            "change_1h": 0.0,  # CoinGecko doesn't provide 1h change in this endpoint
+            "change_7d": 0.0,  # CoinGecko doesn't provide 7d change in this endpoint
+            "logo": "",  # CoinGecko doesn't provide logo in this endpoint
             "unit": "USD",
-            "reference_id": f"mock-{symbol.lower()}",
+            "reference_id": coin_id,
             
             # Data source indicator
-            "data_source": "Mock"
+            "data_source": "CoinGecko"
         }
+        
+        return price_data
 
-async def calculate_technical_indicators(symbol: str) -> Dict[str, Any]:
-    """Calculate technical indicators for a cryptocurrency using CoinGecko historical data"""
-    try:
-        coin_id = COINGECKO_COINS.get(symbol.upper())
-        if not coin_id:
-            raise ValueError(f"Unsupported cryptocurrency: {symbol}")
-        
-        # Get historical data for technical analysis (60 days)
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{COINGECKO_BASE_URL}/coins/{coin_id}/market_chart",
-                params={
-                    "vs_currency": "usd",
-                    "days": "60"
-                },
-                timeout=15.0
-            )
-            
-            if response.status_code != 200:
-                raise ValueError(f"CoinGecko API error: {response.status_code}")
-            
-            data = response.json()
-            prices = data.get("prices", [])
-            
-            if len(prices) < 50:
-                raise ValueError(f"Insufficient data for technical analysis of {symbol}")
-            
-            # Convert to pandas DataFrame
-            df = pd.DataFrame(prices, columns=['timestamp', 'price'])
-            df['price'] = df['price'].astype(float)
-            
-            # Calculate RSI
-            rsi_indicator = RSIIndicator(df['price'])
-            rsi = rsi_indicator.rsi().iloc[-1]
-            
-            # Calculate MACD
-            macd_indicator = MACD(df['price'])
-            macd_line = macd_indicator.macd().iloc[-1]
-            macd_signal = macd_indicator.macd_signal().iloc[-1]
-            macd_histogram = macd_indicator.macd_diff().iloc[-1]
-            
-            # Calculate Moving Averages
-            sma_20 = SMAIndicator(df['price'], window=20).sma_indicator().iloc[-1]
-            sma_50 = SMAIndicator(df['price'], window=50).sma_indicator().iloc[-1]
-            ema_12 = EMAIndicator(df['price'], window=12).ema_indicator().iloc[-1]
-            
-            # Calculate Bollinger Bands
-            bb_indicator = BollingerBands(df['price'])
-            bb_upper = bb_indicator.bollinger_hband().iloc[-1]
-            bb_middle = bb_indicator.bollinger_mavg().iloc[-1]
-            bb_lower = bb_indicator.bollinger_lband().iloc[-1]
-            
-            # Calculate Support and Resistance levels
-            recent_highs = df['price'].tail(20)
-            recent_lows = df['price'].tail(20)
-            resistance = recent_highs.max()
-            support = recent_lows.min()
-            
-            return {
-                "symbol": symbol.upper(),
-                "rsi": round(rsi, 2) if not pd.isna(rsi) else 50.0,
-                "macd": {
-                    "macd": round(macd_line, 4) if not pd.isna(macd_line) else 0.0,
-                    "signal": round(macd_signal, 4) if not pd.isna(macd_signal) else 0.0,
-                    "histogram": round(macd_histogram, 4) if not pd.isna(macd_histogram) else 0.0
-                },
-                "moving_averages": {
-                    "sma_20": round(sma_20, 4) if not pd.isna(sma_20) else 0.0,
-                    "sma_50": round(sma_50, 4) if not pd.isna(sma_50) else 0.0,
-                    "ema_12": round(ema_12, 4) if not pd.isna(ema_12) else 0.0
-                },
-                "bollinger_bands": {
-                    "upper": round(bb_upper, 4) if not pd.isna(bb_upper) else 0.0,
-                    "middle": round(bb_middle, 4) if not pd.isna(bb_middle) else 0.0,
-                    "lower": round(bb_lower, 4) if not pd.isna(bb_lower) else 0.0
-                },
-                "support_resistance": {
-                    "resistance": round(resistance, 4),
-                    "support": round(support, 4)
-                }
-            }
+async def _fetch_coingecko_batch(missing: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+    """Price a coin_id -> symbol mapping with paginated CoinGecko /coins/markets calls"""
+    results = {}
+    async with http_pool.client() as client:
+        rows = await _fetch_coingecko_markets(client, list(missing))
+    
+    for row in rows:
+        symbol = missing.get(row.get("id"))
+        if symbol is None or row.get("current_price") is None:
+            continue
+        price_data = _price_data_from_market_row(symbol, row)
+        tick_store.record(symbol, row["current_price"], row.get("total_volume"))
+        results[symbol] = price_data
+    return results
+
+def _price_data_from_cryptoapis_asset(symbol: str, asset: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a fetch_top_assets row to our price payload"""
+    price = asset["latestPriceUSD"]
+    # CryptoAPIs has no 24h range, so take it from the local rolling window
+    tick_store.record(symbol, price)
+    window = tick_store.summary(symbol)
+    return {
+        # Core price information (backward compatible)
+        "symbol": symbol,
+        "price": round(price, 4),
+        "change_24h": round(asset.get("change24h") or 0, 2),
+        "volume_24h": 0.0,  # Not provided by the CryptoAPIs asset endpoint
+        "market_cap": 0.0,
+        "high_24h": round(window["high"] if window else price, 4),
+        "low_24h": round(window["low"] if window else price, 4),
+        "timestamp": datetime.now().isoformat(),
         
+        # Additional fields
+        "name": asset.get("name") or symbol,
+        "change_1h": round(asset.get("change1h") or 0, 2),
+        "change_7d": round(asset.get("change7d") or 0, 2),
+        "logo": asset.get("logoBase64") or "",
+        "unit": "USD",
+        "reference_id": asset.get("referenceId") or f"cryptoapis-{symbol.lower()}",
+        
+        # Data source indicator
+        "data_source": "CryptoAPIs"
+    }
+
+async def _fetch_cryptoapis_batch(missing: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+    """Price a coin_id -> symbol mapping through CryptoAPIs (fetch_top_assets)"""
+    wanted = set(missing.values())
+    assets = await fetch_top_assets(
+        CRYPTO_API_KEY, list(wanted), session=http_pool.aiohttp_session, limiter=cryptoapis_limiter
+    )
+    results = {}
+    for asset in assets:
+        symbol = (asset.get("symbol") or "").upper()
+        if symbol in wanted and asset.get("latestPriceUSD") is not None:
+            results[symbol] = _price_data_from_cryptoapis_asset(symbol, asset)
+    return results
+
+async def _fetch_cryptoapis_price(symbol: str) -> Dict[str, Any]:
+    results = await _fetch_cryptoapis_batch({symbol.upper(): symbol.upper()})
+    if symbol.upper() not in results:
+        raise ValueError(f"No CryptoAPIs price for {symbol}")
+    return results[symbol.upper()]
+
+def _sort_by_price(prices: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return sorted(prices, key=lambda price_data: -(price_data.get("price") or 0))
+
+async def stream_real_crypto_prices() -> AsyncIterator[Dict[str, Any]]:
+    """Yield real-prices payloads one at a time, as soon as each asset arrives.
+    
+    With CRYPTO_API_KEY set the assets stream from CryptoAPIs in completion order,
+    so the first price costs the fastest symbol's latency rather than the slowest.
+    Without it this yields the mock data. A finished run is cached for 30 seconds.
+    """
+    cached = data_cache.get("crypto_apis", "streamed_assets")
+    if cached is not None:
+        for price_data in cached:
+            yield price_data
+        return
+    
+    if not (CRYPTO_PRICE_SERVICE_AVAILABLE and CRYPTO_API_KEY):
+        for price_data in await get_real_crypto_prices():
+            yield price_data
+        return
+    
+    collected = []
+    async for asset in stream_top_assets(
+        CRYPTO_API_KEY, list(COINGECKO_COINS), session=http_pool.aiohttp_session, limiter=cryptoapis_limiter
+    ):
+        if asset.get("latestPriceUSD") is None:
+            print(f"CryptoAPIs returned no price for {asset.get('symbol')}: {asset.get('error')}")
+            continue
+        price_data = _price_data_from_cryptoapis_asset((asset.get("symbol") or "").upper(), asset)
+        collected.append(price_data)
+        yield price_data
+    
+    # CRITICAL: cache complete runs so repeated streams do not re-bill CryptoAPIs
+    data_cache.set("crypto_apis", "streamed_assets", _sort_by_price(collected))
+
+async def _route_real_time_price(symbol: str) -> Dict[str, Any]:
+    _, price_data = await price_router.fetch(symbol)
+    return price_data
+
+# Price providers in preference order. A provider slower than its own p95 is
+# hedged to the next one, and one that keeps failing is skipped by its breaker.
+price_router = QuoteRouter("price")
+price_router.add_provider("CoinGecko", _fetch_real_time_price)
+price_batch_router = QuoteRouter("price_batch")
+price_batch_router.add_provider("CoinGecko", _fetch_coingecko_batch)
+# Kept across runs so the learned CryptoAPIs concurrency carries over between batches
+cryptoapis_limiter = AdaptiveLimiter(initial=5, max_limit=20) if CRYPTO_PRICE_SERVICE_AVAILABLE else None
+if CRYPTO_PRICE_SERVICE_AVAILABLE and CRYPTO_API_KEY:
+    price_router.add_provider("CryptoAPIs", _fetch_cryptoapis_price)
+    price_batch_router.add_provider("CryptoAPIs", _fetch_cryptoapis_batch)
+
+# CoinGecko serves 60-day market_chart history as hourly points
+indicator_engine = IndicatorEngine(bar_seconds=3600)
+INDICATOR_TIMEFRAME = "1h"
+
+# 1m/5m/1h/4h/1d OHLCV bars from stored history and every ingested tick
+candles = CandleAggregator()
+tick_store.add_listener(candles.add)
+# Bar series each recommendation horizon is analyzed on
+RECOMMENDATION_TIMEFRAMES = {"short": "1h", "medium": "4h", "long": "1d"}
+
+# CPU-bound analytics (indicator seeding/batches, recommendation scoring) run off the event loop
+analytics = AnalyticsExecutor(
+    mode=os.getenv("ANALYTICS_EXECUTOR", "thread"),
+    max_workers=int(os.getenv("ANALYTICS_WORKERS", "0")) or None,
+    max_queue=int(os.getenv("ANALYTICS_MAX_QUEUE", "32"))
+)
+loop_lag = LoopLagMonitor()
+
+# Local on-disk price history; upstream is only asked for the tail we do not have yet
+HISTORY_DIR = os.getenv("HISTORY_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "history"))
+HISTORY_DAYS = 60
+# Skip the delta fetch when the stored history is newer than this
+HISTORY_MIN_GAP_SECONDS = 300
+history_store = HistoryStore(HISTORY_DIR)
+
+async def backfill_history(symbol: str) -> PriceHistory:
+    """Bring ``symbol``'s local history up to date and return it (memory-mapped)"""
+    history = await history_flight.do(symbol, lambda: _backfill_history(symbol))
+    # Fold anything new into the multi-timeframe candles (a no-op when nothing is)
+    candles.backfill(symbol, history)
+    return history
+
+async def _backfill_history(symbol: str) -> PriceHistory:
+    coin_id = COINGECKO_COINS[symbol]
+    last_ms = history_store.last_timestamp(symbol)
+    now = time.time()
+    if last_ms is not None and now - last_ms / 1000 < HISTORY_MIN_GAP_SECONDS:
+        return history_store.load(symbol)
+    
+    if last_ms is None or now - last_ms / 1000 > HISTORY_DAYS * 86400:
+        # Nothing usable stored yet: one full 60-day download
+        url = f"{COINGECKO_BASE_URL}/coins/{coin_id}/market_chart"
+        params = {"vs_currency": "usd", "days": str(HISTORY_DAYS)}
+    else:
+        # Only the missing tail since the last stored point
+        url = f"{COINGECKO_BASE_URL}/coins/{coin_id}/market_chart/range"
+        params = {"vs_currency": "usd", "from": last_ms // 1000 + 1, "to": int(now)}
+    
+    async with http_pool.client() as client:
+        response = await client.get(url, params=params, timeout=15.0)
+        
+        if response.status_code != 200:
+            raise ValueError(f"CoinGecko API error: {response.status_code}")
+        
+        data = response.json()
+    
+    prices = data.get("prices", [])
+    volumes = dict((ts, volume) for ts, volume in data.get("total_volumes", []))
+    if prices:
+        history_store.append(
+            symbol,
+            np.array([ts for ts, _ in prices], dtype=np.int64),
+            np.array([price for _, price in prices], dtype=np.float64),
+            np.array([volumes.get(ts, 0.0) or 0.0 for ts, _ in prices], dtype=np.float64)
+        )
+    return history_store.load(symbol)
+
+def _hourly_bars(symbol: str, now_ms: int) -> Bars:
+    """Closed hourly bars of the last 60 days from the candle aggregator, keyed by their open time"""
+    bars = candles.closed(symbol, INDICATOR_TIMEFRAME, now=now_ms / 1000)
+    start = int(np.searchsorted(bars.ts, now_ms - HISTORY_DAYS * 86400 * 1000))
+    # The still-open hour is previewed rather than committed, so it is not among the closed bars
+    return Bars(*(column[start:] for column in bars))
+
+async def _seed_indicator_engine(symbol: str):
+    """Rebuild ``symbol``'s indicator state from the last 60 days of closed hourly bars"""
+    history = await backfill_history(symbol)
+    bars = _hourly_bars(symbol, int(time.time() * 1000))
+    
+    if len(bars) < MIN_HISTORY:
+        raise ValueError(f"Insufficient data for technical analysis of {symbol}")
+    
+    state = await analytics.run_arrays("indicator_seed", build_state, (bars.ts, bars.close))
+    indicator_engine.install(symbol, state)
+    tick_store.record(symbol, float(history.price[-1]), ts=int(history.ts[-1]) / 1000)
+
+def _format_technical_indicators(symbol: str, values: Dict[str, Any]) -> Dict[str, Any]:
+    def rounded(value: Optional[float], digits: int = 4, default: float = 0.0) -> float:
+        return round(value, digits) if value is not None else default
+    
+    return {
+        "symbol": symbol,
+        "rsi": rounded(values["rsi"], 2, 50.0),
+        "macd": {name: rounded(value) for name, value in values["macd"].items()},
+        "moving_averages": {name: rounded(value) for name, value in values["moving_averages"].items()},
+        "bollinger_bands": {name: rounded(value) for name, value in values["bollinger_bands"].items()},
+        "support_resistance": {name: rounded(value) for name, value in values["support_resistance"].items()}
+    }
+
+def _candle_key(symbol: str, timeframe: str, candle: int) -> str:
+    # e.g. BTC:1h:1718000000 -- a new candle is a new key, so nothing needs explicit invalidation
+    return f"{symbol}:{timeframe}:{candle}"
+
+def _current_candle(symbol: str) -> Optional[int]:
+    """Commit hourly candles that closed since the last call to the indicator engine; returns the candle version"""
+    engine_candle = indicator_engine.candle_ts(symbol)
+    if engine_candle is not None:
+        # Same bucketed bars the engine was seeded from; a bar is only there once its hour has ended
+        closed = candles.candle_ts(symbol, INDICATOR_TIMEFRAME)
+        if closed is not None and closed > engine_candle:
+            bars = candles.closed(symbol, INDICATOR_TIMEFRAME)
+            indicator_engine.advance(symbol, bars.ts, bars.close)
+    if indicator_engine.needs_reseed(symbol):
+        return None
+    return indicator_engine.candle_ts(symbol)
+
+async def _closed_candle_indicators(symbol: str) -> Dict[str, Any]:
+    return _format_technical_indicators(symbol, indicator_engine.state(symbol).preview())
+
+def _indicator_candle(symbol: str, timeframe: str) -> Optional[int]:
+    """Version of ``symbol``'s closed ``timeframe`` bars (None when there are none yet)"""
+    if timeframe == INDICATOR_TIMEFRAME:
+        return indicator_engine.candle_ts(symbol)
+    return candles.candle_ts(symbol, timeframe)
+
+class IndicatorsUnavailable(Exception):
+    """Real indicators (or a live price) for a recommendation could not be obtained"""
+
+async def _aggregated_indicators(symbol: str, timeframe: str) -> Dict[str, Any]:
+    # Only bars really sampled at this resolution; 1m/5m start out as hourly history
+    bars = trailing_run(candles.closed(symbol, timeframe), TIMEFRAMES[timeframe] * 1000)
+    values = (await analytics.run_arrays("indicator_batch", compute_batch, (bars.close[:, None],)))[0]
+    if values is None:
+        raise IndicatorsUnavailable(f"Insufficient {timeframe} bars for technical analysis of {symbol} ({len(bars)} so far)")
+    return _format_technical_indicators(symbol, values)
+
+async def calculate_technical_indicators(symbol: str, timeframe: str = INDICATOR_TIMEFRAME) -> Dict[str, Any]:
+    """Calculate technical indicators for a cryptocurrency on ``timeframe`` bars (1m/5m/1h/4h/1d)"""
+    try:
+        return await _technical_indicators(symbol, timeframe)
+    except IndicatorsUnavailable:
+        # Too few bars at this resolution yet; mock values must not pass for them
+        raise
     except Exception as e:
         print(f"Error calculating technical indicators for {symbol}: {str(e)}")
         # Fallback to mock data
-        return {
-            "symbol": symbol.upper(),
-            "rsi": 45.5,
-            "macd": {"macd": 100, "signal": 95, "histogram": 5},
-            "moving_averages": {"sma_20": 49000, "sma_50": 48000, "ema_12": 50500},
-            "bollinger_bands": {"upper": 52000, "middle": 50000, "lower": 48000},
-            "support_resistance": {"resistance": 52000, "support": 48000}
-        }
+        return _mock_technical_indicators(symbol)
+
+def _mock_technical_indicators(symbol: str) -> Dict[str, Any]:
+    return {
+        "symbol": symbol.upper(),
+        "rsi": 45.5,
+        "macd": {"macd": 100, "signal": 95, "histogram": 5},
+        "moving_averages": {"sma_20": 49000, "sma_50": 48000, "ema_12": 50500},
+        "bollinger_bands": {"upper": 52000, "middle": 50000, "lower": 48000},
+        "support_resistance": {"resistance": 52000, "support": 48000}
+    }
+
+async def _technical_indicators(symbol: str, timeframe: str = INDICATOR_TIMEFRAME) -> Dict[str, Any]:
+    """Like calculate_technical_indicators, but raises instead of falling back to mock data"""
+    return await indicator_flight.do(
+        f"{symbol.upper()}:{timeframe}", lambda: _calculate_technical_indicators(symbol, timeframe)
+    )
+
+async def _calculate_technical_indicators(symbol: str, timeframe: str = INDICATOR_TIMEFRAME) -> Dict[str, Any]:
+    symbol = symbol.upper()
+    if symbol not in COINGECKO_COINS:
+        raise ValueError(f"Unsupported cryptocurrency: {symbol}")
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f"Unsupported timeframe: {timeframe}")
+    
+    if timeframe != INDICATOR_TIMEFRAME:
+        # Other timeframes come from the candle aggregator: stored history once, live ticks after
+        if not candles.has(symbol):
+            await backfill_history(symbol)
+        candle = candles.candle_ts(symbol, timeframe)
+        if candle is None:
+            raise ValueError(f"No closed {timeframe} bars for {symbol}")
+        return await data_cache.get_or_load(
+            "indicators",
+            _candle_key(symbol, timeframe, candle),
+            lambda: _aggregated_indicators(symbol, timeframe)
+        )
+    
+    # History is downloaded once to seed the engine; after that each call is O(1)
+    candle = _current_candle(symbol)
+    if candle is None:
+        await _seed_indicator_engine(symbol)
+        candle = _current_candle(symbol)
+        if candle is None:
+            raise ValueError(f"No recent closed {INDICATOR_TIMEFRAME} bars for {symbol}")
+    
+    # Values only change when a candle closes; within a candle every call is a cache hit
+    return await data_cache.get_or_load(
+        "indicators",
+        _candle_key(symbol, INDICATOR_TIMEFRAME, candle),
+        lambda: _closed_candle_indicators(symbol)
+    )
+
+async def calculate_technical_indicators_batch(symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Technical indicators for many symbols in one vectorized pass over a time x symbol matrix"""
+    symbols = [symbol for symbol in dict.fromkeys(s.upper() for s in symbols) if symbol in COINGECKO_COINS]
+    
+    # Symbols whose current candle is already memoized need neither history nor computation
+    results = {}
+    for symbol in symbols:
+        candle = _current_candle(symbol)
+        if candle is not None:
+            cached = data_cache.get("indicators", _candle_key(symbol, INDICATOR_TIMEFRAME, candle))
+            if cached is not None:
+                results[symbol] = cached
+    missing = [symbol for symbol in symbols if symbol not in results]
+    histories = await asyncio.gather(*(backfill_history(symbol) for symbol in missing), return_exceptions=True)
+    
+    now_ms = int(time.time() * 1000)
+    series = []
+    for symbol, history in zip(missing, histories):
+        if isinstance(history, Exception):
+            print(f"Error loading history for {symbol}: {str(history)}")
+            series.append((np.empty(0, dtype=np.int64), np.empty(0)))
+            continue
+        # The bars the indicator engine is seeded from and advanced with, so both paths agree per candle key
+        bars = _hourly_bars(symbol, now_ms)
+        series.append((bars.ts, bars.close))
+    
+    _, closes = align_closes(series, 3600 * 1000)
+    batch = await analytics.run_arrays("indicator_batch", compute_batch, (closes,)) if len(closes) else [None] * len(missing)
+    
+    for symbol, values, (ts, _) in zip(missing, batch, series):
+        if values is None:
+            # Not enough history: same per-symbol path (and fallback) as a single request
+            results[symbol] = await calculate_technical_indicators(symbol)
+            continue
+        results[symbol] = _format_technical_indicators(symbol, values)
+        candle = int(ts[-1]) // 1000
+        data_cache.set("indicators", _candle_key(symbol, INDICATOR_TIMEFRAME, candle), results[symbol])
+    return {symbol: results[symbol] for symbol in symbols}
 
 async def generate_investment_recommendation(symbol: str, timeframe: str = "medium") -> Dict[str, Any]:
     """Generate AI-powered investment recommendations based on technical analysis"""
     try:
-        # Get technical indicators
-        tech_data = await calculate_technical_indicators(symbol)
-        
-        # Get current price
-        price_data = await get_real_time_price(symbol)
-        current_price = price_data['price']
-        
-        # Simple recommendation logic based on technical indicators
-        rsi = tech_data['rsi']
-        macd_histogram = tech_data['macd']['histogram']
-        price_vs_sma20 = current_price / tech_data['moving_averages']['sma_20']
-        
-        recommendation = "HOLD"
-        confidence = 0.5
-        reasoning = []
-        
-        # RSI analysis
-        if rsi < 30:
-            recommendation = "BUY"
-            confidence += 0.2
-            reasoning.append("RSI indicates oversold conditions")
-        elif rsi > 70:
-            recommendation = "SELL"
-            confidence += 0.2
-            reasoning.append("RSI indicates overbought conditions")
-        
-        # MACD analysis
-        if macd_histogram > 0 and macd_histogram > tech_data['macd']['histogram']:
-            if recommendation == "BUY":
-                confidence += 0.1
-            reasoning.append("MACD showing bullish momentum")
-        elif macd_histogram < 0:
-            if recommendation == "SELL":
-                confidence += 0.1
-            reasoning.append("MACD showing bearish momentum")
-        
-        # Moving average analysis
-        if current_price > tech_data['moving_averages']['sma_20']:
-            if recommendation == "BUY":
-                confidence += 0.1
-            reasoning.append("Price above 20-day moving average")
-        else:
-            if recommendation == "SELL":
-                confidence += 0.1
-            reasoning.append("Price below 20-day moving average")
-        
-        # Calculate target price and stop loss
-        if recommendation == "BUY":
-            target_price = current_price * 1.15  # 15% upside
-            stop_loss = current_price * 0.92    # 8% downside
-        elif recommendation == "SELL":
-            target_price = current_price * 0.85  # 15% downside
-            stop_loss = current_price * 1.08    # 8% upside
-        else:
-            target_price = current_price
-            stop_loss = current_price * 0.95
-        
-        # Determine risk level
-        risk_level = "LOW" if confidence < 0.6 else "MEDIUM" if confidence < 0.8 else "HIGH"
-        
-        return {
-            "symbol": symbol.upper(),
-            "recommendation": recommendation,
-            "confidence": round(confidence, 2),
-            "timeframe": timeframe,
-            "reasoning": " | ".join(reasoning) if reasoning else f"Based on technical analysis for {timeframe}-term outlook",
-            "target_price": round(target_price, 4),
-            "stop_loss": round(stop_loss, 4),
-            "risk_level": risk_level
-        }
+        try:
+            return await _memoized_recommendation(symbol, timeframe)
+        except IndicatorsUnavailable as e:
+            print(f"Error getting recommendation inputs for {symbol}: {str(e)}")
+            # Fallback indicators: score them, but don't memoize
+            return await _score_recommendation(symbol, timeframe, _mock_technical_indicators(symbol))
         
     except Exception as e:
         print(f"Error generating recommendation for {symbol}: {str(e)}")
@@ -815,65 +1376,75 @@ async def generate_investment_recommendation(symbol: str, timeframe: str = "medi
             "risk_level": "UNKNOWN"
         }
 
+async def _memoized_recommendation(symbol: str, timeframe: str) -> Dict[str, Any]:
+    """Recommendation from real indicators and a live price, memoized per closed candle; raises IndicatorsUnavailable otherwise"""
+    # Each horizon is analyzed on its own bar series
+    bar_timeframe = RECOMMENDATION_TIMEFRAMES.get(timeframe, RECOMMENDATION_TIMEFRAMES["medium"])
+    try:
+        tech_data = await _technical_indicators(symbol, bar_timeframe)
+    except Exception as e:
+        raise IndicatorsUnavailable(str(e)) from e
+    
+    candle = _indicator_candle(symbol.upper(), bar_timeframe)
+    if candle is None:
+        # No candle version to key the memo on
+        return await _score_recommendation(symbol, timeframe, tech_data, live_price=True)
+    return await data_cache.get_or_load(
+        "recommendations",
+        _candle_key(symbol.upper(), timeframe, candle),
+        lambda: _score_recommendation(symbol, timeframe, tech_data, live_price=True)
+    )
+
+async def _score_recommendation(symbol: str, timeframe: str, tech_data: Dict[str, Any], live_price: bool = False) -> Dict[str, Any]:
+    # Get current price
+    price_data = await get_real_time_price(symbol)
+    if live_price and price_data.get("data_source") == "Mock":
+        # Targets and stops off the mock price must not be memoized for the whole candle
+        raise IndicatorsUnavailable(f"No live price for {symbol}")
+    current_price = price_data['price']
+    
+    # Scoring is CPU work; keep it off the event loop
+    return await analytics.run("recommendation", score_recommendation, symbol, timeframe, tech_data, current_price)
+
+def _recommendation_key(symbol: str, timeframe: str) -> str:
+    return f"recommendation:{symbol}:{timeframe}"
+
+# How recommendation requests were served
+recommendation_stats = {"precomputed": 0, "recomputed": 0}
+
+async def get_recommendation(symbol: str, timeframe: str = "medium") -> Dict[str, Any]:
+    """Serve the precomputed recommendation while it is valid; recompute only once it expired"""
+    row = ingestion.snapshot.get(_recommendation_key(symbol.upper(), timeframe))
+    if row is not None and row["expires_at"] > datetime.utcnow():
+        recommendation_stats["precomputed"] += 1
+        return row
+    recommendation_stats["recomputed"] += 1
+    return await generate_investment_recommendation(symbol, timeframe)
+
+async def _precompute_recommendation(symbol: str, timeframe: str) -> Optional[Dict[str, Any]]:
+    """Recommendation stamped with its candle and expiry; None when only fallback data is available"""
+    try:
+        # Raises on mock indicators or a mock price, which must never be published or persisted
+        recommendation = await _memoized_recommendation(symbol, timeframe)
+    except Exception as e:
+        print(f"Error precomputing {timeframe} recommendation for {symbol}: {str(e)}")
+        return None
+    bar_timeframe = RECOMMENDATION_TIMEFRAMES[timeframe]
+    candle = _indicator_candle(symbol, bar_timeframe)
+    if candle is None:
+        return None
+    return {
+        **recommendation,
+        "candle": candle,
+        "generated_at": datetime.utcnow(),
+        # Valid until the next candle of its bar series closes
+        "expires_at": datetime.utcfromtimestamp(candle + 2 * TIMEFRAMES[bar_timeframe])
+    }
+
 async def get_market_overview() -> Dict[str, Any]:
     """Get overall market overview with real-time data from CoinGecko"""
     try:
-        # Get global market data
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{COINGECKO_BASE_URL}/global",
-                timeout=10.0
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                global_data = data.get("data", {})
-                
-                # Get top cryptocurrencies data
-                top_coins = ["BTC", "ETH", "BNB", "SOL", "ADA"]
-                market_data = []
-                
-                for coin in top_coins:
-                    try:
-                        price_data = await get_real_time_price(coin)
-                        market_data.append(price_data)
-                    except:
-                        continue
-                
-                if market_data:
-                    total_market_cap = global_data.get("total_market_cap", {}).get("usd", 0)
-                    total_volume_24h = global_data.get("total_volume", {}).get("usd", 0)
-                    
-                    # Calculate Bitcoin dominance
-                    btc_data = next((coin for coin in market_data if coin['symbol'] == 'BTC'), None)
-                    bitcoin_dominance = (btc_data['market_cap'] / total_market_cap * 100) if btc_data and total_market_cap > 0 else 50.0
-                    
-                    # Simple fear/greed calculation based on average 24h change
-                    avg_change = np.mean([coin['change_24h'] for coin in market_data])
-                    if avg_change > 5:
-                        fear_greed_index = 75  # Greed
-                        market_sentiment = "Bullish"
-                    elif avg_change < -5:
-                        fear_greed_index = 25  # Fear
-                        market_sentiment = "Bearish"
-                    else:
-                        fear_greed_index = 50  # Neutral
-                        market_sentiment = "Neutral"
-                    
-                    # Get trending coins (top performers in last 24h)
-                    trending_coins = sorted(market_data, key=lambda x: x['change_24h'], reverse=True)[:5]
-                    trending_symbols = [coin['symbol'] for coin in trending_coins]
-                    
-                    return {
-                        "total_market_cap": round(total_market_cap, 2),
-                        "total_volume_24h": round(total_volume_24h, 2),
-                        "bitcoin_dominance": round(bitcoin_dominance, 2),
-                        "fear_greed_index": fear_greed_index,
-                        "trending_coins": trending_symbols,
-                        "market_sentiment": market_sentiment,
-                        "last_updated": datetime.now()
-                    }
-        
+        return await data_cache.get_or_load("market_overview", "global", _fetch_market_overview)
     except Exception as e:
         print(f"Error fetching market overview: {str(e)}")
     
@@ -888,155 +1459,203 @@ async def get_market_overview() -> Dict[str, Any]:
         "last_updated": datetime.now()
     }
 
+async def _fetch_market_overview() -> Dict[str, Any]:
+    # Get global market data
+    async with http_pool.client() as client:
+        response = await client.get(
+            f"{COINGECKO_BASE_URL}/global"
+        )
+        
+        if response.status_code != 200:
+            raise ValueError(f"CoinGecko API error: {response.status_code}")
+        
+        data = response.json()
+        global_data = data.get("data", {})
+        
+        # Get top cryptocurrencies data
+        top_coins = ["BTC", "ETH", "BNB", "SOL", "ADA"]
+        market_data = await get_real_time_prices(top_coins)
+        
+        if not market_data:
+            raise ValueError("No price data available for market overview")
+        
+        total_market_cap = global_data.get("total_market_cap", {}).get("usd", 0)
+        total_volume_24h = global_data.get("total_volume", {}).get("usd", 0)
+        
+        # Calculate Bitcoin dominance
+        btc_data = next((coin for coin in market_data if coin['symbol'] == 'BTC'), None)
+        bitcoin_dominance = (btc_data['market_cap'] / total_market_cap * 100) if btc_data and total_market_cap > 0 else 50.0
+        
+        # Simple fear/greed calculation based on average 24h change
+        avg_change = np.mean([coin['change_24h'] for coin in market_data])
+        if avg_change > 5:
+            fear_greed_index = 75  # Greed
+            market_sentiment = "Bullish"
+        elif avg_change < -5:
+            fear_greed_index = 25  # Fear
+            market_sentiment = "Bearish"
+        else:
+            fear_greed_index = 50  # Neutral
+            market_sentiment = "Neutral"
+        
+        # Get trending coins (top performers in last 24h)
+        trending_coins = sorted(market_data, key=lambda x: x['change_24h'], reverse=True)[:5]
+        trending_symbols = [coin['symbol'] for coin in trending_coins]
+        
+        return {
+            "total_market_cap": round(total_market_cap, 2),
+            "total_volume_24h": round(total_volume_24h, 2),
+            "bitcoin_dominance": round(bitcoin_dominance, 2),
+            "fear_greed_index": fear_greed_index,
+            "trending_coins": trending_symbols,
+            "market_sentiment": market_sentiment,
+            "last_updated": datetime.now()
+        }
+
 async def get_crypto_news() -> List[Dict[str, Any]]:
     """Get cryptocurrency news from NewsAPI or other free news sources with cache"""
     try:
-        # Check cache first - 5 minutes expiry for news
-        cache_key = "crypto_news"
-        if cache_key in news_cache and cache_key in news_cache_expiry:
-            if datetime.now() < news_cache_expiry[cache_key]:
-                return news_cache[cache_key]
-        
-        # NewsAPI 的替代方案：使用免費的 CryptoCompare 新聞 API
-        async with httpx.AsyncClient() as client:
-            # Try CryptoCompare News API first (free tier)
-            response = await client.get(
-                "https://min-api.cryptocompare.com/data/v2/news/",
-                params={
-                    "lang": "EN",
-                    "sortOrder": "latest",
-                    "extraParams": "crypto-tracker"
-                },
-                timeout=10.0
-            )
-            
-            news_items = []
-            
-            if response.status_code == 200:
-                data = response.json()
-                articles = data.get("Data", [])[:10]  # Get top 10 news
-                
-                for article in articles:
-                    # Convert timestamp to datetime
-                    published_timestamp = article.get("published_on", 0)
-                    published_at = datetime.fromtimestamp(published_timestamp) if published_timestamp else datetime.now()
-                    
-                    # Clean up title and body
-                    title = article.get("title", "").strip()
-                    body = article.get("body", "").strip()
-                    
-                    # Truncate body to reasonable length
-                    if len(body) > 200:
-                        body = body[:200] + "..."
-                    
-                    news_item = {
-                        "title": title,
-                        "description": body,
-                        "url": article.get("url", ""),
-                        "image_url": article.get("imageurl", ""),
-                        "source": article.get("source_info", {}).get("name", "CryptoCompare"),
-                        "published_at": published_at,
-                        "sentiment": "neutral"  # Default sentiment
-                    }
-                    
-                    if title and body:  # Only add if we have essential content
-                        news_items.append(news_item)
-            
-            # Fallback to manual crypto news if API fails
-            if len(news_items) < 5:
-                fallback_news = [
-                    {
-                        "title": "比特幣價格分析：技術面顯示強勁支撐位",
-                        "description": "最新的技術分析顯示，比特幣在關鍵支撐位獲得強勁支持，多項指標暗示可能出現反彈趨勢...",
-                        "url": "https://example.com/btc-analysis",
-                        "image_url": "https://raw.githubusercontent.com/spothq/cryptocurrency-icons/master/128/color/bitcoin.png",
-                        "source": "Crypto Analytics",
-                        "published_at": datetime.now() - timedelta(hours=1),
-                        "sentiment": "bullish"
-                    },
-                    {
-                        "title": "以太坊2.0質押量突破新高",
-                        "description": "以太坊網絡的質押總量達到歷史新高，顯示投資者對該網絡長期發展的信心持續增強...",
-                        "url": "https://example.com/eth-staking",
-                        "image_url": "https://raw.githubusercontent.com/spothq/cryptocurrency-icons/master/128/color/ethereum.png",
-                        "source": "Ethereum News",
-                        "published_at": datetime.now() - timedelta(hours=2),
-                        "sentiment": "bullish"
-                    },
-                    {
-                        "title": "幣安智能鏈生態系統持續擴張",
-                        "description": "BNB Chain上的DeFi項目數量持續增長，新興項目為生態系統帶來更多創新和流動性...",
-                        "url": "https://example.com/bnb-ecosystem",
-                        "image_url": "https://raw.githubusercontent.com/spothq/cryptocurrency-icons/master/128/color/binancecoin.png",
-                        "source": "DeFi Times",
-                        "published_at": datetime.now() - timedelta(hours=3),
-                        "sentiment": "bullish"
-                    },
-                    {
-                        "title": "加密貨幣監管環境逐漸明朗",
-                        "description": "各國監管機構正在制定更清晰的加密貨幣監管框架，為行業發展提供更穩定的環境...",
-                        "url": "https://example.com/crypto-regulation",
-                        "image_url": "https://via.placeholder.com/300x200?text=Regulation+News",
-                        "source": "Regulatory Watch",
-                        "published_at": datetime.now() - timedelta(hours=4),
-                        "sentiment": "neutral"
-                    },
-                    {
-                        "title": "DeFi總鎖倉價值(TVL)創今年新高",
-                        "description": "去中心化金融協議的總鎖倉價值突破新的里程碑，反映了市場對DeFi產品的持續需求...",
-                        "url": "https://example.com/defi-tvl",
-                        "image_url": "https://via.placeholder.com/300x200?text=DeFi+News",
-                        "source": "DeFi Pulse",
-                        "published_at": datetime.now() - timedelta(hours=5),
-                        "sentiment": "bullish"
-                    }
-                ]
-                
-                # Add fallback news if we don't have enough real news
-                while len(news_items) < 10 and fallback_news:
-                    news_items.append(fallback_news.pop(0))
-            
-            # Cache the results for 5 minutes
-            news_cache[cache_key] = news_items
-            news_cache_expiry[cache_key] = datetime.now() + timedelta(minutes=5)
-            
-            return news_items
-        
+        # Cached for 5 minutes; concurrent misses share one upstream fetch
+        return await data_cache.get_or_load("news", "crypto_news", _fetch_crypto_news)
     except Exception as e:
         print(f"Error fetching crypto news: {str(e)}")
         
         # Return fallback news data
-        fallback_news = [
-            {
-                "title": "加密貨幣市場今日總覽",
-                "description": "今日加密貨幣市場表現穩定，主要貨幣維持在關鍵支撐位附近，市場情緒保持謹慎樂觀...",
-                "url": "https://example.com/market-overview",
-                "image_url": "https://via.placeholder.com/300x200?text=Market+News",
-                "source": "Crypto Daily",
-                "published_at": datetime.now() - timedelta(minutes=30),
-                "sentiment": "neutral"
-            },
-            {
-                "title": "機構投資者持續增持比特幣",
-                "description": "多家知名投資機構本週宣布增持比特幣，顯示機構資金對加密貨幣資產類別的信心持續增強...",
-                "url": "https://example.com/institutional-investment",
-                "image_url": "https://raw.githubusercontent.com/spothq/cryptocurrency-icons/master/128/color/bitcoin.png",
-                "source": "Investment Weekly",
-                "published_at": datetime.now() - timedelta(hours=1),
-                "sentiment": "bullish"
-            },
-            {
-                "title": "區塊鏈技術在傳統金融領域應用擴大",
-                "description": "越來越多傳統金融機構開始探索區塊鏈技術的實際應用，為加密貨幣行業發展帶來新機遇...",
-                "url": "https://example.com/blockchain-adoption",
-                "image_url": "https://via.placeholder.com/300x200?text=Blockchain+Tech",
-                "source": "FinTech Review",
-                "published_at": datetime.now() - timedelta(hours=2),
-                "sentiment": "bullish"
+        return _fallback_crypto_news()
+
+async def _fetch_crypto_news() -> List[Dict[str, Any]]:
+    # NewsAPI 的替代方案：使用免費的 CryptoCompare 新聞 API
+    async with http_pool.client() as client:
+        # Try CryptoCompare News API first (free tier)
+        response = await client.get(
+            "https://min-api.cryptocompare.com/data/v2/news/",
+            params={
+                "lang": "EN",
+                "sortOrder": "latest",
+                "extraParams": "crypto-tracker"
             }
-        ]
+        )
         
-        return fallback_news
+        news_items = []
+        
+        if response.status_code == 200:
+            data = response.json()
+            articles = data.get("Data", [])[:10]  # Get top 10 news
+            
+            for article in articles:
+                # Convert timestamp to datetime
+                published_timestamp = article.get("published_on", 0)
+                published_at = datetime.fromtimestamp(published_timestamp) if published_timestamp else datetime.now()
+                
+                # Clean up title and body
+                title = article.get("title", "").strip()
+                body = article.get("body", "").strip()
+                
+                # Truncate body to reasonable length
+                if len(body) > 200:
+                    body = body[:200] + "..."
+                
+                news_item = {
+                    "title": title,
+                    "description": body,
+                    "url": article.get("url", ""),
+                    "image_url": article.get("imageurl", ""),
+                    "source": article.get("source_info", {}).get("name", "CryptoCompare"),
+                    "published_at": published_at,
+                    "sentiment": "neutral"  # Default sentiment
+                }
+                
+                if title and body:  # Only add if we have essential content
+                    news_items.append(news_item)
+        
+        # Fallback to manual crypto news if API fails
+        if len(news_items) < 5:
+            fallback_news = [
+                {
+                    "title": "比特幣價格分析：技術面顯示強勁支撐位",
+                    "description": "最新的技術分析顯示，比特幣在關鍵支撐位獲得強勁支持，多項指標暗示可能出現反彈趨勢...",
+                    "url": "https://example.com/btc-analysis",
+                    "image_url": "https://raw.githubusercontent.com/spothq/cryptocurrency-icons/master/128/color/bitcoin.png",
+                    "source": "Crypto Analytics",
+                    "published_at": datetime.now() - timedelta(hours=1),
+                    "sentiment": "bullish"
+                },
+                {
+                    "title": "以太坊2.0質押量突破新高",
+                    "description": "以太坊網絡的質押總量達到歷史新高，顯示投資者對該網絡長期發展的信心持續增強...",
+                    "url": "https://example.com/eth-staking",
+                    "image_url": "https://raw.githubusercontent.com/spothq/cryptocurrency-icons/master/128/color/ethereum.png",
+                    "source": "Ethereum News",
+                    "published_at": datetime.now() - timedelta(hours=2),
+                    "sentiment": "bullish"
+                },
+                {
+                    "title": "幣安智能鏈生態系統持續擴張",
+                    "description": "BNB Chain上的DeFi項目數量持續增長，新興項目為生態系統帶來更多創新和流動性...",
+                    "url": "https://example.com/bnb-ecosystem",
+                    "image_url": "https://raw.githubusercontent.com/spothq/cryptocurrency-icons/master/128/color/binancecoin.png",
+                    "source": "DeFi Times",
+                    "published_at": datetime.now() - timedelta(hours=3),
+                    "sentiment": "bullish"
+                },
+                {
+                    "title": "加密貨幣監管環境逐漸明朗",
+                    "description": "各國監管機構正在制定更清晰的加密貨幣監管框架，為行業發展提供更穩定的環境...",
+                    "url": "https://example.com/crypto-regulation",
+                    "image_url": "https://via.placeholder.com/300x200?text=Regulation+News",
+                    "source": "Regulatory Watch",
+                    "published_at": datetime.now() - timedelta(hours=4),
+                    "sentiment": "neutral"
+                },
+                {
+                    "title": "DeFi總鎖倉價值(TVL)創今年新高",
+                    "description": "去中心化金融協議的總鎖倉價值突破新的里程碑，反映了市場對DeFi產品的持續需求...",
+                    "url": "https://example.com/defi-tvl",
+                    "image_url": "https://via.placeholder.com/300x200?text=DeFi+News",
+                    "source": "DeFi Pulse",
+                    "published_at": datetime.now() - timedelta(hours=5),
+                    "sentiment": "bullish"
+                }
+            ]
+            
+            # Add fallback news if we don't have enough real news
+            while len(news_items) < 10 and fallback_news:
+                news_items.append(fallback_news.pop(0))
+        
+        return news_items
+
+def _fallback_crypto_news() -> List[Dict[str, Any]]:
+    fallback_news = [
+        {
+            "title": "加密貨幣市場今日總覽",
+            "description": "今日加密貨幣市場表現穩定，主要貨幣維持在關鍵支撐位附近，市場情緒保持謹慎樂觀...",
+            "url": "https://example.com/market-overview",
+            "image_url": "https://via.placeholder.com/300x200?text=Market+News",
+            "source": "Crypto Daily",
+            "published_at": datetime.now() - timedelta(minutes=30),
+            "sentiment": "neutral"
+        },
+        {
+            "title": "機構投資者持續增持比特幣",
+            "description": "多家知名投資機構本週宣布增持比特幣，顯示機構資金對加密貨幣資產類別的信心持續增強...",
+            "url": "https://example.com/institutional-investment",
+            "image_url": "https://raw.githubusercontent.com/spothq/cryptocurrency-icons/master/128/color/bitcoin.png",
+            "source": "Investment Weekly",
+            "published_at": datetime.now() - timedelta(hours=1),
+            "sentiment": "bullish"
+        },
+        {
+            "title": "區塊鏈技術在傳統金融領域應用擴大",
+            "description": "越來越多傳統金融機構開始探索區塊鏈技術的實際應用，為加密貨幣行業發展帶來新機遇...",
+            "url": "https://example.com/blockchain-adoption",
+            "image_url": "https://via.placeholder.com/300x200?text=Blockchain+Tech",
+            "source": "FinTech Review",
+            "published_at": datetime.now() - timedelta(hours=2),
+            "sentiment": "bullish"
+        }
+    ]
+    
+    return fallback_news
 
 # API Endpoints
 @app.get("/")
@@ -1062,6 +1681,34 @@ async def websocket_status():
         "timestamp": datetime.now()
     }
 
+@app.get("/api/metrics")
+async def get_metrics():
+    """Get internal performance metrics for upstream fetching"""
+    return {
+        "http_pool": http_pool.stats(),
+        "rate_limits": rate_limiter.stats(),
+        "tick_store": tick_store.stats(),
+        "indicator_engine": indicator_engine.stats(),
+        "candles": candles.stats(),
+        "analytics_executor": analytics.stats(),
+        "event_loop_lag": loop_lag.stats(),
+        "websocket": manager.stats(),
+        "history_store": history_store.stats(),
+        "recommendations": recommendation_stats,
+        "database": database.stats() if database is not None else None,
+        "ingestion": ingestion.stats(),
+        "leader": await leader.stats() if leader is not None else None,
+        "quote_routers": {router.name: router.stats() for router in (price_router, price_batch_router)},
+        "cryptoapis_concurrency": cryptoapis_limiter.stats() if cryptoapis_limiter is not None else None,
+        "shared_cache": shared_cache.stats() if shared_cache is not None else None,
+        "cache": data_cache.stats(),
+        "single_flight": {
+            flight.name: flight.stats()
+            for flight in (price_flight, indicator_flight, overview_flight, news_flight, history_flight, initial_data_flight)
+        },
+        "timestamp": datetime.now()
+    }
+
 @app.get("/api/crypto/prices/{symbol}")
 async def get_crypto_price(symbol: str):
     """Get current price data for a cryptocurrency"""
@@ -1078,25 +1725,28 @@ async def get_crypto_price(symbol: str):
 async def get_all_crypto_prices():
     """Get current price data for all supported cryptocurrencies"""
     try:
-        all_prices = []
-        for symbol in COINGECKO_COINS.keys():
-            try:
-                price_data = await get_real_time_price(symbol)
-                all_prices.append(price_data)
-            except:
-                continue
+        # Served from the ingestion snapshot; fetch inline only before the first poll lands
+        snapshot = ingestion.snapshot
+        all_prices = snapshot.get("prices")
+        if all_prices is None:
+            all_prices = await get_real_time_prices(list(COINGECKO_COINS.keys()))
         
         return {
             "prices": all_prices,
             "count": len(all_prices),
-            "timestamp": datetime.now()
+            "timestamp": datetime.now(),
+            "data_age_seconds": snapshot.age("prices")
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/crypto/real-prices")
-async def get_real_crypto_prices_endpoint():
+async def get_real_crypto_prices_endpoint(stream: bool = False):
     """Get current real-time price data using HIGH-QUALITY MOCK DATA (APIs disabled)"""
+    if stream:
+        # NDJSON: one "price" line per asset as it arrives, then a "complete" line with the sorted list
+        return StreamingResponse(_real_prices_ndjson(), media_type="application/x-ndjson")
+    
     try:
         # Always use Mock data - no fallback to real APIs during development
         print("🎭 Serving high-quality mock crypto data")
@@ -1139,15 +1789,67 @@ async def get_real_crypto_prices_endpoint():
         print(f"Error in mock crypto prices endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Mock data service error: {str(e)}")
 
+async def _real_prices_ndjson() -> AsyncIterator[str]:
+    prices = []
+    try:
+        async for price_data in stream_real_crypto_prices():
+            prices.append(price_data)
+            yield json.dumps({"type": "price", "data": price_data}, cls=DateTimeEncoder) + "\n"
+    except Exception as e:
+        print(f"Error streaming real crypto prices: {str(e)}")
+        yield json.dumps({"type": "error", "message": str(e)}) + "\n"
+    
+    yield json.dumps({
+        "type": "complete",
+        "prices": _sort_by_price(prices),
+        "count": len(prices),
+        "timestamp": datetime.now()
+    }, cls=DateTimeEncoder) + "\n"
+
+@app.get("/api/crypto/technical")
+async def get_technical_indicators_batch(symbols: Optional[str] = None):
+    """Get technical analysis indicators for several cryptocurrencies at once (?symbols=BTC,ETH)"""
+    try:
+        requested = [s.strip().upper() for s in symbols.split(",") if s.strip()] if symbols else [
+            symbol for symbol in COINGECKO_COINS if symbol not in STABLECOINS
+        ]
+        unsupported = [symbol for symbol in requested if symbol not in COINGECKO_COINS]
+        if unsupported:
+            raise HTTPException(status_code=400, detail=f"Unsupported cryptocurrency: {', '.join(unsupported)}")
+        
+        indicators = await calculate_technical_indicators_batch(requested)
+        return {
+            "indicators": [indicators[symbol] for symbol in dict.fromkeys(requested)],
+            "count": len(indicators),
+            "timestamp": datetime.now()
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/crypto/technical/{symbol}")
-async def get_technical_indicators(symbol: str):
-    """Get technical analysis indicators for a cryptocurrency"""
+async def get_technical_indicators(symbol: str, timeframe: str = INDICATOR_TIMEFRAME):
+    """Get technical analysis indicators for a cryptocurrency (timeframe: 1m, 5m, 1h, 4h or 1d)"""
     try:
         if symbol.upper() not in COINGECKO_COINS:
             raise HTTPException(status_code=400, detail=f"Unsupported cryptocurrency: {symbol}")
+        if timeframe not in TIMEFRAMES:
+            raise HTTPException(status_code=400, detail=f"Unsupported timeframe: {timeframe}")
+        
+        if timeframe != INDICATOR_TIMEFRAME:
+            try:
+                return await calculate_technical_indicators(symbol, timeframe)
+            except IndicatorsUnavailable as e:
+                raise HTTPException(status_code=503, detail=str(e))
         
-        tech_data = await calculate_technical_indicators(symbol)
-        return tech_data
+        snapshot = ingestion.snapshot
+        tech_data = snapshot.get(f"indicators:{symbol.upper()}")
+        if tech_data is None:
+            return await calculate_technical_indicators(symbol)
+        return {**tech_data, "data_age_seconds": snapshot.age(f"indicators:{symbol.upper()}")}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1161,17 +1863,52 @@ async def get_investment_recommendation(symbol: str, timeframe: str = "medium"):
         if timeframe not in ["short", "medium", "long"]:
             timeframe = "medium"
         
-        recommendation = await generate_investment_recommendation(symbol, timeframe)
+        recommendation = await get_recommendation(symbol, timeframe)
         return recommendation
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/backtest")
+async def backtest_recommendation_rules(timeframe: str = INDICATOR_TIMEFRAME, max_hold: Optional[int] = None):
+    """Backtest the recommendation rules over stored history for every supported cryptocurrency"""
+    try:
+        if timeframe not in TIMEFRAMES:
+            raise HTTPException(status_code=400, detail=f"Unsupported timeframe: {timeframe}")
+        if max_hold is not None and not 1 <= max_hold <= MAX_HOLD_LIMIT:
+            raise HTTPException(status_code=400, detail=f"max_hold must be between 1 and {MAX_HOLD_LIMIT} bars")
+        
+        symbols = [symbol for symbol in COINGECKO_COINS if symbol not in STABLECOINS]
+        # Reading and resampling every symbol's history is blocking work; keep it off the event loop
+        ts, close, high, low, present = await asyncio.to_thread(load_universe, history_store, symbols, TIMEFRAMES[timeframe] * 1000)
+        if not present:
+            raise HTTPException(status_code=404, detail="No stored price history to backtest")
+        
+        overrides = {"max_hold": max_hold} if max_hold is not None else {}
+        rule_sets = [(name, {**params, **overrides}) for name, params in RULE_SETS.items()]
+        results = await analytics.run_arrays("backtest", backtest, (close, high, low), rule_sets, present)
+        return {
+            "timeframe": timeframe,
+            "bars": len(ts),
+            "from": datetime.fromtimestamp(ts[0] / 1000),
+            "to": datetime.fromtimestamp(ts[-1] / 1000),
+            "symbols": present,
+            "rule_sets": results,
+            "timestamp": datetime.now()
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/market/overview")
 async def get_market_overview_endpoint():
     """Get overall market overview"""
     try:
-        market_data = await get_market_overview()
-        return market_data
+        snapshot = ingestion.snapshot
+        market_data = snapshot.get("market_overview")
+        if market_data is None:
+            return await get_market_overview()
+        return {**market_data, "data_age_seconds": snapshot.age("market_overview")}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1189,15 +1926,11 @@ async def search_cryptocurrencies(query: str):
     """Search for cryptocurrencies by name or symbol"""
     try:
         query = query.upper()
-        results = []
-        
-        for symbol, coin_id in COINGECKO_COINS.items():
-            if query in symbol or query in coin_id:
-                try:
-                    price_data = await get_real_time_price(symbol)
-                    results.append(price_data)
-                except:
-                    continue
+        matches = [
+            symbol for symbol, coin_id in COINGECKO_COINS.items()
+            if query in symbol or query in coin_id
+        ]
+        results = await get_real_time_prices(matches)
         
         return {
             "query": query,
@@ -1219,11 +1952,17 @@ async def analyze_portfolio():
         top_coins = ["BTC", "ETH", "BNB", "SOL", "ADA"]
         portfolio_data = []
         
+        # Warm the price cache with one batched request
+        await get_real_time_prices(top_coins)
+        
+        # All indicators in one vectorized pass instead of one computation per coin
+        tech_by_coin = await calculate_technical_indicators_batch(top_coins)
+        
         for coin in top_coins:
             try:
                 price_data = await get_real_time_price(coin)
-                tech_data = await calculate_technical_indicators(coin)
-                recommendation = await generate_investment_recommendation(coin, "medium")
+                tech_data = tech_by_coin[coin]
+                recommendation = await get_recommendation(coin, "medium")
                 
                 portfolio_data.append({
                     "symbol": coin,
@@ -1285,11 +2024,15 @@ async def analyze_portfolio():
 async def get_crypto_news_endpoint():
     """Get latest cryptocurrency news"""
     try:
-        news_data = await get_crypto_news()
+        snapshot = ingestion.snapshot
+        news_data = snapshot.get("news")
+        if news_data is None:
+            news_data = await get_crypto_news()
         return {
             "news": news_data,
             "count": len(news_data),
-            "last_updated": datetime.now()
+            "last_updated": datetime.now(),
+            "data_age_seconds": snapshot.age("news")
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1298,38 +2041,45 @@ async def get_crypto_news_endpoint():
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     client_id = f"client_{len(manager.active_connections) + 1}_{datetime.now().timestamp()}"
+    # Wire format from ?format=json|msgpack|binary or a "crypto-tracker.<format>" subprotocol; JSON by default
+    wire_format, subprotocol = negotiate(websocket.query_params.get("format"), websocket.scope.get("subprotocols", []))
     
     try:
-        await manager.connect(websocket)
-        logging.info(f"WebSocket client {client_id} connected")
+        await manager.connect(websocket, client_id, wire_format, subprotocol)
+        logging.info(f"WebSocket client {client_id} connected ({wire_format})")
         
         # Send initial connection confirmation
-        await websocket.send_text(json.dumps({
+        established = {
             "type": "connection_established",
             "client_id": client_id,
             "timestamp": datetime.now().isoformat(),
-            "server_status": "healthy"
-        }, cls=DateTimeEncoder))
+            "server_status": "healthy",
+            "format": wire_format
+        }
+        if wire_format == "binary":
+            # Symbol ids used by binary price frames
+            established["symbols"] = manager.codec.symbols
+        await manager.send(websocket, json.dumps(established, cls=DateTimeEncoder))
         
-        # Send initial data
+        # Send initial data: one pre-encoded snapshot shared by every connect, so a
+        # reconnect storm costs memory copies instead of upstream calls
         try:
-            initial_data = await get_all_market_data()
-            if initial_data and (initial_data.get('prices') or initial_data.get('overview')):
-                await websocket.send_text(json.dumps({
-                    "type": "initial_data",
-                    "data": initial_data,
-                    "timestamp": datetime.now().isoformat(),
-                    "client_id": client_id
-                }, cls=DateTimeEncoder))
+            initial_data = initial_data_frame()
+            if initial_data is None:
+                # Before the first ingestion poll: concurrent connects share one fetch
+                initial_data = await initial_data_flight.do("initial_data", _fetch_initial_data)
+            if initial_data is not None:
+                await manager.send(websocket, initial_data)
+                manager.initial_data_served += 1
             else:
-                await websocket.send_text(json.dumps({
+                await manager.send(websocket, json.dumps({
                     "type": "error",
                     "message": "Unable to fetch initial market data",
                     "timestamp": datetime.now().isoformat()
                 }, cls=DateTimeEncoder))
         except Exception as e:
             logging.error(f"Error sending initial data to {client_id}: {e}")
-            await websocket.send_text(json.dumps({
+            await manager.send(websocket, json.dumps({
                 "type": "error",
                 "message": "Failed to load initial data",
                 "timestamp": datetime.now().isoformat()
@@ -1344,7 +2094,7 @@ async def websocket_endpoint(websocket: WebSocket):
                 
                 # Handle different message types from client
                 if message.get("type") == "ping":
-                    await websocket.send_text(json.dumps({
+                    await manager.send(websocket, json.dumps({
                         "type": "pong",
                         "timestamp": datetime.now().isoformat(),
                         "client_id": client_id
@@ -1354,7 +2104,7 @@ async def websocket_endpoint(websocket: WebSocket):
                     try:
                         market_data = await get_all_market_data()
                         if market_data:
-                            await websocket.send_text(json.dumps({
+                            await manager.send(websocket, json.dumps({
                                 "type": "market_update",
                                 "data": market_data,
                                 "timestamp": datetime.now().isoformat(),
@@ -1362,35 +2112,87 @@ async def websocket_endpoint(websocket: WebSocket):
                                 "requested": True
                             }))
                         else:
-                            await websocket.send_text(json.dumps({
+                            await manager.send(websocket, json.dumps({
                                 "type": "error",
                                 "message": "No market data available",
                                 "timestamp": datetime.now().isoformat()
                             }))
                     except Exception as e:
                         logging.error(f"Error fetching requested data for {client_id}: {e}")
-                        await websocket.send_text(json.dumps({
+                        await manager.send(websocket, json.dumps({
                             "type": "error",
                             "message": "Failed to fetch market data",
                             "timestamp": datetime.now().isoformat()
                         }))
                         
-                elif message.get("type") == "subscribe":
-                    # Future: Handle specific symbol subscriptions
-                    await websocket.send_text(json.dumps({
+                elif message.get("type") == "request_real_prices":
+                    # Opt-in streaming: push each asset as it arrives, then the sorted full list
+                    prices = []
+                    async for price_data in stream_real_crypto_prices():
+                        prices.append(price_data)
+                        await manager.send(websocket, json.dumps({
+                            "type": "price_update",
+                            "data": price_data,
+                            "timestamp": datetime.now().isoformat()
+                        }, cls=DateTimeEncoder))
+                    await manager.send(websocket, json.dumps({
+                        "type": "real_prices",
+                        "data": {"prices": _sort_by_price(prices), "count": len(prices)},
+                        "timestamp": datetime.now().isoformat(),
+                        "client_id": client_id
+                    }, cls=DateTimeEncoder))
+                    
+                elif message.get("type") in ("subscribe_deltas", "resync"):
+                    # Delta stream: a snapshot, then only changed fields per symbol with a sequence
+                    # number; a client that sees a gap sends resync for a fresh snapshot
+                    await manager.start_deltas(websocket, await get_all_market_data())
+                    
+                elif message.get("type") in ("subscribe", "unsubscribe"):
+                    # Topics are channels (prices, overview, indicators, news) or per-symbol
+                    # (prices:BTC, indicators:ETH); "symbols" is shorthand for their price topics.
+                    # After a subscribe the client gets only its topics instead of market_update.
+                    # A bare subscribe means every price, as before topics existed
+                    default = ["all"] if message["type"] == "subscribe" and "topics" not in message else []
+                    symbols = message.get("symbols", default)
+                    requested = list(message.get("topics", [])) + [
+                        "prices" if symbol == "all" else f"prices:{symbol}" for symbol in symbols
+                    ]
+                    try:
+                        topics = [normalize_topic(topic) for topic in requested]
+                        if message["type"] == "subscribe" and not topics:
+                            # Would leave the client with no topics and no market_update either
+                            raise ValueError("subscribe needs at least one topic or symbol")
+                    except ValueError as e:
+                        await manager.send(websocket, json.dumps({
+                            "type": "error",
+                            "message": str(e),
+                            "timestamp": datetime.now().isoformat()
+                        }))
+                        continue
+                    if message["type"] == "subscribe":
+                        await manager.subscribe(websocket, topics, ingestion.snapshot)
+                    else:
+                        manager.topics.unsubscribe(websocket, topics)
+                    subscribed = sorted(manager.topics.topics(websocket))
+                    await manager.send(websocket, json.dumps({
                         "type": "subscription_confirmed",
-                        "symbols": message.get("symbols", ["all"]),
+                        "topics": subscribed,
+                        # Price symbols the client actually receives, "all" for the whole prices channel
+                        "symbols": [
+                            "all" if topic == "prices" else topic.split(":", 1)[1]
+                            for topic in subscribed if topic == "prices" or topic.startswith("prices:")
+                        ],
                         "timestamp": datetime.now().isoformat()
                     }))
                     
             except asyncio.TimeoutError:
                 # Send keepalive ping if no messages received
                 try:
-                    await websocket.send_text(json.dumps({
+                    await manager.send(websocket, json.dumps({
                         "type": "keepalive",
                         "timestamp": datetime.now().isoformat()
                     }))
-                except:
+                except WebSocketDisconnect:
                     break
                     
             except WebSocketDisconnect:
@@ -1398,7 +2200,7 @@ async def websocket_endpoint(websocket: WebSocket):
                 break
                 
             except json.JSONDecodeError:
-                await websocket.send_text(json.dumps({
+                await manager.send(websocket, json.dumps({
                     "type": "error",
                     "message": "Invalid JSON format",
                     "timestamp": datetime.now().isoformat()
@@ -1407,12 +2209,12 @@ async def websocket_endpoint(websocket: WebSocket):
             except Exception as e:
                 logging.error(f"Error processing message from {client_id}: {e}")
                 try:
-                    await websocket.send_text(json.dumps({
+                    await manager.send(websocket, json.dumps({
                         "type": "error",
                         "message": "Message processing error",
                         "timestamp": datetime.now().isoformat()
                     }))
-                except:
+                except WebSocketDisconnect:
                     break
                 
     except WebSocketDisconnect:
@@ -1423,30 +2225,187 @@ async def websocket_endpoint(websocket: WebSocket):
         manager.disconnect(websocket)
         logging.info(f"WebSocket client {client_id} cleanup completed")
 
+# Coins in the WebSocket market payload
+WS_MARKET_SYMBOLS = ['BTC', 'ETH', 'BNB', 'SOL', 'XRP', 'USDC', 'ADA', 'AVAX', 'DOT', 'MATIC']
+
+def _snapshot_market_data(snapshot) -> Optional[Dict[str, Any]]:
+    """The WebSocket market payload from the ingestion snapshot alone; None until prices and overview landed"""
+    all_prices = snapshot.get("prices")
+    overview = snapshot.get("market_overview")
+    if all_prices is None or overview is None:
+        return None
+    by_symbol = {price['symbol']: price for price in all_prices}
+    return {
+        "prices": [by_symbol[symbol] for symbol in WS_MARKET_SYMBOLS if symbol in by_symbol],
+        "overview": overview,
+        "data_age_seconds": {
+            "prices": snapshot.age("prices"),
+            "overview": snapshot.age("market_overview")
+        }
+    }
+
+def initial_data_frame() -> Optional[Frame]:
+    """Pre-encoded initial_data for the current ingestion snapshot, rebuilt at most once per snapshot version"""
+    snapshot = ingestion.snapshot
+    if manager.initial_version != snapshot.version:
+        market_data = _snapshot_market_data(snapshot)
+        if market_data is not None:
+            manager.set_initial_data(market_data, snapshot.version)
+    return manager.initial_data
+
+async def _fetch_initial_data() -> Optional[Frame]:
+    """initial_data from upstream, for connects before the first ingestion poll lands"""
+    market_data = await get_all_market_data()
+    if not market_data or not (market_data.get('prices') or market_data.get('overview')):
+        return None
+    return manager.initial_data_message(market_data, None)
+
 async def get_all_market_data():
     """Get all market data in a single call for WebSocket broadcasting"""
     try:
+        snapshot = ingestion.snapshot
+        market_data = _snapshot_market_data(snapshot)
+        if market_data is not None:
+            return market_data
+        
         # Get crypto prices
-        crypto_symbols = ['BTC', 'ETH', 'BNB', 'SOL', 'XRP', 'USDC', 'ADA', 'AVAX', 'DOT', 'MATIC']
-        prices = []
-        for symbol in crypto_symbols:
-            try:
-                price_data = await get_real_time_price(symbol)
-                prices.append(price_data)
-            except:
-                continue
+        crypto_symbols = WS_MARKET_SYMBOLS
+        all_prices = snapshot.get("prices")
+        if all_prices is not None:
+            by_symbol = {price['symbol']: price for price in all_prices}
+            prices = [by_symbol[symbol] for symbol in crypto_symbols if symbol in by_symbol]
+        else:
+            prices = await get_real_time_prices(crypto_symbols)
         
         # Get market overview
-        overview = await get_market_overview()
+        overview = snapshot.get("market_overview")
+        if overview is None:
+            overview = await get_market_overview()
         
         return {
             "prices": prices,
-            "overview": overview
+            "overview": overview,
+            "data_age_seconds": {
+                "prices": snapshot.age("prices"),
+                "overview": snapshot.age("market_overview")
+            }
         }
     except Exception as e:
         logging.error(f"Error getting all market data: {e}")
         return {"prices": [], "overview": {}}
 
+# Background ingestion: upstream polling runs on its own cadence, off the request path
+INGESTION_INTERVALS = {
+    "prices": 3,
+    "market_overview": 10,
+    "indicators": 300,
+    "news": 300,
+    # Only candles that closed since the last run are recomputed
+    "recommendations": 60
+}
+
+# With a shared store, one process (across workers and hosts) holds the ingestion
+# lease and polls upstream; the others follow its published snapshot
+leader = (
+    LeaderElector(shared_cache, lease_ttl=float(os.getenv("LEADER_LEASE_TTL", "10")))
+    if shared_cache is not None else None
+)
+ingestion = IngestionScheduler(shared=shared_cache, leader=leader)
+
+async def ingest_prices() -> Dict[str, Any]:
+    """Poll every supported price with one batched request"""
+    coins = {coin_id: symbol for symbol, coin_id in COINGECKO_COINS.items() if symbol not in STABLECOINS}
+    # No mock fallback here: a failed poll raises, so the last good prices stay up (and age) and the job backs off
+    with request_priority(PRIORITY_REFRESH):
+        batch = await price_flight.do(tuple(sorted(coins)), lambda: _load_price_batch(coins))
+    absent = [symbol for symbol in coins.values() if symbol not in batch]
+    if absent:
+        raise ValueError(f"No price data for {', '.join(absent)}")
+    prices = [batch.get(symbol) or _stablecoin_price_data(symbol) for symbol in COINGECKO_COINS]
+    return {"prices": prices}
+
+async def ingest_market_overview() -> Dict[str, Any]:
+    with request_priority(PRIORITY_REFRESH):
+        return {"market_overview": await data_cache.refresh("market_overview", "global", _fetch_market_overview)}
+
+async def ingest_indicators() -> Dict[str, Any]:
+    failed = {}
+    for symbol in COINGECKO_COINS:
+        if symbol in STABLECOINS:
+            continue
+        # 60-day history downloads yield to user-facing and refresh calls
+        try:
+            with request_priority(PRIORITY_BACKFILL):
+                tech_data = await _technical_indicators(symbol)
+        except Exception as e:
+            # Keep (and age) the last good values instead of publishing mock ones
+            failed[symbol] = e
+            continue
+        # Publish each symbol as soon as it lands instead of after the whole sweep
+        ingestion.publish({f"indicators:{symbol}": tech_data})
+    if failed:
+        # Counts as a failed run so the job backs off
+        raise ValueError(f"Indicators failed for {', '.join(f'{symbol} ({error})' for symbol, error in failed.items())}")
+    return {}
+
+async def ingest_recommendations() -> Dict[str, Any]:
+    """Recompute recommendations whose candle closed since the last run and persist them in one batch"""
+    snapshot = ingestion.snapshot
+    updates = {}
+    for timeframe in RECOMMENDATION_TIMEFRAMES:
+        for symbol in COINGECKO_COINS:
+            if symbol in STABLECOINS:
+                continue
+            # Memoized per candle, so unchanged symbols cost a cache lookup
+            with request_priority(PRIORITY_BACKFILL):
+                row = await _precompute_recommendation(symbol, timeframe)
+            key = _recommendation_key(symbol, timeframe)
+            current = snapshot.get(key)
+            if row is None or (current is not None and current["candle"] == row["candle"]):
+                continue
+            updates[key] = row
+    
+    if updates and database is not None:
+        rows = [{
+            "symbol": row["symbol"],
+            "recommendation": row["recommendation"],
+            "confidence_score": row["confidence"],
+            "timeframe": row["timeframe"],
+            "target_price": row["target_price"],
+            "stop_loss": row["stop_loss"],
+            "reasoning": row["reasoning"],
+            "technical_score": technical_score(row),
+            "created_at": row["generated_at"],
+            "expires_at": row["expires_at"]
+        } for row in updates.values()]
+        names = {row["symbol"]: COINGECKO_COINS[row["symbol"]].replace('-', ' ').title() for row in rows}
+        await asyncio.to_thread(database.write_recommendations, rows, names)
+    return updates
+
+async def ingest_news() -> Dict[str, Any]:
+    with request_priority(PRIORITY_REFRESH):
+        return {"news": await data_cache.refresh("news", "crypto_news", _fetch_crypto_news)}
+
+ingestion.add_job("prices", INGESTION_INTERVALS["prices"], ingest_prices, keys=["prices"])
+ingestion.add_job("market_overview", INGESTION_INTERVALS["market_overview"], ingest_market_overview, keys=["market_overview"])
+ingestion.add_job(
+    "indicators",
+    INGESTION_INTERVALS["indicators"],
+    ingest_indicators,
+    keys=[f"indicators:{symbol}" for symbol in COINGECKO_COINS if symbol not in STABLECOINS]
+)
+ingestion.add_job("news", INGESTION_INTERVALS["news"], ingest_news, keys=["news"])
+ingestion.add_job(
+    "recommendations",
+    INGESTION_INTERVALS["recommendations"],
+    ingest_recommendations,
+    keys=[
+        _recommendation_key(symbol, timeframe)
+        for timeframe in RECOMMENDATION_TIMEFRAMES
+        for symbol in COINGECKO_COINS if symbol not in STABLECOINS
+    ]
+)
+
 # Background task for real-time data broadcasting
 async def broadcast_market_data():
     """Background task that broadcasts market data to all connected clients"""
@@ -1455,19 +2414,25 @@ async def broadcast_market_data():
     
     while True:
         try:
+            # Keep the pre-encoded initial_data current for the next connect
+            initial_data_frame()
             if manager.active_connections:
-                market_data = await get_all_market_data()
-                if market_data and (market_data.get('prices') or market_data.get('overview')):
-                    await manager.broadcast({
-                        "type": "market_update",
-                        "data": market_data,
-                        "timestamp": datetime.now().isoformat(),
-                        "server_status": "healthy",
-                        "active_connections": len(manager.active_connections)
-                    })
-                    consecutive_errors = 0  # Reset error counter on success
-                else:
-                    logging.warning("Empty market data received, skipping broadcast")
+                # Subscribed clients: only the topics that changed, fanned out per topic
+                manager.publish_topics(ingestion.snapshot)
+                if manager.delta_clients or manager.broadcast_clients():
+                    market_data = await get_all_market_data()
+                    if market_data and (market_data.get('prices') or market_data.get('overview')):
+                        manager.publish_deltas(market_data)
+                        await manager.broadcast({
+                            "type": "market_update",
+                            "data": market_data,
+                            "timestamp": datetime.now().isoformat(),
+                            "server_status": "healthy",
+                            "active_connections": len(manager.active_connections)
+                        })
+                    else:
+                        logging.warning("Empty market data received, skipping broadcast")
+                consecutive_errors = 0  # Reset error counter on success
             else:
                 # No active connections, wait longer to save resources
                 await asyncio.sleep(15)
@@ -1495,11 +2460,43 @@ async def broadcast_market_data():
 # Start background task when the application starts
 @app.on_event("startup")
 async def startup_event():
-    # Start the background task for broadcasting
+    # Open the shared upstream HTTP clients before anything fetches
+    await http_pool.start()
+    if database is not None:
+        await asyncio.to_thread(database.create_all)
+    loop_lag.start()
+    
+    # Campaign once before polling starts so the first round runs with the right role
+    if leader is not None:
+        await leader.campaign()
+        leader.start()
+    
+    # Start upstream polling, then the background task for broadcasting
+    ingestion.start()
     asyncio.create_task(broadcast_market_data())
     logging.info("Real-time data broadcasting started")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await ingestion.stop()
+    if leader is not None:
+        await leader.stop()
+    await http_pool.close()
+    await loop_lag.stop()
+    analytics.shutdown()
+    if database is not None:
+        database.close()
+    if shared_cache is not None:
+        await shared_cache.close()
+
 if __name__ == "__main__":
     import uvicorn
     logging.basicConfig(level=logging.INFO)
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # permessage-deflate is negotiated with clients that offer it; WS_PER_MESSAGE_DEFLATE=false turns it off
+    # (with the uvicorn CLI, pass --ws-per-message-deflate false instead)
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        ws_per_message_deflate=os.getenv("WS_PER_MESSAGE_DEFLATE", "true").lower() not in ("0", "false", "no")
+    )
\ No newline at end of file
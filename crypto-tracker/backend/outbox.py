@@ -0,0 +1,162 @@
+"""Per-connection send queues for WebSocket fan-out.
+
+Every connection gets a ClientOutbox: a bounded queue drained by its own
+writer task. Broadcasting only enqueues an already-encoded message on each
+outbox and never awaits a socket, so one slow or stalled client cannot hold up
+the others.
+
+Messages may carry a conflation key (``market_update``, ``price:BTC``,
+``overview``...). Putting a message whose key is already queued replaces the
+queued one in place, so a slow consumer ends up with only the latest state per
+key instead of a backlog. Unkeyed messages (replies, snapshots, deltas) are
+delivered in order. When the queue is full the oldest entry is dropped and
+counted; delta clients see the gap in sequence numbers and resync.
+
+A send still in flight after ``send_timeout`` is noticed on the next put: the
+writer is cancelled and the client treated as gone. Checking there instead of
+wrapping every send in a timeout keeps the hot path free of extra tasks.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Union
+
+DEFAULT_MAX_QUEUE = 64
+# A send that takes longer than this marks the client as dead
+DEFAULT_SEND_TIMEOUT = 10.0
+
+
+class OutboxClosed(Exception):
+    """Raised when sending to a connection whose writer has stopped"""
+
+
+class ClientOutbox:
+    """Bounded, conflating send queue with a writer task for one connection"""
+
+    def __init__(
+        self,
+        websocket,
+        client_id: Optional[str] = None,
+        wire_format: str = "json",
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        send_timeout: float = DEFAULT_SEND_TIMEOUT,
+        on_sent: Optional[Callable[[Union[str, bytes]], None]] = None,
+        on_error: Optional[Callable[[Any], None]] = None,
+    ):
+        self.websocket = websocket
+        self.client_id = client_id
+        # Messages arrive already encoded for this format: str goes out as text, bytes as binary
+        self.wire_format = wire_format
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self._on_sent = on_sent
+        self._on_error = on_error
+        self._queue: "OrderedDict[Hashable, Union[str, bytes]]" = OrderedDict()
+        self._unkeyed = itertools.count()
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # monotonic() when the send in flight started, None when the writer is idle
+        self._sending_since: Optional[float] = None
+        self._stalled = False
+        self.closed = False
+
+        self.messages_sent = 0
+        self.bytes_sent = 0
+        self.conflated = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def put(self, message: Union[str, bytes], key: Optional[Hashable] = None):
+        """Queue an encoded message without waiting; a queued message with the same key is replaced"""
+        if self.closed:
+            raise OutboxClosed(self.client_id)
+        if self._sending_since is not None and time.monotonic() - self._sending_since > self.send_timeout:
+            # The writer is stuck on a dead peer; stop it and let _fail clean up
+            self._stalled = True
+            self.closed = True
+            self._task.cancel()
+            return
+        if key is not None and key in self._queue:
+            self._queue[key] = message
+            self.conflated += 1
+            return
+        if len(self._queue) >= self.max_queue:
+            self._queue.popitem(last=False)
+            self.dropped += 1
+        self._queue[key if key is not None else ("_unkeyed", next(self._unkeyed))] = message
+        self.max_depth = max(self.max_depth, len(self._queue))
+        self._ready.set()
+
+    async def _run(self):
+        while True:
+            await self._ready.wait()
+            if not self._queue:
+                self._ready.clear()
+                continue
+            _, message = self._queue.popitem(last=False)
+            self._sending_since = time.monotonic()
+            try:
+                if isinstance(message, str):
+                    await self.websocket.send_text(message)
+                else:
+                    await self.websocket.send_bytes(message)
+            except asyncio.CancelledError:
+                if not self._stalled:
+                    raise
+                await self._fail(TimeoutError(f"send took over {self.send_timeout}s"))
+                return
+            except Exception as e:
+                await self._fail(e)
+                return
+            finally:
+                self._sending_since = None
+            self.messages_sent += 1
+            self.bytes_sent += len(message)
+            if self._on_sent is not None:
+                self._on_sent(message)
+
+    async def _fail(self, error: Exception):
+        logging.info(f"WebSocket writer for {self.client_id} stopped: {error!r}")
+        self.closed = True
+        self._queue.clear()
+        # Best effort, so the handler's receive loop ends too; a stalled peer may not answer
+        try:
+            await asyncio.wait_for(self.websocket.close(), 1.0)
+        except Exception:
+            pass
+        if self._on_error is not None:
+            self._on_error(self.websocket)
+
+    def close(self):
+        """Stop the writer; queued messages are discarded"""
+        self.closed = True
+        self._queue.clear()
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+
+    @property
+    def idle(self) -> bool:
+        """Nothing queued and nothing in flight"""
+        return not self._queue and self._sending_since is None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "client_id": self.client_id,
+            "format": self.wire_format,
+            "queue_depth": len(self._queue),
+            "sending_for": round(time.monotonic() - self._sending_since, 3) if self._sending_since is not None else None,
+            "max_depth": self.max_depth,
+            "messages_sent": self.messages_sent,
+            "bytes_sent": self.bytes_sent,
+            "conflated": self.conflated,
+            "dropped": self.dropped,
+        }
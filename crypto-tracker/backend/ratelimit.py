@@ -0,0 +1,186 @@
+"""Upstream rate-limit budgets with priority queues.
+
+Every outbound call to a rate-limited provider takes a token from that
+provider's bucket first. When the bucket is empty the call is queued, not
+failed, and queued calls are released in priority order as tokens refill:
+user-facing requests before scheduled refreshes, refreshes before history
+backfill. A 429 from the provider empties the bucket and pauses it for the
+Retry-After period.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+PRIORITY_USER = 0
+PRIORITY_REFRESH = 1
+PRIORITY_BACKFILL = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_USER: "user",
+    PRIORITY_REFRESH: "refresh",
+    PRIORITY_BACKFILL: "backfill",
+}
+
+_priority: ContextVar[int] = ContextVar("upstream_priority", default=PRIORITY_USER)
+
+
+@contextmanager
+def request_priority(priority: int):
+    """Run upstream calls made inside the block (and tasks it spawns) at ``priority``"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+class ProviderBudget:
+    """Token bucket plus a priority queue of callers waiting for tokens"""
+
+    def __init__(self, name: str, rate_per_minute: float, burst: int):
+        self.name = name
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        self.granted = 0
+        self.queued = 0
+        self.throttled = 0
+        self.max_queue_depth = 0
+        self.wait_seconds = 0.0
+        self.granted_by_priority: Dict[str, int] = {name: 0 for name in PRIORITY_NAMES.values()}
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _grant(self, priority: int):
+        self._tokens -= 1
+        self.granted += 1
+        key = PRIORITY_NAMES.get(priority, str(priority))
+        self.granted_by_priority[key] = self.granted_by_priority.get(key, 0) + 1
+
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    async def acquire(self, priority: int = PRIORITY_USER):
+        """Wait until a token is available for a call at ``priority``"""
+        now = time.monotonic()
+        self._refill(now)
+        if not self._waiters and now >= self._paused_until and self._tokens >= 1:
+            self._grant(priority)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self.queued += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth())
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+        started = time.monotonic()
+        try:
+            await future
+        finally:
+            self.wait_seconds += time.monotonic() - started
+
+    async def _dispatch(self):
+        while self._waiters:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                continue
+            priority, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                # Caller gave up (cancelled) while queued
+                continue
+            self._grant(priority)
+            future.set_result(None)
+
+    def throttle(self, retry_after: Optional[float] = None):
+        """Empty the bucket after the provider answered 429"""
+        self.throttled += 1
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        if retry_after:
+            self._paused_until = max(self._paused_until, self._updated + retry_after)
+        logging.warning(f"Upstream {self.name} throttled us; pausing budget for {retry_after or 0}s")
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill(time.monotonic())
+        return {
+            "rate_per_minute": round(self.rate * 60, 2),
+            "burst": self.burst,
+            "tokens_available": round(self._tokens, 2),
+            "paused_for": round(max(self._paused_until - time.monotonic(), 0.0), 2),
+            "queue_depth": self.queue_depth(),
+            "max_queue_depth": self.max_queue_depth,
+            "granted": self.granted,
+            "granted_by_priority": dict(self.granted_by_priority),
+            "queued": self.queued,
+            "throttled": self.throttled,
+            "total_wait_seconds": round(self.wait_seconds, 3),
+        }
+
+
+class RateLimitScheduler:
+    """Per-provider budgets, looked up by upstream host"""
+
+    def __init__(self):
+        self._budgets: Dict[str, ProviderBudget] = {}
+        self._hosts: Dict[str, str] = {}
+
+    def configure(self, provider: str, rate_per_minute: float, burst: int, hosts: List[str]) -> ProviderBudget:
+        budget = ProviderBudget(provider, rate_per_minute, burst)
+        self._budgets[provider] = budget
+        for host in hosts:
+            self._hosts[host] = provider
+        return budget
+
+    def budget_for_host(self, host: str) -> Optional[ProviderBudget]:
+        provider = self._hosts.get(host)
+        return self._budgets.get(provider) if provider else None
+
+    async def acquire_for_host(self, host: str):
+        """Take a token for ``host`` at the caller's priority; hosts without a budget pass straight through"""
+        budget = self.budget_for_host(host)
+        if budget is not None:
+            await budget.acquire(current_priority())
+
+    def throttle_host(self, host: str, retry_after: Optional[float] = None):
+        budget = self.budget_for_host(host)
+        if budget is not None:
+            budget.throttle(retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: budget.stats() for name, budget in self._budgets.items()}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+rate_limiter = RateLimitScheduler()
@@ -0,0 +1,235 @@
+"""Multi-provider quote routing with hedged requests and circuit breakers.
+
+A QuoteRouter holds an ordered list of providers that can answer the same
+question (e.g. "current price of BTC"). Each call goes to the first provider
+whose circuit breaker is closed. If that provider has not answered by its own
+p95 latency, the request is hedged to the next provider, and whichever valid
+answer arrives first wins; the losers are cancelled. A provider that fails is
+failed over to the next one immediately rather than after its timeout.
+
+Per-provider latency and error rates are kept over a rolling window. After
+``failure_threshold`` consecutive failures a provider's breaker opens and it
+is skipped for ``reset_timeout`` seconds, then a single trial call decides
+whether it closes again.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a single half-open trial call"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+        self.state = CLOSED
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.times_opened += 1
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def record_cancelled(self):
+        # A cancelled hedge loser says nothing about the provider's health
+        self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+        }
+
+
+class QuoteProvider:
+    """One upstream source plus its rolling latency/error window and breaker"""
+
+    def __init__(
+        self,
+        name: str,
+        fetch: Callable[..., Awaitable[Any]],
+        window: int = 200,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ):
+        self.name = name
+        self.fetch = fetch
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._latencies: deque = deque(maxlen=window)
+        self._outcomes: deque = deque(maxlen=window)
+
+        self.requests = 0
+        self.failures = 0
+        self.cancelled = 0
+        self.wins = 0
+        self.last_error: Optional[str] = None
+
+    def p95(self) -> Optional[float]:
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.p95()
+        return {
+            "requests": self.requests,
+            "wins": self.wins,
+            "failures": self.failures,
+            "cancelled": self.cancelled,
+            "error_rate": round(self.error_rate(), 4),
+            "latency_samples": len(self._latencies),
+            "p95_ms": round(p95 * 1000, 2) if p95 is not None else None,
+            "breaker": self.breaker.stats(),
+            "last_error": self.last_error,
+        }
+
+
+class QuoteRouter:
+    """Routes one kind of quote across providers, hedging slow ones"""
+
+    def __init__(
+        self,
+        name: str,
+        default_hedge_delay: float = 1.5,
+        min_hedge_delay: float = 0.05,
+        min_samples: int = 10,
+    ):
+        self.name = name
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.min_samples = min_samples
+        self._providers: List[QuoteProvider] = []
+
+        self.calls = 0
+        self.hedges = 0
+        self.failovers = 0
+        self.exhausted = 0
+
+    def add_provider(self, name: str, fetch: Callable[..., Awaitable[Any]], **options) -> QuoteProvider:
+        """Append a provider; earlier providers are tried first"""
+        provider = QuoteProvider(name, fetch, **options)
+        self._providers.append(provider)
+        return provider
+
+    def hedge_delay(self, provider: QuoteProvider) -> float:
+        """How long to wait on ``provider`` before hedging: its p95 once we have enough samples"""
+        if len(provider._latencies) < self.min_samples:
+            return self.default_hedge_delay
+        return max(provider.p95(), self.min_hedge_delay)
+
+    async def _call(self, provider: QuoteProvider, args: Tuple, validate: Optional[Callable[[Any], bool]]) -> Any:
+        provider.requests += 1
+        started = time.perf_counter()
+        try:
+            value = await provider.fetch(*args)
+            if validate is not None and not validate(value):
+                raise ValueError(f"Invalid quote from {provider.name}")
+        except asyncio.CancelledError:
+            provider.cancelled += 1
+            provider.breaker.record_cancelled()
+            raise
+        except Exception as e:
+            provider.failures += 1
+            provider.last_error = str(e)
+            provider._outcomes.append(False)
+            provider.breaker.record_failure()
+            raise
+        provider._latencies.append(time.perf_counter() - started)
+        provider._outcomes.append(True)
+        provider.breaker.record_success()
+        return value
+
+    async def fetch(self, *args, validate: Optional[Callable[[Any], bool]] = None) -> Tuple[str, Any]:
+        """Return ``(provider_name, value)`` from the first provider to answer validly"""
+        self.calls += 1
+        candidates = [provider for provider in self._providers if provider.breaker.allow()]
+        if not candidates:
+            self.exhausted += 1
+            raise RuntimeError(f"No {self.name} provider available (all circuits open)")
+
+        pending: Dict[asyncio.Future, QuoteProvider] = {}
+        errors = []
+        launched = 0
+
+        def launch():
+            nonlocal launched
+            provider = candidates[launched]
+            launched += 1
+            pending[asyncio.ensure_future(self._call(provider, args, validate))] = provider
+
+        launch()
+        try:
+            while pending:
+                delay = self.hedge_delay(candidates[launched - 1]) if launched < len(candidates) else None
+                done, _ = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # The latest provider is past its p95; race the next one against it
+                    self.hedges += 1
+                    launch()
+                    continue
+                for task in done:
+                    provider = pending.pop(task)
+                    if task.exception() is None:
+                        provider.wins += 1
+                        return provider.name, task.result()
+                    errors.append(f"{provider.name}: {task.exception()}")
+                if not pending and launched < len(candidates):
+                    self.failovers += 1
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+            for provider in candidates[launched:]:
+                # Hand back half-open trial slots we reserved but never used
+                provider.breaker.record_cancelled()
+
+        self.exhausted += 1
+        message = "; ".join(errors)
+        logging.warning(f"All {self.name} providers failed: {message}")
+        raise RuntimeError(f"All {self.name} providers failed: {message}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "failovers": self.failovers,
+            "exhausted": self.exhausted,
+            "providers": {provider.name: provider.stats() for provider in self._providers},
+        }
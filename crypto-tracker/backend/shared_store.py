@@ -0,0 +1,322 @@
+"""Optional shared cache/snapshot backend for multi-worker deployments.
+
+With ``REDIS_URL`` set, every uvicorn worker (and every host) reads and writes
+the same Redis keys, so one worker's upstream fetch serves all of them.
+``REDIS_URL=memory://`` selects an in-process store with the same interface,
+for single-process runs and tests without a Redis server.
+
+- values are packed with MessagePack (compact JSON when msgpack is missing)
+- multi-key reads and writes are pipelined into one round trip
+- a short-lived in-process near-cache sits in front of the remote store
+- backend errors are logged and counted, never raised to request handlers
+"""
+
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:
+    redis_asyncio = None
+
+_DATETIME_EXT = 1
+
+# Take the lease if free, or extend it if we already hold it
+_ACQUIRE_LEASE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+elseif current == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+# Delete the lease only if we still hold it
+_RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def _plain(obj: Any) -> Any:
+    # numpy scalars (e.g. np.float64 from pandas/ta) -> Python numbers
+    if hasattr(obj, "item") and callable(obj.item):
+        return obj.item()
+    raise TypeError(f"Cannot encode {type(obj).__name__}")
+
+
+def _msgpack_default(obj: Any) -> Any:
+    if isinstance(obj, datetime):
+        return msgpack.ExtType(_DATETIME_EXT, obj.isoformat().encode())
+    return _plain(obj)
+
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    if code == _DATETIME_EXT:
+        return datetime.fromisoformat(data.decode())
+    return msgpack.ExtType(code, data)
+
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, datetime):
+        return {"__dt__": obj.isoformat()}
+    return _plain(obj)
+
+
+def _json_object_hook(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and "__dt__" in obj:
+        return datetime.fromisoformat(obj["__dt__"])
+    return obj
+
+
+def encode_value(value: Any) -> bytes:
+    if msgpack is not None:
+        return msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+    return json.dumps(value, default=_json_default, separators=(",", ":")).encode()
+
+
+def decode_value(data: bytes) -> Any:
+    if msgpack is not None:
+        return msgpack.unpackb(data, ext_hook=_msgpack_ext_hook, raw=False)
+    return json.loads(data, object_hook=_json_object_hook)
+
+
+class InMemoryStore:
+    """In-process stand-in for Redis with the same byte-level interface"""
+
+    name = "memory"
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+
+    def _alive(self, key: str) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and self._clock() >= expires_at:
+            del self._data[key]
+            return None
+        return value
+
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        return [self._alive(key) for key in keys]
+
+    async def set_many(self, items: Dict[str, bytes], ttl: Optional[float] = None):
+        expires_at = self._clock() + ttl if ttl else None
+        for key, value in items.items():
+            self._data[key] = (value, expires_at)
+
+    async def delete(self, keys: List[str]):
+        for key in keys:
+            self._data.pop(key, None)
+
+    async def acquire_lease(self, key: str, owner: str, ttl: float) -> bool:
+        current = self._alive(key)
+        if current is not None and current != owner.encode():
+            return False
+        self._data[key] = (owner.encode(), self._clock() + ttl)
+        return True
+
+    async def release_lease(self, key: str, owner: str) -> bool:
+        if self._alive(key) == owner.encode():
+            del self._data[key]
+            return True
+        return False
+
+    async def close(self):
+        pass
+
+
+class RedisStore:
+    """Redis backend; multi-key operations are pipelined into one round trip"""
+
+    name = "redis"
+
+    def __init__(self, url: str):
+        if redis_asyncio is None:
+            raise RuntimeError("redis package is not installed")
+        self._redis = redis_asyncio.from_url(url, decode_responses=False)
+        self._acquire_lease = self._redis.register_script(_ACQUIRE_LEASE_SCRIPT)
+        self._release_lease = self._redis.register_script(_RELEASE_LEASE_SCRIPT)
+
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        if not keys:
+            return []
+        return await self._redis.mget(keys)
+
+    async def set_many(self, items: Dict[str, bytes], ttl: Optional[float] = None):
+        if not items:
+            return
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                if ttl:
+                    pipe.set(key, value, px=int(ttl * 1000))
+                else:
+                    pipe.set(key, value)
+            await pipe.execute()
+
+    async def delete(self, keys: List[str]):
+        if keys:
+            await self._redis.delete(*keys)
+
+    async def acquire_lease(self, key: str, owner: str, ttl: float) -> bool:
+        return bool(await self._acquire_lease(keys=[key], args=[owner, int(ttl * 1000)]))
+
+    async def release_lease(self, key: str, owner: str) -> bool:
+        return bool(await self._release_lease(keys=[key], args=[owner]))
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+class SharedCache:
+    """Namespaced, encoded access to a shared store with an in-process near-cache"""
+
+    def __init__(self, store, prefix: str = "crypto-tracker", near_ttl: float = 1.0, clock=time.monotonic):
+        self.store = store
+        self.prefix = prefix
+        self.near_ttl = near_ttl
+        self._clock = clock
+        self._near: Dict[str, Tuple[Any, float]] = {}
+
+        self.near_hits = 0
+        self.remote_reads = 0
+        self.remote_hits = 0
+        self.remote_misses = 0
+        self.writes = 0
+        self.bytes_written = 0
+        self.errors = 0
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}:{namespace}:{key}"
+
+    def _near_get(self, full_key: str) -> Tuple[bool, Any]:
+        item = self._near.get(full_key)
+        if item is None:
+            return False, None
+        value, expires_at = item
+        if self._clock() >= expires_at:
+            del self._near[full_key]
+            return False, None
+        return True, value
+
+    def _near_set(self, full_key: str, value: Any):
+        if self.near_ttl > 0:
+            self._near[full_key] = (value, self._clock() + self.near_ttl)
+
+    async def get_many(self, namespace: str, keys: Iterable[str]) -> Dict[str, Any]:
+        """Return the values found for ``keys``; missing keys are left out"""
+        found = {}
+        remote_keys = []
+        for key in keys:
+            full_key = self._key(namespace, key)
+            hit, value = self._near_get(full_key)
+            if hit:
+                self.near_hits += 1
+                found[key] = value
+            else:
+                remote_keys.append((key, full_key))
+
+        if remote_keys:
+            self.remote_reads += 1
+            try:
+                raw_values = await self.store.get_many([full_key for _, full_key in remote_keys])
+            except Exception as e:
+                self.errors += 1
+                logging.warning(f"Shared cache read failed: {e}")
+                return found
+            for (key, full_key), raw in zip(remote_keys, raw_values):
+                if raw is None:
+                    self.remote_misses += 1
+                    continue
+                self.remote_hits += 1
+                value = decode_value(raw)
+                self._near_set(full_key, value)
+                found[key] = value
+        return found
+
+    async def get(self, namespace: str, key: str) -> Any:
+        return (await self.get_many(namespace, [key])).get(key)
+
+    async def set_many(self, namespace: str, items: Dict[str, Any], ttl: Optional[float] = None):
+        encoded = {}
+        for key, value in items.items():
+            full_key = self._key(namespace, key)
+            encoded[full_key] = encode_value(value)
+            self._near_set(full_key, value)
+        try:
+            await self.store.set_many(encoded, ttl)
+        except Exception as e:
+            self.errors += 1
+            logging.warning(f"Shared cache write failed: {e}")
+            return
+        self.writes += 1
+        self.bytes_written += sum(len(data) for data in encoded.values())
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        await self.set_many(namespace, {key: value}, ttl)
+
+    async def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """Take or renew lease ``name`` for ``owner``; False if someone else holds it or the store failed"""
+        try:
+            return await self.store.acquire_lease(self._key("lease", name), owner, ttl)
+        except Exception as e:
+            self.errors += 1
+            logging.warning(f"Shared lease {name} acquire failed: {e}")
+            return False
+
+    async def release_lease(self, name: str, owner: str) -> bool:
+        try:
+            return await self.store.release_lease(self._key("lease", name), owner)
+        except Exception as e:
+            self.errors += 1
+            logging.warning(f"Shared lease {name} release failed: {e}")
+            return False
+
+    async def lease_holder(self, name: str) -> Optional[str]:
+        try:
+            raw = (await self.store.get_many([self._key("lease", name)]))[0]
+        except Exception:
+            return None
+        return raw.decode() if raw is not None else None
+
+    async def close(self):
+        await self.store.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.store.name,
+            "codec": "msgpack" if msgpack is not None else "json",
+            "near_cache_size": len(self._near),
+            "near_hits": self.near_hits,
+            "remote_reads": self.remote_reads,
+            "remote_hits": self.remote_hits,
+            "remote_misses": self.remote_misses,
+            "writes": self.writes,
+            "bytes_written": self.bytes_written,
+            "errors": self.errors,
+        }
+
+
+def create_shared_cache(url: Optional[str], prefix: str = "crypto-tracker") -> Optional[SharedCache]:
+    """Build a SharedCache from ``REDIS_URL``; None keeps everything process-local"""
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return SharedCache(InMemoryStore(), prefix)
+    return SharedCache(RedisStore(url), prefix)
@@ -0,0 +1,96 @@
+"""Topic subscriptions for WebSocket clients.
+
+A topic is either a channel (``prices``, ``overview``, ``indicators``,
+``news``) or a channel narrowed to one symbol (``prices:BTC``,
+``indicators:ETH``). The TopicIndex keeps both directions, topic to
+subscribers and client to topics, so publishing an update for a topic touches
+only the clients that asked for it, and a disconnect is cleaned up in
+proportion to the client's own subscriptions.
+"""
+
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, Optional, Set, Tuple
+
+CHANNELS = ("prices", "overview", "indicators", "news")
+# Channels that can be narrowed to a single symbol
+SYMBOL_CHANNELS = ("prices", "indicators")
+
+_EMPTY: FrozenSet = frozenset()
+
+
+def parse_topic(topic: str) -> Tuple[str, Optional[str]]:
+    """Split ``prices:btc`` into ``("prices", "BTC")``; raises ValueError for unknown topics"""
+    channel, _, symbol = str(topic).strip().partition(":")
+    channel = channel.lower()
+    if channel not in CHANNELS:
+        raise ValueError(f"Unknown topic: {topic}")
+    if not symbol:
+        return channel, None
+    if channel not in SYMBOL_CHANNELS:
+        raise ValueError(f"Topic {channel} has no per-symbol variant")
+    return channel, symbol.upper()
+
+
+def normalize_topic(topic: str) -> str:
+    channel, symbol = parse_topic(topic)
+    return f"{channel}:{symbol}" if symbol else channel
+
+
+class TopicIndex:
+    """Bidirectional topic <-> subscriber index"""
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[Hashable]] = {}
+        self._topics: Dict[Hashable, Set[str]] = {}
+
+    def __len__(self) -> int:
+        """Number of subscribed clients"""
+        return len(self._topics)
+
+    def subscribe(self, client: Hashable, topics: Iterable[str]) -> Set[str]:
+        """Add ``topics`` for ``client``; returns the ones it did not have yet"""
+        mine = self._topics.setdefault(client, set())
+        added = set()
+        for topic in topics:
+            if topic not in mine:
+                mine.add(topic)
+                self._subscribers.setdefault(topic, set()).add(client)
+                added.add(topic)
+        return added
+
+    def unsubscribe(self, client: Hashable, topics: Optional[Iterable[str]] = None) -> Set[str]:
+        """Drop ``topics`` (all of them when None) for ``client``; returns the ones removed"""
+        mine = self._topics.get(client)
+        if mine is None:
+            return set()
+        removed = set(mine) if topics is None else mine.intersection(topics)
+        for topic in removed:
+            subscribers = self._subscribers[topic]
+            subscribers.discard(client)
+            if not subscribers:
+                del self._subscribers[topic]
+        mine.difference_update(removed)
+        if topics is None:
+            del self._topics[client]
+        return removed
+
+    def is_subscribed(self, client: Hashable) -> bool:
+        """Whether ``client`` ever subscribed (it stays opted in with an empty topic set)"""
+        return client in self._topics
+
+    def topics(self, client: Hashable) -> FrozenSet[str]:
+        return frozenset(self._topics.get(client, _EMPTY))
+
+    def subscribers(self, topic: str) -> FrozenSet[Hashable]:
+        """Clients subscribed to ``topic`` (a snapshot, safe to iterate while sending)"""
+        return frozenset(self._subscribers.get(topic, _EMPTY))
+
+    def has_subscribers(self, topic: str) -> bool:
+        return topic in self._subscribers
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "clients": len(self._topics),
+            "topics": len(self._subscribers),
+            "subscriptions": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "subscribers_by_topic": {topic: len(subscribers) for topic, subscribers in sorted(self._subscribers.items())},
+        }
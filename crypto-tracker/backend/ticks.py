@@ -0,0 +1,166 @@
+"""In-memory rolling 24h statistics built from ingested price ticks.
+
+Every price we ingest is appended to a per-symbol ring buffer backed by
+preallocated ``array('d')`` storage, so memory per symbol is fixed at
+``capacity`` ticks. Rolling high/low are kept with monotonic deques and
+open/VWAP with running sums, making each insert and query amortized O(1).
+
+Upstream only reports a rolling 24h cumulative volume with each price, not the
+volume traded at that tick. The VWAP weights each tick by the increase in that
+cumulative figure since the previous reading, which is the volume traded in
+between net of what aged out of the upstream 24h window. A reading that goes
+down (more aged out than traded) or the first reading for a symbol weighs zero.
+"""
+
+import time
+from array import array
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_WINDOW_SECONDS = 24 * 60 * 60
+# One tick every 3 seconds for 24h is 28,800 ticks; 32k keeps a full day at that rate
+DEFAULT_CAPACITY = 32768
+
+
+class RollingWindow:
+    """Fixed-capacity ring buffer of (timestamp, price, volume) ticks for one symbol"""
+
+    def __init__(self, window_seconds: float = DEFAULT_WINDOW_SECONDS, capacity: int = DEFAULT_CAPACITY):
+        self.window_seconds = window_seconds
+        self.capacity = capacity
+        self._ts = array("d", bytes(8 * capacity))
+        self._price = array("d", bytes(8 * capacity))
+        self._volume = array("d", bytes(8 * capacity))
+
+        # Sequence numbers of the oldest and next tick; slot = seq % capacity
+        self._start = 0
+        self._end = 0
+
+        # Monotonic deques of sequence numbers: prices decreasing (max) / increasing (min)
+        self._max = deque()
+        self._min = deque()
+
+        self._sum_pv = 0.0
+        self._sum_v = 0.0
+        self._sum_p = 0.0
+        # Last upstream 24h cumulative volume seen, to turn readings into traded volume
+        self._last_volume_24h: Optional[float] = None
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def add(self, price: float, volume_24h: float = 0.0, ts: Optional[float] = None):
+        """Append a tick; ``volume_24h`` is upstream's rolling 24h cumulative volume (0 when not reported)"""
+        ts = time.time() if ts is None else ts
+        if len(self) and ts < self._ts[(self._end - 1) % self.capacity]:
+            # Out-of-order tick; the window only moves forward
+            return
+
+        volume = 0.0
+        if volume_24h > 0:
+            if self._last_volume_24h is not None:
+                volume = max(volume_24h - self._last_volume_24h, 0.0)
+            self._last_volume_24h = volume_24h
+
+        self.expire(ts)
+        if len(self) == self.capacity:
+            self._evict_oldest()
+
+        seq = self._end
+        slot = seq % self.capacity
+        self._ts[slot] = ts
+        self._price[slot] = price
+        self._volume[slot] = volume
+        self._end += 1
+
+        while self._max and self._price[self._max[-1] % self.capacity] <= price:
+            self._max.pop()
+        self._max.append(seq)
+        while self._min and self._price[self._min[-1] % self.capacity] >= price:
+            self._min.pop()
+        self._min.append(seq)
+
+        self._sum_pv += price * volume
+        self._sum_v += volume
+        self._sum_p += price
+
+    def expire(self, now: Optional[float] = None):
+        """Drop ticks older than the window"""
+        cutoff = (time.time() if now is None else now) - self.window_seconds
+        while len(self) and self._ts[self._start % self.capacity] < cutoff:
+            self._evict_oldest()
+
+    def _evict_oldest(self):
+        seq = self._start
+        slot = seq % self.capacity
+        price = self._price[slot]
+        volume = self._volume[slot]
+        self._sum_pv -= price * volume
+        self._sum_v -= volume
+        self._sum_p -= price
+        if self._max and self._max[0] == seq:
+            self._max.popleft()
+        if self._min and self._min[0] == seq:
+            self._min.popleft()
+        self._start += 1
+        if not len(self):
+            # Reset running sums so float error cannot accumulate forever
+            self._sum_pv = self._sum_v = self._sum_p = 0.0
+
+    def summary(self, now: Optional[float] = None) -> Optional[Dict[str, float]]:
+        """Return rolling open/high/low/last/VWAP, or None when no tick is in the window"""
+        self.expire(now)
+        count = len(self)
+        if not count:
+            return None
+        # Weighted by traded volume between readings when upstream reports it, plain mean otherwise
+        vwap = self._sum_pv / self._sum_v if self._sum_v > 0 else self._sum_p / count
+        return {
+            "open": self._price[self._start % self.capacity],
+            "high": self._price[self._max[0] % self.capacity],
+            "low": self._price[self._min[0] % self.capacity],
+            "last": self._price[(self._end - 1) % self.capacity],
+            "vwap": vwap,
+            "ticks": count,
+            "since": self._ts[self._start % self.capacity],
+        }
+
+    def memory_bytes(self) -> int:
+        return 3 * 8 * self.capacity
+
+
+class TickStore:
+    """Rolling windows for every symbol we ingest prices for"""
+
+    def __init__(self, window_seconds: float = DEFAULT_WINDOW_SECONDS, capacity_per_symbol: int = DEFAULT_CAPACITY):
+        self.window_seconds = window_seconds
+        self.capacity_per_symbol = capacity_per_symbol
+        self._windows: Dict[str, RollingWindow] = {}
+        self._listeners: List[Callable[[str, float, float, float], Any]] = []
+
+    def add_listener(self, listener: Callable[[str, float, float, float], Any]):
+        """Call ``listener(symbol, price, volume, ts)`` for every recorded tick"""
+        self._listeners.append(listener)
+
+    def record(self, symbol: str, price: float, volume: float = 0.0, ts: Optional[float] = None):
+        """Record a price and upstream's 24h cumulative volume with it (listeners get the reading as is)"""
+        window = self._windows.get(symbol)
+        if window is None:
+            window = self._windows[symbol] = RollingWindow(self.window_seconds, self.capacity_per_symbol)
+        ts = time.time() if ts is None else ts
+        window.add(float(price), float(volume or 0.0), ts)
+        for listener in self._listeners:
+            listener(symbol, float(price), float(volume or 0.0), ts)
+
+    def summary(self, symbol: str, now: Optional[float] = None) -> Optional[Dict[str, float]]:
+        window = self._windows.get(symbol)
+        return window.summary(now) if window is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "symbols": len(self._windows),
+            "window_seconds": self.window_seconds,
+            "capacity_per_symbol": self.capacity_per_symbol,
+            "ticks": {symbol: len(window) for symbol, window in self._windows.items()},
+            "memory_bytes": sum(window.memory_bytes() for window in self._windows.values()),
+        }
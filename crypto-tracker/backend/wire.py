@@ -0,0 +1,151 @@
+"""WebSocket wire formats, negotiated per connection.
+
+A client picks its format when it connects, either with ``/ws?format=...`` or
+by offering the matching WebSocket subprotocol (``crypto-tracker.msgpack``...):
+
+- ``json`` (default): text frames, what the React app expects
+- ``msgpack``: the same messages as MessagePack binary frames (datetimes as ISO
+  strings, like the JSON encoder); only offered when msgpack is installed
+- ``binary``: price messages (market_update, prices_update, price_update) as
+  the fixed-layout frame below, every other message as JSON text
+
+Binary price frame, little-endian::
+
+    header  u8 version, u8 kind, u16 count, i64 timestamp (epoch ms)     12 bytes
+    record  u16 symbol id, f64 price, f64 change_24h, i64 timestamp ms   26 bytes each
+
+``kind`` is the index of the message type in PRICE_FRAME_KINDS. Symbol ids
+index the ``symbols`` table sent in ``connection_established``. market_update
+frames carry only the prices; binary clients that want the overview subscribe
+to the ``overview`` topic.
+
+Messages are wrapped in a Frame, which encodes lazily and keeps each format's
+bytes, so a broadcast costs one encode per format in use, not one per client.
+"""
+
+import json
+import struct
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+FORMATS = ("json", "msgpack", "binary") if msgpack is not None else ("json", "binary")
+DEFAULT_FORMAT = "json"
+SUBPROTOCOL_PREFIX = "crypto-tracker."
+
+BINARY_VERSION = 1
+PRICE_FRAME_KINDS = ("market_update", "prices_update", "price_update")
+PRICE_HEADER = struct.Struct("<BBHq")
+PRICE_RECORD = struct.Struct("<Hddq")
+UNKNOWN_SYMBOL_ID = 0xFFFF
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def _epoch_ms(value: Any) -> int:
+    """Epoch milliseconds from a datetime or ISO string (naive values are local time, as datetime.now())"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+    return 0
+
+
+def negotiate(requested: Optional[str], subprotocols: Iterable[str]) -> Tuple[str, Optional[str]]:
+    """``(format, subprotocol to accept)`` from the ``format`` query parameter or the offered subprotocols"""
+    for subprotocol in subprotocols:
+        if subprotocol.startswith(SUBPROTOCOL_PREFIX) and subprotocol[len(SUBPROTOCOL_PREFIX):] in FORMATS:
+            return subprotocol[len(SUBPROTOCOL_PREFIX):], subprotocol
+    if requested and requested.lower() in FORMATS:
+        return requested.lower(), None
+    return DEFAULT_FORMAT, None
+
+
+class Frame:
+    """One outgoing message and its encodings, made on first use per format"""
+
+    __slots__ = ("message", "_encoded")
+
+    def __init__(self, message: Dict[str, Any]):
+        self.message = message
+        self._encoded: Dict[str, Union[str, bytes]] = {}
+
+
+class WireCodec:
+    """Encodes Frames for each wire format; holds the symbol id table of the binary format"""
+
+    def __init__(self, symbols: Sequence[str]):
+        self.symbols: List[str] = list(symbols)
+        self._ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.encodes = {name: 0 for name in FORMATS}
+        self.bytes_encoded = {name: 0 for name in FORMATS}
+
+    def encode(self, frame: Frame, wire_format: str) -> Union[str, bytes]:
+        encoded = frame._encoded.get(wire_format)
+        if encoded is None:
+            if wire_format == "msgpack":
+                encoded = msgpack.packb(frame.message, default=_default, use_bin_type=True)
+            elif wire_format == "binary" and frame.message.get("type") in PRICE_FRAME_KINDS:
+                encoded = self.price_frame(frame.message)
+            else:
+                # Binary clients get non-price messages as JSON text; reuse that encoding
+                encoded = frame._encoded.get("json") or json.dumps(frame.message, default=_default)
+            frame._encoded[wire_format] = encoded
+            self.encodes[wire_format] += 1
+            self.bytes_encoded[wire_format] += len(encoded)
+        return encoded
+
+    def price_frame(self, message: Dict[str, Any]) -> bytes:
+        """Fixed-layout binary frame for a market_update, prices_update or price_update"""
+        kind = message["type"]
+        data = message.get("data")
+        if kind == "market_update":
+            rows = (data or {}).get("prices") or []
+        elif kind == "prices_update":
+            rows = data or []
+        else:
+            rows = [data] if data else []
+        buffer = bytearray(PRICE_HEADER.size + PRICE_RECORD.size * len(rows))
+        PRICE_HEADER.pack_into(buffer, 0, BINARY_VERSION, PRICE_FRAME_KINDS.index(kind), len(rows), _epoch_ms(message.get("timestamp")))
+        offset = PRICE_HEADER.size
+        for row in rows:
+            PRICE_RECORD.pack_into(
+                buffer, offset,
+                self._ids.get(row.get("symbol"), UNKNOWN_SYMBOL_ID),
+                float(row.get("price") or 0.0),
+                float(row.get("change_24h") or 0.0),
+                _epoch_ms(row.get("timestamp") or row.get("last_updated")),
+            )
+            offset += PRICE_RECORD.size
+        return bytes(buffer)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "formats": list(FORMATS),
+            "symbols": len(self.symbols),
+            "encodes": dict(self.encodes),
+            "bytes_encoded": dict(self.bytes_encoded),
+        }
+
+
+def decode_price_frame(payload: bytes, symbols: Sequence[str]) -> Dict[str, Any]:
+    """Inverse of WireCodec.price_frame, for clients written in Python and for checks"""
+    version, kind, count, ts = PRICE_HEADER.unpack_from(payload, 0)
+    prices = []
+    for i in range(count):
+        symbol_id, price, change, row_ts = PRICE_RECORD.unpack_from(payload, PRICE_HEADER.size + i * PRICE_RECORD.size)
+        prices.append({
+            "symbol": symbols[symbol_id] if symbol_id < len(symbols) else None,
+            "price": price,
+            "change_24h": change,
+            "timestamp": row_ts,
+        })
+    return {"version": version, "type": PRICE_FRAME_KINDS[kind], "timestamp": ts, "prices": prices}